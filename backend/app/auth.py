@@ -0,0 +1,222 @@
+"""
+FitBridge Authentication
+Shared FastAPI dependencies that resolve the user ID from the bearer token
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Dict, Any, Tuple
+
+import httpx
+from fastapi import Header, HTTPException
+
+from app.config import get_settings
+
+# python-jose is only needed with auth_mode "jwt", so it is imported where tokens are verified
+
+
+# Asymmetric algorithms Supabase signs access tokens with
+JWKS_ALGORITHMS = ("ES256", "RS256")
+
+
+class AuthError(Exception):
+    """Raised when a token cannot be verified"""
+
+
+class ClaimsCache:
+    """Bounded LRU of verified token claims, each kept until the token expires"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            del self._entries[token]
+            return None
+        self._entries.move_to_end(token)
+        return entry[0]
+
+    def set(self, token: str, claims: Dict[str, Any], expires_at: float) -> None:
+        self._entries[token] = (claims, expires_at)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class JWKSCache:
+    """
+    Signing keys of the Supabase project, parsed once and refreshed in the
+    background. A token signed with an unknown key ID triggers an early
+    refresh (at most every min_refresh_seconds) to pick up rotated keys.
+    """
+
+    def __init__(self, url: str, refresh_seconds: float = 3600, min_refresh_seconds: float = 30):
+        self.url = url
+        self.refresh_seconds = refresh_seconds
+        self.min_refresh_seconds = min_refresh_seconds
+        self._keys: Dict[str, Any] = {}
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def refresh(self) -> int:
+        """Fetch and parse the key set, returns the number of keys"""
+        from jose import jwk
+        async with httpx.AsyncClient(timeout=10) as client:
+            response = await client.get(self.url)
+            response.raise_for_status()
+        keys = {}
+        for key in response.json().get("keys", []):
+            if key.get("alg") in JWKS_ALGORITHMS and key.get("kid"):
+                keys[key["kid"]] = jwk.construct(key, key["alg"])
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+        return len(keys)
+
+    async def get(self, kid: Optional[str]):
+        """Parsed key for a key ID, refreshing once if it is unknown"""
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        async with self._lock:
+            if kid not in self._keys and time.monotonic() - self._fetched_at >= self.min_refresh_seconds:
+                try:
+                    await self.refresh()
+                except (httpx.HTTPError, ValueError) as e:
+                    # Unknown key IDs must not retry an unreachable endpoint on every request
+                    self._fetched_at = time.monotonic()
+                    raise AuthError("Signing keys unavailable") from e
+        key = self._keys.get(kid)
+        if key is None:
+            raise AuthError("Unknown signing key")
+        return key
+
+    async def refresh_periodically(self) -> None:
+        """Keep keys current until cancelled"""
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"JWKS refresh failed: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+
+class TokenVerifier:
+    """
+    Verifies Supabase access tokens: HS256 with the project's JWT secret,
+    ES256/RS256 with keys from its JWKS endpoint. Verified claims are
+    cached per token, so a repeated token costs one dict lookup.
+    """
+
+    def __init__(
+        self,
+        secret: str = "",
+        jwks: Optional[JWKSCache] = None,
+        audience: Optional[str] = "authenticated",
+        issuer: Optional[str] = None,
+        leeway_seconds: int = 30,
+        cache_size: int = 10000
+    ):
+        self.jwks = jwks
+        self.audience = audience
+        self.issuer = issuer
+        self.leeway_seconds = leeway_seconds
+        self.claims = ClaimsCache(cache_size)
+        self._secret_key = None
+        if secret:
+            from jose import jwk
+            self._secret_key = jwk.construct(secret, "HS256")
+
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """Claims of a valid token; raises AuthError otherwise"""
+        claims = self.claims.get(token)
+        if claims is not None:
+            return claims
+
+        from jose import jwt, JWTError
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError as e:
+            raise AuthError("Malformed token") from e
+        algorithm = header.get("alg")
+        if algorithm == "HS256" and self._secret_key is not None:
+            key = self._secret_key
+        elif algorithm in JWKS_ALGORITHMS and self.jwks is not None:
+            key = await self.jwks.get(header.get("kid"))
+        else:
+            raise AuthError(f"Unsupported token algorithm: {algorithm}")
+
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[algorithm],
+                audience=self.audience,
+                issuer=self.issuer,
+                options={"leeway": self.leeway_seconds, "verify_aud": self.audience is not None}
+            )
+        except JWTError as e:
+            raise AuthError(str(e)) from e
+        if not claims.get("sub") or "exp" not in claims:
+            raise AuthError("Token has no subject or expiry")
+
+        self.claims.set(token, claims, float(claims["exp"]))
+        return claims
+
+
+@lru_cache()
+def get_token_verifier() -> TokenVerifier:
+    """Process-wide verifier, so keys and verified claims are reused"""
+    settings = get_settings()
+    jwks = None
+    issuer = None
+    if settings.supabase_url:
+        base = settings.supabase_url.rstrip("/")
+        jwks = JWKSCache(f"{base}/auth/v1/.well-known/jwks.json", settings.auth_jwks_refresh_seconds)
+        issuer = f"{base}/auth/v1"
+    return TokenVerifier(
+        secret=settings.supabase_jwt_secret,
+        jwks=jwks,
+        audience=settings.auth_audience or None,
+        issuer=issuer,
+        cache_size=settings.auth_claims_cache_size
+    )
+
+
+def _bearer(authorization: str) -> str:
+    if authorization.startswith("Bearer "):
+        return authorization[7:]
+    return authorization
+
+
+async def resolve_user_id(authorization: str) -> Optional[str]:
+    """User ID for an Authorization header value, None when it is empty"""
+    token = _bearer(authorization)
+    if not token:
+        return None
+    if get_settings().auth_mode != "jwt":
+        # Clients that send the Supabase user ID itself
+        return token
+    try:
+        claims = await get_token_verifier().verify(token)
+    except AuthError as e:
+        raise HTTPException(status_code=401, detail=f"Invalid token: {e}") from e
+    return claims["sub"]
+
+
+async def get_user_id(authorization: str = Header(...)) -> str:
+    """Dependency for endpoints that require a signed-in user"""
+    user_id = await resolve_user_id(authorization)
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Authorization required")
+    return user_id
+
+
+async def get_optional_user_id(authorization: str = Header(default="")) -> Optional[str]:
+    """Dependency for endpoints that also serve anonymous users"""
+    return await resolve_user_id(authorization)
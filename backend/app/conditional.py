@@ -0,0 +1,39 @@
+"""
+FitBridge Conditional Requests
+Shared FastAPI dependency that answers repeat reads of unchanged data with 304
+"""
+
+from fastapi import Depends, Header, HTTPException, Response
+
+from app.auth import get_user_id
+from app.config import get_settings
+from app.services.data_version import data_etag, etag_matches
+from app.services.supabase_service import SupabaseService
+
+
+# Clients may keep the response but must revalidate before using it
+CACHE_CONTROL = "private, no-cache"
+
+
+def get_supabase_service() -> SupabaseService:
+    """Dependency to get Supabase service"""
+    settings = get_settings()
+    return SupabaseService(settings)
+
+
+async def user_data_etag(
+    response: Response,
+    user_id: str = Depends(get_user_id),
+    if_none_match: str = Header(default=""),
+    db: SupabaseService = Depends(get_supabase_service)
+) -> str:
+    """
+    ETag of the user's data for read endpoints. Raises 304 Not Modified
+    when the client already has it, after reading only the data version.
+    """
+    etag = data_etag(user_id, await db.get_data_version(user_id))
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if if_none_match and etag_matches(if_none_match, etag):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return etag
@@ -4,7 +4,7 @@ Loads environment variables and provides app settings
 """
 
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 from functools import lru_cache
 
 
@@ -17,21 +17,112 @@ class Settings(BaseSettings):
     supabase_service_role_key: str
     
     # AI Provider
-    ai_provider: str = "deepseek"  # 'openai', 'deepseek', or 'mock'
+    ai_provider: str = "deepseek"  # 'openai', 'deepseek', 'simulated' or 'mock'
     openai_api_key: str = ""
     openai_model: str = "gpt-4o"
     deepseek_api_key: str = ""
     deepseek_base_url: str = "https://openrouter.ai/api/v1"
     deepseek_model: str = "deepseek/deepseek-chat"
+    ai_timeout_seconds: float = 60.0
+    ai_max_retries: int = 2
+    ai_stream_usage: bool = True  # Request token usage in streamed answers (stream_options)
+    
+    # Simulated provider: offline latency, streaming and failure behaviour
+    sim_ttft_seconds: float = 0.6
+    sim_tokens_per_second: float = 40.0
+    sim_jitter: float = 0.3
+    sim_error_rate: float = 0.0
+    sim_rate_limit_rate: float = 0.0
+    sim_truncation_rate: float = 0.0
+    sim_seed: Optional[int] = None
+    
+    # Model routing: short, generic chat turns go to a fast model
+    ai_routing_enabled: bool = True
+    openai_fast_model: str = "gpt-4o-mini"
+    deepseek_fast_model: str = ""  # empty uses deepseek_model
+    route_fast_max_chars: int = 200
+    route_fast_max_history: int = 4
+    route_complex_keywords: str = "plan,program,schedule,routine,analyze,progress,injury,pain,medical"
+    
+    # Generate multi-day workout plans as an outline plus one call per day
+    workout_fan_out: bool = False
+    workout_fan_out_max_days: int = 7
+    
+    # Ask the model for short-key plans and expand them server-side
+    compact_plan_schema: bool = False
+    
+    # Plan index (serve near-duplicate plan requests without calling the AI)
+    plan_index_enabled: bool = True
+    plan_index_threshold: float = 0.6
+    plan_index_personalize: bool = True
+    plan_index_max_generated: int = 500
+    
+    # Daily AI token quotas per user over a rolling 24 hours (0 = unlimited)
+    token_quota_chat: int = 200000
+    token_quota_plan: int = 100000
+    token_quota_progress: int = 50000
+    token_quota_flush_seconds: int = 60
+    
+    # Background plan generation jobs
+    job_workers: int = 4
+    job_ttl_seconds: int = 3600
+    job_max_pending: int = 100
+    
+    # Nightly precomputation of next-day diet plans for opted-in users
+    batch_plans_enabled: bool = False
+    batch_plans_hour_utc: int = 3
+    batch_plans_concurrency: int = 4
     
     # Server
+    web_concurrency: int = 1  # uvicorn worker processes (WEB_CONCURRENCY, also read by uvicorn)
+    warm_up_enabled: bool = True  # Import heavy SDKs and open connections right after startup
     host: str = "0.0.0.0"
     port: int = 8000
     debug: bool = False
     cors_origins: str = "http://localhost:3000,http://localhost:5173,https://fitbridge.vercel.app,https://*.vercel.app"
     
+    # State shared by worker processes: 'auto' (SQLite when web_concurrency > 1), 'memory' or 'sqlite'
+    shared_state_backend: str = "auto"
+    shared_state_path: str = ""  # empty uses fitbridge-state.sqlite3 in the temp directory
+    shared_state_busy_timeout_ms: int = 200  # longest a SQLite write blocks the event loop waiting for the lock
+    
+    # Chat answers grounded in the user's own recent logs
+    chat_retrieval_enabled: bool = True
+    chat_retrieval_days: int = 30
+    chat_retrieval_token_budget: int = 200
+    
+    # Chat suggestions: pre-generated answers are refreshed on this interval
+    suggestion_refresh_seconds: int = 86400
+    
+    # History export: rows fetched per keyset page
+    export_page_size: int = 500
+    
+    # History import: rows written per batch
+    import_batch_size: int = 1000
+    
+    # Observability: Server-Timing header and on-demand profiling (X-Profile: 1 + X-Admin-Key)
+    server_timing_enabled: bool = True
+    profile_dir: str = "profiles"
+    
+    # Response compression: gzip, plus brotli when the `brotli` package is installed
+    compression_enabled: bool = True
+    compression_min_bytes: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 5
+    compression_cache_bytes: int = 16 * 1024 * 1024
+    
+    # Auth: 'jwt' verifies Supabase access tokens; 'user_id' accepts the bearer
+    # value as the user ID, which is what the web and mobile clients send today
+    auth_mode: str = "user_id"
+    supabase_jwt_secret: str = ""  # HS256 projects; ES256/RS256 keys come from the project's JWKS
+    auth_audience: str = "authenticated"
+    auth_jwks_refresh_seconds: int = 3600
+    auth_claims_cache_size: int = 10000
+    
     # Security
     jwt_secret: str = "change-this-in-production"
+    admin_api_key: str = ""  # Enables admin endpoints when set
+    metrics_token: str = ""  # Bearer token required by /metrics when set
     
     @property
     def cors_origins_list(self) -> List[str]:
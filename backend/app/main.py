@@ -3,12 +3,24 @@ FitBridge FastAPI Main Application
 Entry point for the AI backend server
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 
+from app.auth import get_token_verifier
 from app.config import get_settings
-from app.routers import health, ai, workout, diet, chat
+from app.routers import health, ai, workout, diet, chat, streaks, export, imports, weight, activity
+from app.services.ai_service import AIService
+from app.services.supabase_service import SupabaseService
+from app.services.batch_plans import run_daily_schedule
+from app.services.compression import CompressionMiddleware
+from app.services.metrics import MetricsMiddleware, publish_periodically
+from app.services.shared_state import get_shared_state
+from app.services.token_quota import QuotaExceededError, get_token_quota
+from app.services.request_timing import ServerTimingMiddleware
+from app.services.warm_up import warm_up
 
 
 @asynccontextmanager
@@ -18,9 +30,70 @@ async def lifespan(app: FastAPI):
     settings = get_settings()
     print("FitBridge AI Backend starting...")
     print(f"AI Provider: {settings.ai_provider}")
+    shared_state = get_shared_state()
+    print(f"Shared state: {type(shared_state).__name__} ({settings.web_concurrency} workers)")
     print(f"Supabase URL: {settings.supabase_url[:30]}...")
+    
+    if settings.plan_index_enabled:
+        plan_index = ai.get_plan_index()
+        try:
+            loaded = await plan_index.load_generated(
+                SupabaseService(settings),
+                limit=settings.plan_index_max_generated
+            )
+            print(f"Plan index ready: {plan_index.size()} plans ({loaded} previously generated)")
+        except Exception as e:
+            print(f"Plan index loaded without generated plans: {e}")
+    
+    job_queue = ai.get_job_queue()
+    job_queue.start()
+    
+    suggestion_refresh = asyncio.create_task(
+        chat.get_suggestion_cache().refresh_periodically(
+            lambda: AIService(settings),
+            settings.suggestion_refresh_seconds
+        )
+    )
+    warm_up_task = None
+    if settings.warm_up_enabled:
+        async def run_warm_up():
+            print(f"Warm-up finished: {await warm_up(settings)}")
+        warm_up_task = asyncio.create_task(run_warm_up())
+    
+    token_usage_flush = asyncio.create_task(
+        get_token_quota().flush_periodically(
+            lambda: SupabaseService(settings),
+            settings.token_quota_flush_seconds
+        )
+    )
+    
+    jwks_refresh = None
+    if settings.auth_mode == "jwt" and get_token_verifier().jwks:
+        jwks_refresh = asyncio.create_task(get_token_verifier().jwks.refresh_periodically())
+    
+    metrics_publisher = None
+    if shared_state.shared:
+        metrics_publisher = asyncio.create_task(publish_periodically(shared_state))
+    
+    batch_plans = None
+    if settings.batch_plans_enabled:
+        batch_plans = asyncio.create_task(run_daily_schedule(settings))
+        print(f"Daily plan batch scheduled at {settings.batch_plans_hour_utc:02d}:00 UTC")
     yield
     # Shutdown
+    suggestion_refresh.cancel()
+    if warm_up_task:
+        warm_up_task.cancel()
+    if jwks_refresh:
+        jwks_refresh.cancel()
+    if metrics_publisher:
+        metrics_publisher.cancel()
+    if batch_plans:
+        batch_plans.cancel()
+    await job_queue.stop()
+    # Cancelling the flush task writes out the remaining usage
+    token_usage_flush.cancel()
+    await asyncio.gather(token_usage_flush, return_exceptions=True)
     print("FitBridge AI Backend shutting down...")
 
 
@@ -41,14 +114,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# gzip/brotli for JSON bodies and exports; server-sent events pass through
+app.add_middleware(CompressionMiddleware)
+
+# Per-route latency and status counts for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Server-Timing spans and opt-in profiling per request
+app.add_middleware(ServerTimingMiddleware)
+
+@app.exception_handler(QuotaExceededError)
+async def quota_exceeded_handler(request: Request, exc: QuotaExceededError):
+    """Over-quota requests get a 429 before any AI provider call"""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "endpoint": exc.endpoint, "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
 # Include routers
 app.include_router(health.router, tags=["Health"])
 app.include_router(ai.router, prefix="/api/ai", tags=["AI"])
 app.include_router(workout.router, prefix="/api/workout", tags=["Workout"])
 app.include_router(diet.router, prefix="/api/diet", tags=["Diet"])
 app.include_router(chat.router, prefix="/api/chat", tags=["Chat"])
+app.include_router(streaks.router, prefix="/api/streaks", tags=["Streaks"])
+app.include_router(export.router, prefix="/api/export", tags=["Export"])
+app.include_router(imports.router, prefix="/api/import", tags=["Import"])
+app.include_router(weight.router, prefix="/api/weight", tags=["Weight"])
+app.include_router(activity.router, prefix="/api/activity", tags=["Activity"])
 
 
 @app.get("/")
@@ -64,9 +162,11 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
+    settings = get_settings()
     uvicorn.run(
-        "main:app",
+        "app.main:app",
         host=settings.host,
         port=settings.port,
-        reload=settings.debug
+        reload=settings.debug,
+        workers=settings.web_concurrency
     )
@@ -0,0 +1,82 @@
+"""
+Activity Router
+Bucketed time series of daily activity for charts
+"""
+
+from datetime import date, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+
+from app.services.activity_series import AGGREGATES, BUCKETS, MAX_RANGE_DAYS, METRICS, build_activity_series
+from app.services.supabase_service import SupabaseService
+from app.auth import get_user_id
+from app.conditional import user_data_etag
+from app.config import get_settings
+
+router = APIRouter()
+
+# Range covered when `from` is omitted, per bucket
+DEFAULT_RANGE_DAYS = {"day": 30, "week": 7 * 12, "month": 365}
+
+
+def get_supabase_service() -> SupabaseService:
+    """Dependency to get Supabase service"""
+    settings = get_settings()
+    return SupabaseService(settings)
+
+
+def _parse_date(value: Optional[str], name: str) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO date (YYYY-MM-DD)")
+
+
+@router.get("/series", dependencies=[Depends(user_data_etag)])
+async def get_activity_series(
+    metric: str = ",".join(METRICS),
+    bucket: str = "day",
+    agg: str = "sum",
+    start: Optional[str] = Query(default=None, alias="from"),
+    end: Optional[str] = Query(default=None, alias="to"),
+    user_id: str = Depends(get_user_id),
+    db: SupabaseService = Depends(get_supabase_service)
+):
+    """
+    Get one or more daily-log metrics per day, week or month, with a point
+    for every bucket in the range whether or not anything was logged.
+    """
+    metrics = list(dict.fromkeys(m.strip() for m in metric.split(",") if m.strip()))
+    if not metrics or any(m not in METRICS for m in metrics):
+        raise HTTPException(status_code=400, detail=f"metric must be from: {', '.join(METRICS)}")
+    if bucket not in BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of: {', '.join(BUCKETS)}")
+    if agg not in AGGREGATES:
+        raise HTTPException(status_code=400, detail=f"agg must be one of: {', '.join(AGGREGATES)}")
+    range_end = _parse_date(end, "to") or date.today()
+    range_start = _parse_date(start, "from") or range_end - timedelta(days=DEFAULT_RANGE_DAYS[bucket] - 1)
+    if range_start > range_end or (range_end - range_start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"from must be before to and at most {MAX_RANGE_DAYS} days apart")
+
+    try:
+        columns = ",".join(["log_date", *(METRICS[m] for m in metrics)])
+        rows = await db.get_daily_logs_between(
+            user_id, range_start.isoformat(), range_end.isoformat(), columns=columns
+        )
+        points = build_activity_series(rows, metrics, bucket, range_start, range_end, agg)
+        return {
+            "success": True,
+            "data": {
+                "bucket": bucket,
+                "agg": agg,
+                "from": range_start.isoformat(),
+                "to": range_end.isoformat(),
+                "metrics": metrics,
+                "points": points
+            }
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
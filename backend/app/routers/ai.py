@@ -6,8 +6,22 @@ Central AI operations endpoint
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import Optional
+from functools import lru_cache
+from datetime import date, timedelta
+import asyncio
+import hashlib
+import json
+import time
 
 from app.services.ai_service import AIService
+from app.services.job_queue import JobQueue, QueueFullError
+from app.services.model_router import get_model_latency_stats
+from app.services.plan_index import PlanIndex, personalize_plan
+from app.services.progress_features import InsightCache, build_progress_summary, summary_fingerprint
+from app.services.shared_state import get_shared_state
+from app.services.supabase_service import SupabaseService
+from app.services.token_quota import TokenQuota, get_token_quota
+from app.auth import get_optional_user_id
 from app.config import get_settings
 
 router = APIRouter()
@@ -18,6 +32,8 @@ class GeneratePlanRequest(BaseModel):
     user_description: str
     plan_type: str  # 'workout' or 'diet'
     user_profile: Optional[dict] = None
+    use_index: bool = True  # False forces a fresh AI generation
+    fan_out: Optional[bool] = None  # Generate workout days in parallel
 
 
 class GeneratePlanResponse(BaseModel):
@@ -25,6 +41,12 @@ class GeneratePlanResponse(BaseModel):
     success: bool
     plan: Optional[dict] = None
     error: Optional[str] = None
+    source: Optional[str] = None  # 'ai', 'vetted' or 'generated'
+
+
+class ProgressRequest(BaseModel):
+    """Request model for progress insights"""
+    days: int = 28  # Look-back window, 7-365
 
 
 def get_ai_service() -> AIService:
@@ -33,13 +55,47 @@ def get_ai_service() -> AIService:
     return AIService(settings)
 
 
-@router.post("/generate", response_model=GeneratePlanResponse)
-async def generate_plan(
+def get_supabase_service() -> SupabaseService:
+    """Dependency to get Supabase service"""
+    settings = get_settings()
+    return SupabaseService(settings)
+
+
+@lru_cache()
+def get_insight_cache() -> InsightCache:
+    """Dependency to get the progress insight cache, shared by all workers"""
+    return InsightCache(state=get_shared_state())
+
+
+@lru_cache()
+def get_plan_index() -> PlanIndex:
+    """Dependency to get the shared plan index (built once per process)"""
+    settings = get_settings()
+    index = PlanIndex(threshold=settings.plan_index_threshold)
+    index.load_vetted()
+    return index
+
+
+@lru_cache()
+def get_job_queue() -> JobQueue:
+    """Dependency to get the shared plan generation job queue"""
+    settings = get_settings()
+    return JobQueue(
+        workers=settings.job_workers,
+        ttl_seconds=settings.job_ttl_seconds,
+        max_pending=settings.job_max_pending,
+        state=get_shared_state()
+    )
+
+
+async def run_generation(
     request: GeneratePlanRequest,
-    ai_service: AIService = Depends(get_ai_service)
-):
+    ai_service: AIService,
+    plan_index: PlanIndex
+) -> GeneratePlanResponse:
     """
-    Generate an AI workout or diet plan based on user description
+    Generate a plan, serving close matches from the local plan index.
+    Errors are returned in the response rather than raised.
     """
     try:
         # Check if AI service is ready
@@ -49,10 +105,28 @@ async def generate_plan(
                 error=f"AI service not configured. Provider: {ai_service.provider}"
             )
         
+        settings = get_settings()
+        if settings.plan_index_enabled and request.use_index:
+            started = time.perf_counter()
+            match = plan_index.search(request.plan_type, request.user_description)
+            if match:
+                plan = match["plan"]
+                if settings.plan_index_personalize:
+                    plan = personalize_plan(
+                        request.plan_type,
+                        plan,
+                        request.user_description,
+                        request.user_profile
+                    )
+                plan_index.record_match(request.plan_type, time.perf_counter() - started)
+                return GeneratePlanResponse(success=True, plan=plan, source=match["source"])
+        
+        started = time.perf_counter()
         if request.plan_type == "workout":
             plan = await ai_service.generate_workout_plan(
                 request.user_description,
-                request.user_profile
+                request.user_profile,
+                fan_out=request.fan_out
             )
         elif request.plan_type == "diet":
             plan = await ai_service.generate_diet_plan(
@@ -65,7 +139,11 @@ async def generate_plan(
                 detail="Invalid plan_type. Must be 'workout' or 'diet'"
             )
         
-        return GeneratePlanResponse(success=True, plan=plan)
+        plan_index.record_generation(request.plan_type, time.perf_counter() - started)
+        if ai_service.provider not in ("mock", "simulated"):
+            plan_index.add(request.plan_type, request.user_description, plan)
+        
+        return GeneratePlanResponse(success=True, plan=plan, source="ai")
     
     except Exception as e:
         import traceback
@@ -75,12 +153,176 @@ async def generate_plan(
         return GeneratePlanResponse(success=False, error=error_details)
 
 
+@router.post("/generate", response_model=GeneratePlanResponse)
+async def generate_plan(
+    request: GeneratePlanRequest,
+    ai_service: AIService = Depends(get_ai_service),
+    plan_index: PlanIndex = Depends(get_plan_index),
+    db: SupabaseService = Depends(get_supabase_service),
+    token_quota: TokenQuota = Depends(get_token_quota),
+    user_id: Optional[str] = Depends(get_optional_user_id)
+):
+    """
+    Generate an AI workout or diet plan based on user description.
+    Close matches in the local plan index are served without calling the AI.
+    """
+    await token_quota.check(user_id, "plan", db)
+    with token_quota.track(user_id, "plan"):
+        return await run_generation(request, ai_service, plan_index)
+
+
+@router.post("/jobs", status_code=202)
+async def create_generation_job(
+    request: GeneratePlanRequest,
+    ai_service: AIService = Depends(get_ai_service),
+    plan_index: PlanIndex = Depends(get_plan_index),
+    job_queue: JobQueue = Depends(get_job_queue),
+    db: SupabaseService = Depends(get_supabase_service),
+    token_quota: TokenQuota = Depends(get_token_quota),
+    user_id: Optional[str] = Depends(get_optional_user_id)
+):
+    """
+    Queue a plan generation and return its job ID immediately.
+    Poll GET /api/ai/jobs/{job_id} for the result.
+    """
+    await token_quota.check(user_id, "plan", db)
+    
+    async def run():
+        with token_quota.track(user_id, "plan"):
+            response = await run_generation(request, ai_service, plan_index)
+        if not response.success:
+            raise RuntimeError(response.error)
+        return response.model_dump()
+    
+    # Identical requests from the same user share one in-flight job
+    key = None
+    if user_id:
+        fingerprint = json.dumps(request.model_dump(), sort_keys=True, default=str)
+        key = f"{user_id}:{hashlib.sha256(fingerprint.encode()).hexdigest()}"
+    
+    try:
+        job = job_queue.submit(run, key=key, user_id=user_id)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return {"success": True, "job_id": job["id"], "status": job["status"]}
+
+
+@router.get("/jobs/{job_id}")
+async def get_generation_job(
+    job_id: str,
+    job_queue: JobQueue = Depends(get_job_queue),
+    user_id: Optional[str] = Depends(get_optional_user_id)
+):
+    """Get the status and, once finished, the result of the caller's generation job"""
+    job = job_queue.get(job_id)
+    # Other users' jobs look the same as unknown ones
+    if not job or job.get("user_id") != user_id:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    
+    return {
+        "success": True,
+        "job_id": job["id"],
+        "status": job["status"],
+        "result": job["result"],
+        "error": job["error"]
+    }
+
+
+@router.post("/progress")
+async def progress_insights(
+    request: ProgressRequest,
+    ai_service: AIService = Depends(get_ai_service),
+    db: SupabaseService = Depends(get_supabase_service),
+    insight_cache: InsightCache = Depends(get_insight_cache),
+    token_quota: TokenQuota = Depends(get_token_quota),
+    user_id: Optional[str] = Depends(get_optional_user_id)
+):
+    """
+    AI insights on the user's recent progress.
+    Only a compact numeric summary of the logs is sent to the model, and the
+    insight is reused until new logs change that summary.
+    """
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Authorization required")
+    await token_quota.check(user_id, "progress", db)
+    
+    try:
+        days = max(7, min(request.days, 365))
+        start_date = (date.today() - timedelta(days=days - 1)).isoformat()
+        daily_logs, workout_logs, diet_logs = await asyncio.gather(
+            db.get_daily_logs(user_id, days),
+            db.get_workout_logs_since(user_id, start_date),
+            db.get_diet_logs_since(user_id, start_date)
+        )
+        
+        summary = build_progress_summary(daily_logs, workout_logs, diet_logs, days)
+        fingerprint = summary_fingerprint(summary)
+        cache_key = f"{user_id}:{days}"
+        
+        insight = insight_cache.get(cache_key, fingerprint)
+        cached = insight is not None
+        if not cached:
+            with token_quota.track(user_id, "progress"):
+                insight = await ai_service.analyze_progress(summary)
+            insight_cache.set(cache_key, fingerprint, insight)
+        
+        return {
+            "success": True,
+            "data": {"insight": insight, "summary": summary, "cached": cached}
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/plans")
+async def get_plans(
+    plan_date: Optional[str] = None,
+    db: SupabaseService = Depends(get_supabase_service),
+    user_id: Optional[str] = Depends(get_optional_user_id)
+):
+    """
+    Get the user's active AI plans.
+    Pass plan_date (YYYY-MM-DD) to fetch the plan precomputed for that day.
+    """
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Authorization required")
+
+    try:
+        plans = await db.get_active_plans(user_id, plan_date)
+        return {"success": True, "data": plans}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/usage")
+async def get_usage(
+    db: SupabaseService = Depends(get_supabase_service),
+    token_quota: TokenQuota = Depends(get_token_quota),
+    user_id: Optional[str] = Depends(get_optional_user_id)
+):
+    """AI tokens the user has used in the last 24 hours per endpoint, with the quotas"""
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Authorization required")
+    
+    try:
+        await token_quota.ensure_loaded(user_id, db)
+        return {"success": True, "data": token_quota.usage(user_id)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/status")
-async def ai_status(ai_service: AIService = Depends(get_ai_service)):
+async def ai_status(
+    ai_service: AIService = Depends(get_ai_service),
+    plan_index: PlanIndex = Depends(get_plan_index)
+):
     """Check AI service status and provider info"""
     settings = get_settings()
     return {
         "provider": settings.ai_provider,
         "model": settings.openai_model if settings.ai_provider == "openai" else "deepseek-chat",
-        "ready": ai_service.is_ready()
+        "ready": ai_service.is_ready(),
+        "plan_index": plan_index.get_stats(),
+        "model_routes": get_model_latency_stats().snapshot()
     }
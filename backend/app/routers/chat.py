@@ -3,13 +3,22 @@ Chat Router
 AI-powered fitness coach chat endpoint
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from typing import List, Optional
+from functools import lru_cache
+import asyncio
+import hmac
 import json
 
 from app.services.ai_service import AIService
+from app.services.log_retrieval import LogRetrievalIndex, get_log_index
+from app.services.shared_state import get_shared_state
+from app.services.supabase_service import SupabaseService
+from app.services.suggestion_cache import SuggestionCache, stream_cached
+from app.services.token_quota import QuotaExceededError, TokenQuota, get_token_quota
+from app.auth import get_optional_user_id, resolve_user_id
 from app.config import get_settings
 
 router = APIRouter()
@@ -28,40 +37,103 @@ class ChatRequest(BaseModel):
     user_context: Optional[dict] = None  # User profile for personalization
 
 
+class SuggestionCreate(BaseModel):
+    """Register a suggested question, with or without a prepared answer"""
+    question: str
+    answer: Optional[str] = None
+
+
 def get_ai_service() -> AIService:
     """Dependency to get AI service instance"""
     settings = get_settings()
     return AIService(settings)
 
 
-async def get_user_id(authorization: str = Header(default="")) -> Optional[str]:
-    """Extract user ID from authorization header (optional for chat)"""
-    if authorization.startswith("Bearer "):
-        return authorization[7:]
-    return authorization if authorization else None
+def get_supabase_service() -> SupabaseService:
+    """Dependency to get Supabase service"""
+    settings = get_settings()
+    return SupabaseService(settings)
+
+
+@lru_cache()
+def get_suggestion_cache() -> SuggestionCache:
+    """Dependency to get the suggestion answer cache, shared by all workers"""
+    return SuggestionCache(state=get_shared_state())
+
+
+async def retrieve_user_facts(
+    message: str,
+    user_id: Optional[str],
+    db: SupabaseService,
+    log_index: LogRetrievalIndex
+) -> Optional[List[str]]:
+    """Facts from the user's own logs relevant to the message, within the token budget"""
+    settings = get_settings()
+    if not user_id or not settings.chat_retrieval_enabled:
+        return None
+    try:
+        if not log_index.is_loaded(user_id):
+            await log_index.load_user(db, user_id, settings.chat_retrieval_days)
+        return log_index.search(user_id, message, settings.chat_retrieval_token_budget) or None
+    except Exception as e:
+        # Answer without personal facts rather than failing the chat
+        print(f"Log retrieval failed: {e}")
+        return None
+
+
+def cache_answer(
+    suggestion_cache: SuggestionCache,
+    request: ChatRequest,
+    user_facts: Optional[List[str]],
+    answer: str,
+    finish_reason: Optional[str]
+) -> None:
+    """
+    Keep the answer to a suggested question for everyone who asks it next.
+    Answers cut short (finish reason "length" or none at all) are not kept.
+    """
+    if answer and finish_reason == "stop" and not user_facts and suggestion_cache.is_suggestion(
+        request.message, request.history, request.user_context
+    ):
+        suggestion_cache.register(request.message, answer)
 
 
 @router.post("/send")
 async def send_message(
     request: ChatRequest,
     ai_service: AIService = Depends(get_ai_service),
-    user_id: Optional[str] = Depends(get_user_id)
+    suggestion_cache: SuggestionCache = Depends(get_suggestion_cache),
+    db: SupabaseService = Depends(get_supabase_service),
+    log_index: LogRetrievalIndex = Depends(get_log_index),
+    token_quota: TokenQuota = Depends(get_token_quota),
+    user_id: Optional[str] = Depends(get_optional_user_id)
 ):
     """
     Send a message to the AI fitness coach and get a response
     """
     try:
-        response = await ai_service.chat(
-            message=request.message,
-            history=request.history,
-            user_context=request.user_context
-        )
+        cached = suggestion_cache.lookup(request.message, request.history, request.user_context)
+        if cached:
+            return {"success": True, "response": cached}
+        
+        await token_quota.check(user_id, "chat", db)
+        user_facts = await retrieve_user_facts(request.message, user_id, db, log_index)
+        with token_quota.track(user_id, "chat"):
+            response = await ai_service.chat(
+                message=request.message,
+                history=request.history,
+                user_context=request.user_context,
+                user_facts=user_facts
+            )
+        cache_answer(suggestion_cache, request, user_facts, response, ai_service.finish_reason)
         
         return {
             "success": True,
             "response": response
         }
     
+    except QuotaExceededError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -69,20 +141,41 @@ async def send_message(
 @router.post("/stream")
 async def stream_message(
     request: ChatRequest,
-    ai_service: AIService = Depends(get_ai_service)
+    ai_service: AIService = Depends(get_ai_service),
+    suggestion_cache: SuggestionCache = Depends(get_suggestion_cache),
+    db: SupabaseService = Depends(get_supabase_service),
+    log_index: LogRetrievalIndex = Depends(get_log_index),
+    token_quota: TokenQuota = Depends(get_token_quota),
+    user_id: Optional[str] = Depends(get_optional_user_id)
 ):
     """
     Stream a response from the AI fitness coach
     Returns Server-Sent Events (SSE)
     """
+    cached = suggestion_cache.lookup(request.message, request.history, request.user_context)
+    if not cached:
+        await token_quota.check(user_id, "chat", db)
+    user_facts = None if cached else await retrieve_user_facts(request.message, user_id, db, log_index)
+    
     async def generate():
         try:
+            if cached:
+                for chunk in stream_cached(cached):
+                    yield f"data: {json.dumps({'content': chunk})}\n\n"
+                yield f"data: {json.dumps({'done': True})}\n\n"
+                return
+            
+            token_quota.bind(user_id, "chat")
+            chunks = []
             async for chunk in ai_service.chat_stream(
                 message=request.message,
                 history=request.history,
-                user_context=request.user_context
+                user_context=request.user_context,
+                user_facts=user_facts
             ):
+                chunks.append(chunk)
                 yield f"data: {json.dumps({'content': chunk})}\n\n"
+            cache_answer(suggestion_cache, request, user_facts, "".join(chunks), ai_service.finish_reason)
             yield f"data: {json.dumps({'done': True})}\n\n"
         except Exception as e:
             yield f"data: {json.dumps({'error': str(e)})}\n\n"
@@ -97,19 +190,149 @@ async def stream_message(
     )
 
 
+@router.websocket("/ws")
+async def chat_websocket(
+    websocket: WebSocket,
+    ai_service: AIService = Depends(get_ai_service),
+    suggestion_cache: SuggestionCache = Depends(get_suggestion_cache),
+    db: SupabaseService = Depends(get_supabase_service),
+    log_index: LogRetrievalIndex = Depends(get_log_index),
+    token_quota: TokenQuota = Depends(get_token_quota),
+    authorization: str = Header(default=""),
+    token: str = Query(default="")
+):
+    """
+    Coach chat over a single WebSocket per chat session.
+    
+    Browsers can't set headers on the handshake, so the user's token may
+    also come as `?token=...` or in an auth frame; an invalid token in the
+    URL closes the socket with 1008.
+    
+    Client frames:
+      {"type": "auth", "token": "..."}   identify the user for later messages
+      {"type": "message", "message": "...", "history": [...], "user_context": {...}}
+      {"type": "cancel"}   abort the answer being streamed
+      {"type": "typing"}   accepted and ignored
+    Server frames:
+      {"type": "typing", "active": true|false}
+      {"type": "chunk", "content": "..."}
+      {"type": "done"} | {"type": "cancelled"} | {"type": "error", "error": "..."}
+    """
+    try:
+        user_id = await resolve_user_id(authorization or token)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    generation: Optional[asyncio.Task] = None
+    
+    async def respond(request: ChatRequest):
+        await websocket.send_json({"type": "typing", "active": True})
+        try:
+            cached = suggestion_cache.lookup(request.message, request.history, request.user_context)
+            if cached:
+                for chunk in stream_cached(cached):
+                    await websocket.send_json({"type": "chunk", "content": chunk})
+            else:
+                await token_quota.check(user_id, "chat", db)
+                token_quota.bind(user_id, "chat")
+                user_facts = await retrieve_user_facts(request.message, user_id, db, log_index)
+                stream = ai_service.chat_stream(
+                    message=request.message,
+                    history=request.history,
+                    user_context=request.user_context,
+                    user_facts=user_facts
+                )
+                chunks = []
+                try:
+                    async for chunk in stream:
+                        chunks.append(chunk)
+                        await websocket.send_json({"type": "chunk", "content": chunk})
+                finally:
+                    # Closes the upstream provider stream on cancel
+                    await stream.aclose()
+                cache_answer(suggestion_cache, request, user_facts, "".join(chunks), ai_service.finish_reason)
+            await websocket.send_json({"type": "done"})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await websocket.send_json({"type": "error", "error": str(e)})
+        await websocket.send_json({"type": "typing", "active": False})
+    
+    async def cancel_generation() -> bool:
+        if generation is None or generation.done():
+            return False
+        generation.cancel()
+        await asyncio.gather(generation, return_exceptions=True)
+        await websocket.send_json({"type": "cancelled"})
+        await websocket.send_json({"type": "typing", "active": False})
+        return True
+    
+    try:
+        while True:
+            try:
+                data = json.loads(await websocket.receive_text())
+            except json.JSONDecodeError:
+                await websocket.send_json({"type": "error", "error": "Invalid JSON"})
+                continue
+            
+            kind = data.get("type") if isinstance(data, dict) else None
+            if kind == "message":
+                try:
+                    request = ChatRequest(**data)
+                except ValidationError as e:
+                    await websocket.send_json({"type": "error", "error": str(e)})
+                    continue
+                # A new message supersedes an answer still streaming
+                await cancel_generation()
+                generation = asyncio.create_task(respond(request))
+            elif kind == "auth":
+                try:
+                    user_id = await resolve_user_id(str(data.get("token") or ""))
+                except HTTPException as e:
+                    await websocket.send_json({"type": "error", "error": e.detail})
+            elif kind == "cancel":
+                await cancel_generation()
+            elif kind == "typing":
+                continue
+            else:
+                await websocket.send_json({"type": "error", "error": f"Unknown frame type: {kind}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if generation and not generation.done():
+            generation.cancel()
+
+
 @router.get("/suggestions")
-async def get_suggestions():
+async def get_suggestions(
+    suggestion_cache: SuggestionCache = Depends(get_suggestion_cache)
+):
     """Get suggested questions for the chat"""
     return {
         "success": True,
-        "suggestions": [
-            "What's the best workout routine for building muscle?",
-            "How many calories should I eat to lose weight?",
-            "Can you explain proper squat form?",
-            "What should I eat before a workout?",
-            "How can I improve my sleep for better recovery?",
-            "What are the benefits of HIIT training?",
-            "How do I track my macros effectively?",
-            "What's a good stretching routine?"
-        ]
+        "suggestions": suggestion_cache.questions()
     }
+
+
+@router.post("/suggestions")
+async def register_suggestion(
+    suggestion: SuggestionCreate,
+    x_admin_key: str = Header(default=""),
+    ai_service: AIService = Depends(get_ai_service),
+    suggestion_cache: SuggestionCache = Depends(get_suggestion_cache)
+):
+    """
+    Register a suggested question (admin only, requires X-Admin-Key).
+    Without an answer, one is generated now and cached.
+    """
+    settings = get_settings()
+    if not settings.admin_api_key or not hmac.compare_digest(x_admin_key.encode(), settings.admin_api_key.encode()):
+        raise HTTPException(status_code=403, detail="Admin key required")
+    
+    try:
+        answer = suggestion.answer or await ai_service.chat(suggestion.question)
+        suggestion_cache.register(suggestion.question, answer)
+        return {"success": True, "question": suggestion.question, "answer": answer}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -3,12 +3,15 @@ Diet Router
 Endpoints for meal logging and nutrition tracking
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import date
 
+from app.services.log_retrieval import LogRetrievalIndex, get_log_index
 from app.services.supabase_service import SupabaseService
+from app.auth import get_user_id
+from app.conditional import user_data_etag
 from app.config import get_settings
 
 router = APIRouter()
@@ -46,18 +49,12 @@ def get_supabase_service() -> SupabaseService:
     return SupabaseService(settings)
 
 
-async def get_user_id(authorization: str = Header(...)) -> str:
-    """Extract user ID from authorization header"""
-    if authorization.startswith("Bearer "):
-        return authorization[7:]
-    return authorization
-
-
 @router.post("/log")
 async def create_meal_log(
     meal: MealLogCreate,
     user_id: str = Depends(get_user_id),
-    db: SupabaseService = Depends(get_supabase_service)
+    db: SupabaseService = Depends(get_supabase_service),
+    log_index: LogRetrievalIndex = Depends(get_log_index)
 ):
     """Log a new meal"""
     try:
@@ -77,19 +74,29 @@ async def create_meal_log(
         )
         
         # Update daily log with calories consumed
-        await db.update_daily_log(
+        daily_log = await db.update_daily_log(
             user_id=user_id,
             log_date=log_date,
             calories_consumed_add=meal.calories
         )
         
+        try:
+            await db.update_streak(user_id, "diet", log_date)
+        except Exception as e:
+            # The log is saved; keep it rather than failing the request
+            print(f"Streak update failed: {e}")
+        
+        # Keep the chat's view of the user's logs current
+        log_index.add_log(user_id, "diet", result)
+        log_index.add_log(user_id, "daily", daily_log)
+        
         return {"success": True, "data": result}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/logs")
+@router.get("/logs", dependencies=[Depends(user_data_etag)])
 async def get_meal_logs(
     limit: int = 20,
     offset: int = 0,
@@ -105,7 +112,7 @@ async def get_meal_logs(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/logs/today")
+@router.get("/logs/today", dependencies=[Depends(user_data_etag)])
 async def get_today_meals(
     user_id: str = Depends(get_user_id),
     db: SupabaseService = Depends(get_supabase_service)
@@ -141,17 +148,19 @@ async def get_today_meals(
 async def delete_meal_log(
     meal_id: str,
     user_id: str = Depends(get_user_id),
-    db: SupabaseService = Depends(get_supabase_service)
+    db: SupabaseService = Depends(get_supabase_service),
+    log_index: LogRetrievalIndex = Depends(get_log_index)
 ):
     """Delete a meal log"""
     try:
         await db.delete_diet_log(user_id, meal_id)
+        log_index.remove_log(user_id, meal_id)
         return {"success": True, "message": "Meal deleted"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/stats")
+@router.get("/stats", dependencies=[Depends(user_data_etag)])
 async def get_diet_stats(
     days: int = 7,
     user_id: str = Depends(get_user_id),
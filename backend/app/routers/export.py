@@ -0,0 +1,58 @@
+"""
+Export Router
+Download of a user's workout, meal, daily and weight history
+"""
+
+from datetime import date
+
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+
+from app.services.export import EXPORT_TABLES, FORMATS, export_csv, export_ndjson, gzip_chunks
+from app.services.supabase_service import SupabaseService
+from app.auth import get_user_id
+from app.config import get_settings
+
+router = APIRouter()
+
+
+def get_supabase_service() -> SupabaseService:
+    """Dependency to get Supabase service"""
+    settings = get_settings()
+    return SupabaseService(settings)
+
+
+@router.get("")
+async def export_history(
+    format: str = "csv",
+    tables: str = "workouts,meals",
+    gzip: bool = False,
+    user_id: str = Depends(get_user_id),
+    db: SupabaseService = Depends(get_supabase_service)
+):
+    """
+    Stream the user's history page by page, so memory stays flat however
+    long it is. `gzip=true` downloads a .gz file; otherwise the response is
+    still compressed on the wire when the client accepts it.
+    """
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(FORMATS)}")
+    selected = [t.strip() for t in tables.split(",") if t.strip()]
+    unknown = [t for t in selected if t not in EXPORT_TABLES]
+    if not selected or unknown:
+        raise HTTPException(status_code=400, detail=f"tables must be from: {', '.join(EXPORT_TABLES)}")
+
+    page_size = get_settings().export_page_size
+    export = export_csv if format == "csv" else export_ndjson
+    chunks = export(db, user_id, selected, page_size)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"fitbridge-{date.today().isoformat()}.{format}"
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        media_type = "application/gzip"
+        filename += ".gz"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
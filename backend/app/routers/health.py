@@ -3,10 +3,15 @@ Health Check Router
 Simple endpoints to verify API status
 """
 
-from fastapi import APIRouter
+import hmac
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 from datetime import datetime
 
 from app.config import get_settings
+from app.services.metrics import render_metrics
+from app.services.shared_state import get_shared_state
 
 router = APIRouter()
 
@@ -27,3 +32,15 @@ async def health_check():
 async def ping():
     """Simple ping endpoint for quick checks"""
     return {"pong": True}
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(authorization: str = Header(default="")):
+    """
+    Request, AI provider and database metrics of all workers in Prometheus text format.
+    Requires `Authorization: Bearer <METRICS_TOKEN>` when a metrics token is set.
+    """
+    token = get_settings().metrics_token
+    if token and not hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+        raise HTTPException(status_code=401, detail="Metrics token required")
+    return PlainTextResponse(render_metrics(get_shared_state()), media_type="text/plain; version=0.0.4")
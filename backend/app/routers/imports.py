@@ -0,0 +1,100 @@
+"""
+Import Router
+Upload of Apple Health and CSV exports into workout, daily and weight history
+"""
+
+import re
+import zlib
+from typing import Optional
+from xml.etree.ElementTree import ParseError
+
+from fastapi import APIRouter, HTTPException, Depends, Request
+
+from app.services.health_import import (
+    SOURCES, AppleHealthParser, CsvHistoryParser, HealthImporter, ImportProgress, progress_key
+)
+from app.services.log_retrieval import LogRetrievalIndex, get_log_index
+from app.services.shared_state import get_shared_state
+from app.services.supabase_service import SupabaseService
+from app.auth import get_user_id
+from app.config import get_settings
+
+router = APIRouter()
+
+IMPORT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def get_supabase_service() -> SupabaseService:
+    """Dependency to get Supabase service"""
+    settings = get_settings()
+    return SupabaseService(settings)
+
+
+def _public(record: dict) -> dict:
+    return {k: v for k, v in record.items() if k != "user_id"}
+
+
+@router.post("")
+async def import_history(
+    request: Request,
+    source: str = "apple_health",
+    import_id: Optional[str] = None,
+    user_id: str = Depends(get_user_id),
+    db: SupabaseService = Depends(get_supabase_service),
+    log_index: LogRetrievalIndex = Depends(get_log_index)
+):
+    """
+    Import an export sent as the raw request body (optionally with
+    Content-Encoding: gzip). The body is parsed as it arrives and rows are
+    written in batches, so memory stays flat. Pass your own `import_id` to
+    poll progress from another request while the upload runs.
+    """
+    if source not in SOURCES:
+        raise HTTPException(status_code=400, detail=f"source must be one of: {', '.join(SOURCES)}")
+    if import_id is not None and not IMPORT_ID_PATTERN.match(import_id):
+        raise HTTPException(status_code=400, detail="import_id must be 1-64 letters, digits, '-' or '_'")
+
+    length = request.headers.get("content-length", "")
+    progress = ImportProgress(
+        get_shared_state(), user_id, source, int(length) if length.isdigit() else None, import_id
+    )
+    parser = AppleHealthParser() if source == "apple_health" else CsvHistoryParser()
+    importer = HealthImporter(db, user_id, progress, get_settings().import_batch_size)
+    # 47: gzip or zlib header, detected automatically
+    decompressor = zlib.decompressobj(47) if request.headers.get("content-encoding") == "gzip" else None
+
+    try:
+        async for chunk in request.stream():
+            progress.record["bytes_read"] += len(chunk)
+            if decompressor:
+                chunk = decompressor.decompress(chunk)
+            for kind, row in parser.feed(chunk):
+                await importer.add(kind, row)
+            progress.save(force=False)
+        for kind, row in parser.close():
+            await importer.add(kind, row)
+        await importer.finish()
+    except (ParseError, zlib.error, KeyError, ValueError) as e:
+        progress.finish(error=f"Invalid {source} file: {e}")
+        raise HTTPException(status_code=400, detail=progress.record["error"])
+    except Exception as e:
+        progress.finish(error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Let the chat see imported history
+        log_index.invalidate(user_id)
+
+    progress.finish()
+    return {"success": True, "data": _public(progress.record)}
+
+
+@router.get("/{import_id}")
+async def get_import_progress(
+    import_id: str,
+    user_id: str = Depends(get_user_id)
+):
+    """Get progress of a running or recent import"""
+    record = get_shared_state().get(progress_key(user_id, import_id))
+    if not record:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return {"success": True, "data": _public(record)}
@@ -0,0 +1,119 @@
+"""
+Streaks Router
+Endpoints for activity streaks and the activity heatmap
+"""
+
+import base64
+from datetime import date, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from pydantic import BaseModel
+
+from app.services.streaks import ActivityStreak, STREAK_TYPES, HEATMAP_DAYS, present_streak
+from app.services.supabase_service import SupabaseService
+from app.auth import get_user_id
+from app.conditional import user_data_etag
+from app.config import get_settings
+
+router = APIRouter()
+
+
+class StreakActivity(BaseModel):
+    """Record streak activity request"""
+    streak_type: str
+    activity_date: Optional[str] = None  # ISO date or timestamp, default today
+
+
+def get_supabase_service() -> SupabaseService:
+    """Dependency to get Supabase service"""
+    settings = get_settings()
+    return SupabaseService(settings)
+
+
+@router.get("", dependencies=[Depends(user_data_etag)])
+async def get_streaks(
+    user_id: str = Depends(get_user_id),
+    db: SupabaseService = Depends(get_supabase_service)
+):
+    """Get current and longest streaks per streak type"""
+    try:
+        today = date.today()
+        rows = {row["streak_type"]: row for row in await db.get_user_streaks(user_id)}
+        streaks = [
+            present_streak(rows.get(streak_type) or {**ActivityStreak(streak_type).to_row(), "user_id": user_id}, today)
+            for streak_type in STREAK_TYPES
+        ]
+        return {"success": True, "data": streaks}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/heatmap", dependencies=[Depends(user_data_etag)])
+async def get_heatmap(
+    days: int = Query(default=HEATMAP_DAYS, ge=1, le=HEATMAP_DAYS),
+    user_id: str = Depends(get_user_id),
+    db: SupabaseService = Depends(get_supabase_service)
+):
+    """Get days with activity per streak type as base64 bitmaps"""
+    try:
+        today = date.today()
+        rows = {row["streak_type"]: row for row in await db.get_user_streaks(user_id)}
+        bitmaps = {}
+        for streak_type in STREAK_TYPES:
+            streak = ActivityStreak.from_row(rows[streak_type]) if streak_type in rows else ActivityStreak(streak_type)
+            bitmaps[streak_type] = base64.b64encode(streak.heatmap(today, days)).decode()
+        return {
+            "success": True,
+            "data": {
+                "start_date": (today - timedelta(days=days - 1)).isoformat(),
+                "days": days,
+                "bitmaps": bitmaps
+            }
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/activity")
+async def record_activity(
+    activity: StreakActivity,
+    user_id: str = Depends(get_user_id),
+    db: SupabaseService = Depends(get_supabase_service)
+):
+    """
+    Record a day of activity for a streak, for logs written outside the
+    API. Streaks are only written here, so the bitmap and counters agree.
+    """
+    if activity.streak_type not in STREAK_TYPES:
+        raise HTTPException(status_code=400, detail=f"streak_type must be one of: {', '.join(STREAK_TYPES)}")
+    if activity.activity_date:
+        try:
+            date.fromisoformat(activity.activity_date[:10])
+        except ValueError:
+            raise HTTPException(status_code=400, detail="activity_date must be an ISO date or timestamp")
+    try:
+        row = await db.update_streak(user_id, activity.streak_type, activity.activity_date)
+        return {"success": True, "data": present_streak(row, date.today())}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/rebuild")
+async def rebuild_streaks(
+    user_id: str = Depends(get_user_id),
+    db: SupabaseService = Depends(get_supabase_service)
+):
+    """Recompute workout and diet streaks from the full log history"""
+    try:
+        workouts = await db.get_workout_logs_since(user_id, date.min.isoformat())
+        meals = await db.get_diet_logs_since(user_id, date.min.isoformat())
+        rows = [
+            ActivityStreak.from_dates("workout", (date.fromisoformat(w["workout_date"][:10]) for w in workouts)).to_row(),
+            ActivityStreak.from_dates("diet", (date.fromisoformat(m["log_date"][:10]) for m in meals)).to_row()
+        ]
+        saved = await db.save_streaks(user_id, rows)
+        today = date.today()
+        return {"success": True, "data": [present_streak(row, today) for row in saved]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
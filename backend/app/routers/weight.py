@@ -0,0 +1,113 @@
+"""
+Weight Router
+Endpoints for weight logging and downsampled weight history
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from pydantic import BaseModel, Field
+
+from app.services.weight_series import AVERAGE_WINDOWS, DEFAULT_POINTS, MAX_POINTS, build_weight_series
+from app.services.supabase_service import SupabaseService
+from app.auth import get_user_id
+from app.conditional import user_data_etag
+from app.config import get_settings
+
+router = APIRouter()
+
+
+class WeightEntryCreate(BaseModel):
+    """Create weight entry request"""
+    weight: float = Field(gt=0, lt=1000)  # kg
+    recorded_at: Optional[datetime] = None
+    notes: Optional[str] = None
+
+
+def get_supabase_service() -> SupabaseService:
+    """Dependency to get Supabase service"""
+    settings = get_settings()
+    return SupabaseService(settings)
+
+
+def _parse_bound(value: Optional[str], name: str, end_of_day: bool = False) -> Optional[datetime]:
+    """ISO date or timestamp query value; a bare `to` date includes that whole day"""
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO date or timestamp")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    if end_of_day and len(value) == 10:
+        moment += timedelta(days=1, microseconds=-1)
+    return moment
+
+
+@router.post("/log")
+async def create_weight_entry(
+    entry: WeightEntryCreate,
+    user_id: str = Depends(get_user_id),
+    db: SupabaseService = Depends(get_supabase_service)
+):
+    """Log a weight reading"""
+    try:
+        recorded_at = entry.recorded_at
+        if recorded_at and recorded_at.tzinfo is None:
+            recorded_at = recorded_at.replace(tzinfo=timezone.utc)
+        result = await db.create_weight_entry(
+            user_id=user_id,
+            weight=round(entry.weight, 2),
+            recorded_at=recorded_at.isoformat() if recorded_at else None,
+            notes=entry.notes
+        )
+        return {"success": True, "data": result, "message": "Weight logged"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/history", dependencies=[Depends(user_data_etag)])
+async def get_weight_history(
+    start: Optional[str] = Query(default=None, alias="from"),
+    end: Optional[str] = Query(default=None, alias="to"),
+    points: int = Query(default=DEFAULT_POINTS, ge=3, le=MAX_POINTS),
+    user_id: str = Depends(get_user_id),
+    db: SupabaseService = Depends(get_supabase_service)
+):
+    """
+    Get weight readings in a range, downsampled to at most `points` with
+    LTTB so the chart keeps its peaks and dips, plus 7- and 30-day moving
+    averages computed over every reading.
+    """
+    range_start = _parse_bound(start, "from")
+    range_end = _parse_bound(end, "to", end_of_day=True)
+    try:
+        # Read back one average window so the first points' averages are complete
+        fetch_start = range_start - timedelta(days=max(AVERAGE_WINDOWS)) if range_start else None
+        entries = await db.get_weight_history(
+            user_id,
+            start=fetch_start.isoformat() if fetch_start else None,
+            end=range_end.isoformat() if range_end else None
+        )
+        series = build_weight_series(
+            entries, start=range_start.isoformat() if range_start else None, points=points
+        )
+        return {"success": True, "data": series}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/{entry_id}")
+async def delete_weight_entry(
+    entry_id: str,
+    user_id: str = Depends(get_user_id),
+    db: SupabaseService = Depends(get_supabase_service)
+):
+    """Delete a weight entry"""
+    try:
+        await db.delete_weight_entry(user_id, entry_id)
+        return {"success": True, "message": "Weight entry deleted"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
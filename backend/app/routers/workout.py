@@ -3,12 +3,15 @@ Workout Router
 Endpoints for workout logging and retrieval
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import date
 
+from app.services.log_retrieval import LogRetrievalIndex, get_log_index
 from app.services.supabase_service import SupabaseService
+from app.auth import get_user_id
+from app.conditional import user_data_etag
 from app.config import get_settings
 
 router = APIRouter()
@@ -44,20 +47,12 @@ def get_supabase_service() -> SupabaseService:
     return SupabaseService(settings)
 
 
-async def get_user_id(authorization: str = Header(...)) -> str:
-    """Extract user ID from authorization header"""
-    # In production, verify JWT and extract user_id
-    # For now, accept user_id directly for development
-    if authorization.startswith("Bearer "):
-        return authorization[7:]
-    return authorization
-
-
 @router.post("/log")
 async def create_workout_log(
     workout: WorkoutLogCreate,
     user_id: str = Depends(get_user_id),
-    db: SupabaseService = Depends(get_supabase_service)
+    db: SupabaseService = Depends(get_supabase_service),
+    log_index: LogRetrievalIndex = Depends(get_log_index)
 ):
     """Log a new workout session"""
     try:
@@ -76,20 +71,30 @@ async def create_workout_log(
         )
         
         # Update daily log
-        await db.update_daily_log(
+        daily_log = await db.update_daily_log(
             user_id=user_id,
             log_date=workout_date,
             workout_completed=True,
             calories_burned_add=workout.calories_burned or 0
         )
         
+        try:
+            await db.update_streak(user_id, "workout", workout_date)
+        except Exception as e:
+            # The log is saved; keep it rather than failing the request
+            print(f"Streak update failed: {e}")
+        
+        # Keep the chat's view of the user's logs current
+        log_index.add_log(user_id, "workout", result)
+        log_index.add_log(user_id, "daily", daily_log)
+        
         return {"success": True, "data": result}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/logs")
+@router.get("/logs", dependencies=[Depends(user_data_etag)])
 async def get_workout_logs(
     limit: int = 10,
     offset: int = 0,
@@ -104,7 +109,7 @@ async def get_workout_logs(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/logs/{workout_id}")
+@router.get("/logs/{workout_id}", dependencies=[Depends(user_data_etag)])
 async def get_workout_log(
     workout_id: str,
     user_id: str = Depends(get_user_id),
@@ -126,17 +131,19 @@ async def get_workout_log(
 async def delete_workout_log(
     workout_id: str,
     user_id: str = Depends(get_user_id),
-    db: SupabaseService = Depends(get_supabase_service)
+    db: SupabaseService = Depends(get_supabase_service),
+    log_index: LogRetrievalIndex = Depends(get_log_index)
 ):
     """Delete a workout log"""
     try:
         await db.delete_workout_log(user_id, workout_id)
+        log_index.remove_log(user_id, workout_id)
         return {"success": True, "message": "Workout deleted"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/stats")
+@router.get("/stats", dependencies=[Depends(user_data_etag)])
 async def get_workout_stats(
     days: int = 7,
     user_id: str = Depends(get_user_id),
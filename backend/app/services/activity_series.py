@@ -0,0 +1,102 @@
+"""
+Activity Series
+Per-day, week or month aggregates of daily logs for activity charts
+"""
+
+from datetime import date
+from typing import Optional, List, Dict, Any, Sequence
+
+# Metric -> daily_logs column
+METRICS = {
+    "calories_consumed": "calories_consumed",
+    "calories_burned": "calories_burned",
+    "steps": "steps",
+    "workout_adherence": "workout_completed"
+}
+
+BUCKETS = ("day", "week", "month")
+AGGREGATES = ("sum", "avg")
+
+# Longest range one request may cover (about ten years)
+MAX_RANGE_DAYS = 3660
+
+
+def bucket_index(days, bucket: str):
+    """
+    Bucket number of each consecutive calendar day and the first day of
+    each bucket. Weeks start on Monday and months on the 1st, so the first
+    and last buckets may be partly outside the range.
+    """
+    import numpy as np
+
+    if bucket == "day":
+        return np.arange(days.size), days
+    if bucket == "week":
+        # 1970-01-01 was a Thursday, weekday 3 counting from Monday
+        mondays = days - (days.astype(np.int64) + 3) % 7
+        index = (mondays - mondays[0]).astype(np.int64) // 7
+        return index, mondays[0] + 7 * np.arange(index[-1] + 1)
+    months = days.astype("datetime64[M]")
+    index = (months - months[0]).astype(np.int64)
+    return index, (months[0] + np.arange(index[-1] + 1)).astype("datetime64[D]")
+
+
+def build_activity_series(
+    rows: List[Dict[str, Any]],
+    metrics: Sequence[str],
+    bucket: str,
+    start: date,
+    end: date,
+    agg: str = "sum"
+) -> List[Dict[str, Any]]:
+    """
+    One point per bucket from `start` to `end`, buckets without logs
+    included. All metrics come from one pass over the rows and are
+    aggregated with bincount. `sum` totals each bucket and `avg` averages
+    over the days with a log (None when there are none).
+    `workout_adherence` is always the share of the bucket's days in range
+    with a completed workout.
+    """
+    import numpy as np
+
+    first = np.datetime64(start, "D")
+    days = np.arange(first, np.datetime64(end, "D") + 1)
+    day_bucket, labels = bucket_index(days, bucket)
+    size = labels.size
+    days_in_bucket = np.bincount(day_bucket, minlength=size)
+
+    columns = [METRICS[metric] for metric in metrics]
+    totals = np.zeros((len(columns), size))
+    logged = np.zeros(size, dtype=np.int64)
+    if rows:
+        offsets = (np.array([r["log_date"][:10] for r in rows], dtype="datetime64[D]") - first).astype(np.int64)
+        keep = (offsets >= 0) & (offsets < days.size)
+        index = day_bucket[offsets[keep]]
+        values = np.array([[r.get(column) or 0 for column in columns] for r in rows], dtype=np.float64)[keep]
+        logged = np.bincount(index, minlength=size)
+        for i in range(len(columns)):
+            totals[i] = np.bincount(index, weights=values[:, i], minlength=size)
+
+    series: Dict[str, List[Optional[float]]] = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for i, metric in enumerate(metrics):
+            if metric == "workout_adherence":
+                series[metric] = np.round(totals[i] / days_in_bucket, 3).tolist()
+            elif agg == "avg":
+                averages = np.round(totals[i] / logged, 1)
+                series[metric] = [None if n == 0 else v for v, n in zip(averages.tolist(), logged.tolist(), strict=True)]
+            else:
+                series[metric] = np.round(totals[i], 1).tolist()
+
+    dates = labels.astype(str).tolist()
+    counts = days_in_bucket.tolist()
+    logged_counts = logged.tolist()
+    return [
+        {
+            "date": dates[b],
+            "days": counts[b],
+            "days_logged": logged_counts[b],
+            **{metric: series[metric][b] for metric in metrics}
+        }
+        for b in range(size)
+    ]
@@ -3,10 +3,26 @@ AI Service
 Handles all AI operations with OpenAI/DeepSeek or Mock mode
 """
 
+import asyncio
 import json
+import time
+from functools import lru_cache
 from typing import Optional, List, Dict, Any, AsyncGenerator
 
 from app.config import Settings
+from app.services.compact_schema import (
+    WORKOUT_COMPACT_SCHEMA,
+    WORKOUT_DAY_COMPACT_SCHEMA,
+    DIET_COMPACT_SCHEMA,
+    expand_workout_plan,
+    expand_workout_day,
+    expand_diet_plan,
+)
+from app.services.log_retrieval import estimate_tokens
+from app.services.metrics import LLM_ERRORS, LLM_FIRST_TOKEN, LLM_LATENCY, record_llm_usage
+from app.services.model_router import ModelRouter
+from app.services.request_timing import record_span
+from app.services.token_quota import record_token_usage
 
 
 # Mock responses for testing without AI API
@@ -91,6 +107,66 @@ MOCK_DIET_PLAN = {
     }
 }
 
+MOCK_PROGRESS_ANALYSIS = {
+    "summary": "You're making great progress! Keep up the consistency.",
+    "achievements": [
+        "Completed 5 workouts this week",
+        "Met your protein goals 4 out of 7 days",
+        "Increased squat weight by 5kg"
+    ],
+    "recommendations": [
+        "Consider adding an extra rest day for recovery",
+        "Try to drink more water throughout the day",
+        "Focus on compound movements for efficiency"
+    ],
+    "score": 78
+}
+
+# Providers whose backend rejected stream_options; their streams are sent without it
+_stream_usage_rejected = set()
+
+
+@lru_cache(maxsize=4)
+def get_provider_client(
+    api_key: str,
+    base_url: Optional[str],
+    timeout: float,
+    max_retries: int
+):
+    """
+    AsyncOpenAI client shared by all AIService instances, so HTTP
+    connections to the provider are reused across requests. The mock and
+    simulated providers never create one, so the SDK is imported here.
+    """
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=max_retries)
+
+
+def extract_json(content: str) -> Any:
+    """Parse JSON from a completion, tolerating markdown code fences"""
+    try:
+        # Handle potential thinking tags or markdown code blocks
+        if "```json" in content:
+            content = content.split("```json")[1].split("```")[0].strip()
+        elif "```" in content:
+            content = content.split("```")[1].split("```")[0].strip()
+            
+        return json.loads(content)
+    except Exception as e:
+        raise ValueError(f"AI returned invalid JSON: {str(e)}")
+
+
+def format_user_facts(user_facts: Optional[List[str]]) -> str:
+    """System prompt section listing facts retrieved from the user's logs"""
+    if not user_facts:
+        return ""
+    lines = "\n".join(f"- {fact}" for fact in user_facts)
+    return f"""
+
+From the user's recent logs (use only if relevant):
+{lines}
+"""
+
 
 class AIService:
     """Service for AI-powered plan generation and chat"""
@@ -100,26 +176,83 @@ class AIService:
         self.provider = settings.ai_provider
         self.client = None
         self.model = None
+        # Why the last chat answer ended: "stop" when complete, "length" when
+        # cut at max_tokens, None when a stream ended before saying
+        self.finish_reason: Optional[str] = None
         
         # Configure client based on provider
         if self.provider == "mock":
             # Mock mode - no API calls
             pass
+        elif self.provider == "simulated":
+            # Local stand-in with realistic latency and failures
+            from app.services.simulated_provider import SimulatedAsyncOpenAI
+            self.client = SimulatedAsyncOpenAI.from_settings(settings)
+            self.model = "simulated"
         elif self.provider == "openai":
-            from openai import AsyncOpenAI
-            self.client = AsyncOpenAI(api_key=settings.openai_api_key)
+            self.client = get_provider_client(
+                settings.openai_api_key,
+                None,
+                settings.ai_timeout_seconds,
+                settings.ai_max_retries
+            )
             self.model = settings.openai_model
         else:  # deepseek
-            from openai import AsyncOpenAI
-            self.client = AsyncOpenAI(
-                api_key=settings.deepseek_api_key,
-                base_url=settings.deepseek_base_url
+            self.client = get_provider_client(
+                settings.deepseek_api_key,
+                settings.deepseek_base_url,
+                settings.ai_timeout_seconds,
+                settings.ai_max_retries
             )
             self.model = settings.deepseek_model
+        
+        self.router = ModelRouter(settings, self.model)
+    
+    async def _create(self, route: str, model: Optional[str] = None, **kwargs):
+        """Call the provider's chat completions API and record latency and usage for the route"""
+        model = model or self.model
+        started = time.perf_counter()
+        try:
+            response = await self.client.chat.completions.create(model=model, **kwargs)
+            self._record_usage(model, getattr(response, "usage", None))
+            return response
+        except Exception:
+            LLM_ERRORS.inc(self.provider, model or "unknown", route)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.router.record(route, model, elapsed)
+            LLM_LATENCY.observe(elapsed, self.provider, model or "unknown", route)
+            record_span(f"ai.{route}", elapsed)
+    
+    async def _open_stream(self, **kwargs):
+        """
+        Start a streamed completion, asking for a final usage chunk unless
+        disabled or the backend has rejected stream_options before. Without
+        it, usage of the stream is estimated.
+        """
+        if self.settings.ai_stream_usage and self.provider not in _stream_usage_rejected:
+            try:
+                return await self.client.chat.completions.create(stream_options={"include_usage": True}, **kwargs)
+            except Exception as e:
+                if getattr(e, "status_code", None) not in (400, 422):
+                    raise
+                stream = await self.client.chat.completions.create(**kwargs)
+                # Only blame stream_options once the same request works without it
+                _stream_usage_rejected.add(self.provider)
+                return stream
+        return await self.client.chat.completions.create(**kwargs)
+    
+    def _record_usage(self, model: Optional[str], usage) -> None:
+        """Count a call's tokens in metrics and against the tracked user's quota"""
+        if usage is None:
+            return
+        record_llm_usage(self.provider, model, usage)
+        record_token_usage(getattr(usage, "prompt_tokens", 0), getattr(usage, "completion_tokens", 0))
     
     def is_ready(self) -> bool:
         """Check if the AI service is properly configured"""
-        if self.provider == "mock":
+        if self.provider in ("mock", "simulated"):
             return True
         if self.provider == "openai":
             return bool(self.settings.openai_api_key)
@@ -128,10 +261,16 @@ class AIService:
     async def generate_workout_plan(
         self,
         user_description: str,
-        user_profile: Optional[Dict] = None
+        user_profile: Optional[Dict] = None,
+        fan_out: Optional[bool] = None,
+        compact: Optional[bool] = None
     ) -> Dict[str, Any]:
         """
-        Generate a personalized workout plan
+        Generate a personalized workout plan.
+        With fan_out, a short outline call picks the day titles and each day
+        is generated concurrently (defaults to settings.workout_fan_out).
+        With compact, the model answers in the short-key wire schema which is
+        expanded before returning (defaults to settings.compact_plan_schema).
         """
         # Mock mode
         if self.provider == "mock":
@@ -147,6 +286,15 @@ User Profile:
 - Fitness Level: {user_profile.get('fitness_level', 'Beginner')}
 """
         
+        if compact is None:
+            compact = self.settings.compact_plan_schema
+        if fan_out is None:
+            fan_out = self.settings.workout_fan_out
+        if fan_out:
+            plan = await self._generate_workout_plan_fan_out(user_description, profile_context, compact)
+            if plan:
+                return plan
+        
         system_prompt = """You are an elite fitness coach. Create serious, effective, and practical workout plans.
 Your output MUST be valid JSON matching this exact structure:
 {
@@ -168,6 +316,10 @@ Your output MUST be valid JSON matching this exact structure:
         }
     ]
 }"""
+        if compact:
+            system_prompt = f"""You are an elite fitness coach. Create serious, effective, and practical workout plans.
+Your output MUST be valid JSON matching this exact compact structure:
+{WORKOUT_COMPACT_SCHEMA}"""
         
         user_prompt = f"""{profile_context}
 Create a detailed workout plan based on these requirements: {user_description}
@@ -176,8 +328,8 @@ Structure the plan into days if appropriate for the goal/duration.
 The plan MUST contain real, executable physical exercises.
 Return ONLY valid JSON, no additional text."""
         
-        response = await self.client.chat.completions.create(
-            model=self.model,
+        response = await self._create(
+            "workout_plan",
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
@@ -187,18 +339,7 @@ Return ONLY valid JSON, no additional text."""
             max_tokens=2000
         )
         
-        content = response.choices[0].message.content
-        
-        try:
-            # Handle potential thinking tags or markdown code blocks
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0].strip()
-                
-            plan = json.loads(content)
-        except Exception as e:
-            raise ValueError(f"AI returned invalid JSON: {str(e)}")
+        plan = expand_workout_plan(extract_json(response.choices[0].message.content))
             
         # Handle case where AI returns a list instead of an object
         if isinstance(plan, list):
@@ -214,13 +355,141 @@ Return ONLY valid JSON, no additional text."""
         
         return plan
     
+    async def _generate_workout_plan_fan_out(
+        self,
+        user_description: str,
+        profile_context: str,
+        compact: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Outline the plan in one short call, then generate every day in parallel.
+        A failed day is retried once without discarding the days that succeeded.
+        Returns None if the outline is unusable or a day fails twice, so the
+        caller falls back to the single-call prompt.
+        """
+        max_days = self.settings.workout_fan_out_max_days
+        outline_prompt = f"""You are an elite fitness coach. Outline a workout plan.
+Your output MUST be valid JSON matching this exact structure:
+{{
+    "title": "Plan name",
+    "duration": "e.g., 4 weeks",
+    "difficulty": "Beginner/Intermediate/Advanced",
+    "days": ["Day 1: Chest & Triceps", "Day 2: Back & Biceps"]
+}}
+Use at most {max_days} days. Do not list exercises."""
+        
+        response = await self._create(
+            "workout_plan",
+            messages=[
+                {"role": "system", "content": outline_prompt},
+                {"role": "user", "content": f"""{profile_context}
+Outline a workout plan for: {user_description}
+Return ONLY valid JSON, no additional text."""}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.7,
+            max_tokens=300
+        )
+        try:
+            outline = extract_json(response.choices[0].message.content)
+        except ValueError:
+            return None
+        day_titles = [str(d) for d in (outline.get("days") or [])][:max_days] if isinstance(outline, dict) else []
+        if not day_titles:
+            return None
+        
+        def generate(titles):
+            return asyncio.gather(*[
+                self._generate_workout_day(
+                    user_description, profile_context, outline, day_titles, title, compact
+                )
+                for title in titles
+            ], return_exceptions=True)
+        
+        schedule = list(await generate(day_titles))
+        failed = [i for i, day in enumerate(schedule) if isinstance(day, Exception)]
+        if failed:
+            retried = await generate([day_titles[i] for i in failed])
+            if any(isinstance(day, Exception) for day in retried):
+                return None
+            for i, day in zip(failed, retried, strict=True):
+                schedule[i] = day
+        
+        return {
+            "title": outline.get("title", "AI Generated Plan"),
+            "duration": outline.get("duration", ""),
+            "difficulty": outline.get("difficulty", ""),
+            "schedule": schedule
+        }
+    
+    async def _generate_workout_day(
+        self,
+        user_description: str,
+        profile_context: str,
+        outline: Dict[str, Any],
+        day_titles: List[str],
+        day_title: str,
+        compact: bool = False
+    ) -> Dict[str, Any]:
+        """Generate the exercises for a single day of an outlined plan"""
+        system_prompt = f"""You are an elite fitness coach. Write one day of a workout plan.
+Your output MUST be valid JSON matching this exact structure:
+{{
+    "dayTitle": "{day_title}",
+    "exercises": [
+        {{
+            "name": "Exercise name",
+            "sets": 3,
+            "reps": "8-12",
+            "notes": "Form tips or variations",
+            "description": "Brief description of the exercise"
+        }}
+    ]
+}}"""
+        if compact:
+            system_prompt = f"""You are an elite fitness coach. Write one day of a workout plan.
+Your output MUST be valid JSON matching this exact compact structure:
+{WORKOUT_DAY_COMPACT_SCHEMA}"""
+        
+        user_prompt = f"""{profile_context}
+Plan: {outline.get('title', '')} ({outline.get('difficulty', '')}, {outline.get('duration', '')})
+Requirements: {user_description}
+All days in the plan: {'; '.join(day_titles)}
+
+Write the exercises for "{day_title}" only, avoiding overlap with the other days.
+Return ONLY valid JSON, no additional text."""
+        
+        response = await self._create(
+            "workout_plan",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.7,
+            max_tokens=700
+        )
+        
+        day = extract_json(response.choices[0].message.content)
+        if compact:
+            day = expand_workout_day(day)
+        if not isinstance(day, dict):
+            day = {"exercises": day if isinstance(day, list) else []}
+        day["dayTitle"] = day_title
+        if not isinstance(day.get("exercises"), list):
+            day["exercises"] = []
+        return day
+    
     async def generate_diet_plan(
         self,
         user_description: str,
-        user_profile: Optional[Dict] = None
+        user_profile: Optional[Dict] = None,
+        compact: Optional[bool] = None
     ) -> Dict[str, Any]:
         """
-        Generate a personalized diet plan
+        Generate a personalized diet plan.
+        With compact, the model answers in the short-key wire schema which is
+        expanded before returning (defaults to settings.compact_plan_schema).
         """
         # Mock mode
         if self.provider == "mock":
@@ -258,6 +527,12 @@ Your output MUST be valid JSON matching this exact structure:
         "snack": { ... }
     }
 }"""
+        if compact is None:
+            compact = self.settings.compact_plan_schema
+        if compact:
+            system_prompt = f"""You are a professional nutritionist. Create balanced, healthy meal plans with accurate macro calculations.
+Your output MUST be valid JSON matching this exact compact structure:
+{DIET_COMPACT_SCHEMA}"""
         
         user_prompt = f"""{profile_context}
 Generate a daily diet plan for: {user_description}
@@ -265,8 +540,8 @@ Generate a daily diet plan for: {user_description}
 Ensure all meals are practical and include accurate nutritional information.
 Return ONLY valid JSON, no additional text."""
         
-        response = await self.client.chat.completions.create(
-            model=self.model,
+        response = await self._create(
+            "diet_plan",
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
@@ -276,20 +551,22 @@ Return ONLY valid JSON, no additional text."""
             max_tokens=1500
         )
         
-        content = response.choices[0].message.content
-        return json.loads(content)
+        return expand_diet_plan(extract_json(response.choices[0].message.content))
     
     async def chat(
         self,
         message: str,
         history: Optional[List[Dict]] = None,
-        user_context: Optional[Dict] = None
+        user_context: Optional[Dict] = None,
+        user_facts: Optional[List[str]] = None
     ) -> str:
         """
         Chat with the AI fitness coach
+        user_facts are short lines from the user's own logs relevant to the message
         """
         # Mock mode
         if self.provider == "mock":
+            self.finish_reason = "stop"
             return f"""Great question! As your AI fitness coach, here are my thoughts:
 
 Based on your question about "{message[:50]}...", I'd recommend focusing on:
@@ -319,6 +596,8 @@ User Context:
 - Fitness Level: {user_context.get('fitness_level', 'Beginner')}
 """
         
+        system_prompt += format_user_facts(user_facts)
+        
         messages = [{"role": "system", "content": system_prompt}]
         
         # Add history
@@ -333,24 +612,28 @@ User Context:
         # Add current message
         messages.append({"role": "user", "content": message})
         
-        response = await self.client.chat.completions.create(
-            model=self.model,
+        response = await self._create(
+            "chat",
+            model=self.router.select("chat", message, history, user_context),
             messages=messages,
             temperature=0.8,
             max_tokens=1000
         )
         
+        self.finish_reason = getattr(response.choices[0], "finish_reason", None)
         return response.choices[0].message.content
     
     async def chat_stream(
         self,
         message: str,
         history: Optional[List[Dict]] = None,
-        user_context: Optional[Dict] = None
+        user_context: Optional[Dict] = None,
+        user_facts: Optional[List[str]] = None
     ) -> AsyncGenerator[str, None]:
         """
         Stream chat response from the AI fitness coach
         """
+        self.finish_reason = None
         # Mock mode - yield chunks to simulate streaming
         if self.provider == "mock":
             mock_response = f"""Great question about "{message[:30]}..."! 
@@ -366,10 +649,12 @@ Let me know if you need more specific advice!"""
             
             for chunk in mock_response.split(" "):
                 yield chunk + " "
+            self.finish_reason = "stop"
             return
         
         system_prompt = """You are an expert AI fitness coach. Be helpful, accurate, and supportive.
 Provide advice on workouts, nutrition, recovery, and motivation. Keep responses conversational."""
+        system_prompt += format_user_facts(user_facts)
         
         messages = [{"role": "system", "content": system_prompt}]
         
@@ -383,17 +668,48 @@ Provide advice on workouts, nutrition, recovery, and motivation. Keep responses
         
         messages.append({"role": "user", "content": message})
         
-        stream = await self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=0.8,
-            max_tokens=1000,
-            stream=True
-        )
-        
-        async for chunk in stream:
-            if chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
+        model = self.router.select("chat_stream", message, history, user_context)
+        labels = (self.provider, model or "unknown", "chat_stream")
+        started = time.perf_counter()
+        first_token = False
+        usage_seen = False
+        streamed = []
+        try:
+            stream = await self._open_stream(
+                model=model,
+                messages=messages,
+                temperature=0.8,
+                max_tokens=1000,
+                stream=True
+            )
+            
+            async for chunk in stream:
+                # The final chunk carries usage and no choices
+                if getattr(chunk, "usage", None):
+                    usage_seen = True
+                    self._record_usage(model, chunk.usage)
+                if chunk.choices and getattr(chunk.choices[0], "finish_reason", None):
+                    self.finish_reason = chunk.choices[0].finish_reason
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if not first_token:
+                        first_token = True
+                        LLM_FIRST_TOKEN.observe(time.perf_counter() - started, *labels)
+                    streamed.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        except Exception:
+            LLM_ERRORS.inc(*labels)
+            raise
+        finally:
+            if not usage_seen and streamed:
+                # Stream cut short before the usage chunk, estimate what was used
+                record_token_usage(
+                    sum(estimate_tokens(m["content"]) for m in messages),
+                    estimate_tokens("".join(streamed))
+                )
+            elapsed = time.perf_counter() - started
+            self.router.record("chat_stream", model, elapsed)
+            LLM_LATENCY.observe(elapsed, *labels)
+            record_span("ai.chat_stream", elapsed)
     
     async def analyze_progress(
         self,
@@ -404,31 +720,18 @@ Provide advice on workouts, nutrition, recovery, and motivation. Keep responses
         """
         # Mock mode
         if self.provider == "mock":
-            return {
-                "summary": "You're making great progress! Keep up the consistency.",
-                "achievements": [
-                    "Completed 5 workouts this week",
-                    "Met your protein goals 4 out of 7 days",
-                    "Increased squat weight by 5kg"
-                ],
-                "recommendations": [
-                    "Consider adding an extra rest day for recovery",
-                    "Try to drink more water throughout the day",
-                    "Focus on compound movements for efficiency"
-                ],
-                "score": 78
-            }
+            return MOCK_PROGRESS_ANALYSIS
         
         system_prompt = """You are a fitness analyst. Analyze user progress data and provide insights.
 Return JSON with: summary (string), achievements (array), recommendations (array), and score (0-100)."""
         
         user_prompt = f"""Analyze this fitness progress data and provide insights:
-{json.dumps(user_data, indent=2)}
+{json.dumps(user_data, separators=(",", ":"))}
 
 Return insights in JSON format."""
         
-        response = await self.client.chat.completions.create(
-            model=self.model,
+        response = await self._create(
+            "progress",
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
@@ -0,0 +1,154 @@
+"""
+Batch Plans
+Off-peak precomputation of the next day's diet plans for opted-in users
+
+Run once from the command line (from backend/):
+    python -m app.services.batch_plans --date 2026-01-31 --fake
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any
+
+from app.config import Settings, get_settings
+from app.services.ai_service import AIService
+from app.services.shared_state import get_shared_state
+from app.services.supabase_service import SupabaseService
+
+
+class DailyPlanBatch:
+    """
+    Generates one diet plan per opted-in user for a given date.
+    Users are paged by ID and processed with bounded concurrency. Users who
+    already have a plan for the date are skipped, so an interrupted run can
+    simply be started again.
+    """
+
+    def __init__(
+        self,
+        db: SupabaseService,
+        ai_service: AIService,
+        concurrency: int = 4,
+        page_size: int = 200
+    ):
+        self.db = db
+        self.ai_service = ai_service
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.progress: Dict[str, Any] = {}
+
+    async def run(self, plan_date: str) -> Dict[str, Any]:
+        """Generate missing plans for plan_date and return run statistics"""
+        started = time.perf_counter()
+        self.progress = {
+            "plan_date": plan_date,
+            "users": 0,
+            "generated": 0,
+            "skipped": 0,
+            "failed": 0,
+            "last_user_id": None
+        }
+        done = await self.db.get_planned_user_ids("diet", plan_date)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def generate(user: Dict[str, Any]) -> None:
+            async with semaphore:
+                try:
+                    await self._generate_for_user(user, plan_date)
+                    self.progress["generated"] += 1
+                except Exception as e:
+                    self.progress["failed"] += 1
+                    print(f"Daily plan failed for user {user['id']}: {e}")
+
+        after_id = None
+        while True:
+            users = await self.db.get_daily_plan_users(limit=self.page_size, after_id=after_id)
+            if not users:
+                break
+            self.progress["users"] += len(users)
+            pending = [u for u in users if u["id"] not in done]
+            self.progress["skipped"] += len(users) - len(pending)
+            await asyncio.gather(*[generate(u) for u in pending])
+            after_id = users[-1]["id"]
+            self.progress["last_user_id"] = after_id
+
+        self.progress["seconds"] = round(time.perf_counter() - started, 2)
+        return self.progress
+
+    async def _generate_for_user(self, user: Dict[str, Any], plan_date: str) -> None:
+        description = user.get("daily_plan_prompt") or (
+            f"Daily meal plan for {user.get('goal') or 'general health'}"
+        )
+        plan = await self.ai_service.generate_diet_plan(description, user)
+        await self.db.save_ai_plan(
+            user_id=user["id"],
+            plan_type="diet",
+            title=f"Daily plan {plan_date}",
+            plan_data=plan,
+            prompt_used=description,
+            generated_by=self.ai_service.provider,
+            plan_date=plan_date
+        )
+
+
+def tomorrow_utc() -> str:
+    """Date after today in UTC, the day the nightly batch plans for"""
+    return (datetime.now(timezone.utc).date() + timedelta(days=1)).isoformat()
+
+
+def seconds_until_hour(hour_utc: int, now: Optional[datetime] = None) -> float:
+    """Seconds from now until the next occurrence of hour_utc:00 UTC"""
+    now = now or datetime.now(timezone.utc)
+    target = now.replace(hour=hour_utc, minute=0, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+async def run_daily_schedule(settings: Settings) -> None:
+    """
+    Run the batch for the next day at batch_plans_hour_utc, every day.
+    With several workers only the one that claims the date runs it.
+    """
+    while True:
+        await asyncio.sleep(seconds_until_hour(settings.batch_plans_hour_utc))
+        plan_date = tomorrow_utc()
+        if not get_shared_state().add(f"batch_plans:{plan_date}", os.getpid(), 86400):
+            continue
+        try:
+            batch = DailyPlanBatch(
+                SupabaseService(settings),
+                AIService(settings),
+                concurrency=settings.batch_plans_concurrency
+            )
+            stats = await batch.run(plan_date)
+            print(f"Daily plan batch finished: {stats}")
+        except Exception as e:
+            print(f"Daily plan batch failed: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute daily diet plans for opted-in users")
+    parser.add_argument("--date", help="Plan date (YYYY-MM-DD), defaults to tomorrow")
+    parser.add_argument("--concurrency", type=int, help="Concurrent generations")
+    parser.add_argument("--fake", action="store_true", help="Use the local mock AI provider")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    if args.fake:
+        settings = settings.model_copy(update={"ai_provider": "mock"})
+    plan_date = args.date or tomorrow_utc()
+
+    batch = DailyPlanBatch(
+        SupabaseService(settings),
+        AIService(settings),
+        concurrency=args.concurrency or settings.batch_plans_concurrency
+    )
+    print(asyncio.run(batch.run(plan_date)))
+
+
+if __name__ == "__main__":
+    main()
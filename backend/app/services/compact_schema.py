@@ -0,0 +1,97 @@
+"""
+Compact Plan Schema
+Short-key wire format requested from the model and expanded server-side
+into the regular plan response shape
+"""
+
+from typing import List, Dict, Any
+
+
+# Exercises and meals are positional arrays, which removes the repeated
+# keys that make up most of the output tokens in the verbose format.
+WORKOUT_COMPACT_SCHEMA = """{
+    "t": "Plan name",
+    "du": "e.g., 4 weeks",
+    "df": "Beginner/Intermediate/Advanced",
+    "s": [
+        {
+            "d": "Day 1: Chest & Triceps",
+            "e": [["Exercise name", 3, "8-12", "Form tips or variations", "Brief description"]]
+        }
+    ]
+}
+Each exercise is [name, sets, reps, notes, description]."""
+
+WORKOUT_DAY_COMPACT_SCHEMA = """{
+    "d": "Day title",
+    "e": [["Exercise name", 3, "8-12", "Form tips or variations", "Brief description"]]
+}
+Each exercise is [name, sets, reps, notes, description]."""
+
+DIET_COMPACT_SCHEMA = """{
+    "c": 2000,
+    "m": [150, 200, 65],
+    "ml": {
+        "b": ["Meal name", 500, 30, 50, 15, "Detailed description with portions"],
+        "l": [...],
+        "d": [...],
+        "s": [...]
+    }
+}
+"m" is [protein, carbs, fats] in grams. Each meal is [name, calories, protein, carbs, fats, description].
+Meal keys: b=breakfast, l=lunch, d=dinner, s=snack."""
+
+EXERCISE_FIELDS = ("name", "sets", "reps", "notes", "description")
+MEAL_FIELDS = ("name", "calories", "protein", "carbs", "fats", "description")
+MEAL_KEYS = {"b": "breakfast", "l": "lunch", "d": "dinner", "s": "snack"}
+
+
+def _expand_row(row: Any, fields: tuple) -> Dict[str, Any]:
+    """
+    Map a positional array onto field names (dicts pass through). Models
+    often drop trailing optional fields, so short rows are expected.
+    """
+    if isinstance(row, dict):
+        return row
+    if not isinstance(row, list):
+        return {}
+    return {field: value for field, value in zip(fields, row, strict=False)}
+
+
+def expand_workout_day(day: Any) -> Dict[str, Any]:
+    """Expand a compact day into {dayTitle, exercises}"""
+    if not isinstance(day, dict):
+        return {"dayTitle": "", "exercises": []}
+    if "exercises" in day:
+        return day
+    exercises: List[Dict[str, Any]] = [
+        _expand_row(row, EXERCISE_FIELDS) for row in day.get("e") or []
+    ]
+    return {"dayTitle": day.get("d", ""), "exercises": [e for e in exercises if e]}
+
+
+def expand_workout_plan(data: Any) -> Any:
+    """Expand a compact workout plan; anything without compact keys is returned unchanged"""
+    if not isinstance(data, dict) or "schedule" in data or not ("s" in data or "t" in data):
+        return data
+    return {
+        "title": data.get("t", "AI Generated Plan"),
+        "duration": data.get("du", ""),
+        "difficulty": data.get("df", ""),
+        "schedule": [expand_workout_day(day) for day in data.get("s") or []]
+    }
+
+
+def expand_diet_plan(data: Any) -> Any:
+    """Expand a compact diet plan; anything without compact keys is returned unchanged"""
+    if not isinstance(data, dict) or "meals" in data or not ("ml" in data or "c" in data):
+        return data
+    macros = data.get("m") or []
+    return {
+        "dailyCalories": data.get("c", 0),
+        "macros": _expand_row(macros, ("protein", "carbs", "fats")),
+        "meals": {
+            MEAL_KEYS.get(key, key): _expand_row(meal, MEAL_FIELDS)
+            for key, meal in (data.get("ml") or {}).items()
+        }
+    }
@@ -0,0 +1,258 @@
+"""
+Response Compression
+Negotiated gzip/brotli for HTTP responses, with a cache of compressed bodies
+"""
+
+import hashlib
+import time
+import zlib
+from collections import OrderedDict
+from typing import Optional, List, Tuple
+
+from app.config import get_settings
+from app.services.metrics import COMPRESSION_BYTES, COMPRESSION_CACHE, COMPRESSION_SECONDS
+
+# brotli is optional and imported on first use; without it only gzip is offered
+
+
+# Content types worth compressing; anything else (images, archives) passes through
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/xml", "application/javascript")
+# Server-sent events must reach the client event by event
+STREAMING_TYPES = ("text/event-stream",)
+
+_brotli_module = None
+
+
+def _brotli():
+    """The brotli module, or None when it is not installed"""
+    global _brotli_module
+    if _brotli_module is None:
+        try:
+            import brotli
+            _brotli_module = brotli
+        except ImportError:
+            _brotli_module = False
+    return _brotli_module or None
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """Encodings this process can produce, preferred first"""
+    return ("br", "gzip") if _brotli() else ("gzip",)
+
+
+def negotiate(accept_encoding: str, available: Tuple[str, ...]) -> Optional[str]:
+    """
+    Pick the encoding for an Accept-Encoding header: highest q-value,
+    ties going to the earlier entry of `available`. None means identity.
+    """
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a whole body at the configured level"""
+    settings = get_settings()
+    if encoding == "br":
+        return _brotli().compress(body, quality=settings.compression_brotli_quality)
+    compressor = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+class StreamCompressor:
+    """Incremental compressor that flushes each chunk so nothing is held back"""
+
+    def __init__(self, encoding: str):
+        settings = get_settings()
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = _brotli().Compressor(quality=settings.compression_brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes, final: bool = False) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressedBodyCache:
+    """
+    Compressed bodies keyed by a hash of the uncompressed body, so a payload
+    served repeatedly (cached plans, mock plans, suggestions) is compressed
+    once. Hashing costs a small fraction of compressing. Bounded by the
+    total size of the compressed bodies, least recently used evicted first.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Tuple[bytes, str], bytes]" = OrderedDict()
+
+    def get_or_compress(self, body: bytes, encoding: str) -> bytes:
+        key = (hashlib.sha256(body).digest(), encoding)
+        compressed = self._entries.get(key)
+        if compressed is not None:
+            self._entries.move_to_end(key)
+            COMPRESSION_CACHE.inc("hit")
+            return compressed
+
+        COMPRESSION_CACHE.inc("miss")
+        started = time.perf_counter()
+        compressed = compress(body, encoding)
+        COMPRESSION_SECONDS.inc(encoding, amount=time.perf_counter() - started)
+        if len(compressed) <= self.max_bytes:
+            self._entries[key] = compressed
+            self.size += len(compressed)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+        return compressed
+
+
+def _is_compressible(status: int, headers: List[Tuple[bytes, bytes]]) -> bool:
+    if status < 200 or status in (204, 304):
+        return False
+    content_type = ""
+    for key, value in headers:
+        if key == b"content-encoding":
+            return False
+        if key == b"content-type":
+            content_type = value.decode("latin-1").lower()
+    if content_type.startswith(STREAMING_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _vary_on_encoding(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """
+    Headers with Accept-Encoding added to Vary. Every response that could
+    have been compressed needs it, including ones sent uncompressed, or a
+    shared cache may hand an identity body to a client asking for gzip.
+    """
+    result = []
+    vary = b"Accept-Encoding"
+    for key, value in headers:
+        if key == b"vary":
+            if b"accept-encoding" in value.lower():
+                return headers
+            vary = value + b", Accept-Encoding"
+            continue
+        result.append((key, value))
+    result.append((b"vary", vary))
+    return result
+
+
+def _with_encoding(headers: List[Tuple[bytes, bytes]], encoding: str, length: Optional[int]) -> List[Tuple[bytes, bytes]]:
+    """Response headers for the compressed body; strong ETags become weak"""
+    result = []
+    for key, value in _vary_on_encoding(headers):
+        if key == b"content-length":
+            continue
+        if key == b"etag" and not value.startswith(b"W/"):
+            value = b"W/" + value
+        result.append((key, value))
+    result.append((b"content-encoding", encoding.encode()))
+    if length is not None:
+        result.append((b"content-length", str(length).encode()))
+    return result
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing response bodies of at least
+    `compression_min_bytes` with the client's preferred encoding. Whole
+    bodies go through the compressed body cache. Streamed bodies (exports)
+    are compressed chunk by chunk with a flush after each, and server-sent
+    events are left alone so every event is delivered as it happens.
+    Responses of a compressible type carry `Vary: Accept-Encoding` whether
+    or not they end up compressed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.cache = CompressedBodyCache(get_settings().compression_cache_bytes)
+
+    async def __call__(self, scope, receive, send):
+        settings = get_settings()
+        if scope["type"] != "http" or not settings.compression_enabled or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ""
+        for key, value in scope.get("headers", []):
+            if key == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+        encoding = negotiate(accept_encoding, available_encodings()) if accept_encoding else None
+        if encoding is None:
+            async def send_identity(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    if _is_compressible(message["status"], headers):
+                        message = {**message, "headers": _vary_on_encoding(headers)}
+                await send(message)
+
+            await self.app(scope, receive, send_identity)
+            return
+
+        start_message = None
+        # None until the first body message decides: "identity", "whole" or a StreamCompressor
+        mode = None
+
+        async def send_wrapper(message):
+            nonlocal start_message, mode
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or mode == "identity":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if mode is None:
+                headers = list(start_message.get("headers", []))
+                if not _is_compressible(start_message["status"], headers):
+                    mode = "identity"
+                    await send(start_message)
+                    await send(message)
+                    return
+                if not more_body and len(body) < settings.compression_min_bytes:
+                    mode = "identity"
+                    await send({**start_message, "headers": _vary_on_encoding(headers)})
+                    await send(message)
+                    return
+                if not more_body:
+                    mode = "whole"
+                    compressed = self.cache.get_or_compress(body, encoding)
+                    COMPRESSION_BYTES.inc(encoding, "raw", amount=len(body))
+                    COMPRESSION_BYTES.inc(encoding, "sent", amount=len(compressed))
+                    await send({**start_message, "headers": _with_encoding(headers, encoding, len(compressed))})
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                mode = StreamCompressor(encoding)
+                await send({**start_message, "headers": _with_encoding(headers, encoding, None)})
+
+            started = time.perf_counter()
+            compressed = mode.chunk(body, final=not more_body)
+            COMPRESSION_SECONDS.inc(encoding, amount=time.perf_counter() - started)
+            COMPRESSION_BYTES.inc(encoding, "raw", amount=len(body))
+            COMPRESSION_BYTES.inc(encoding, "sent", amount=len(compressed))
+            await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,93 @@
+"""
+Data Version
+Per-user counter bumped by every database write, used to answer conditional GETs
+"""
+
+import functools
+import hashlib
+import time
+from datetime import date
+from functools import lru_cache
+from typing import Optional
+
+from app.services.shared_state import SharedState, get_shared_state
+
+
+class DataVersions:
+    """
+    Version of each user's data in shared state, so all workers agree on it.
+    Used with the in-memory store; with Supabase the version is kept in the
+    `data_versions` table by triggers, which also see writes clients make
+    directly. A user's counter starts at the current time in milliseconds rather than
+    0, so a counter lost to a restart or eviction never goes back to a value
+    an old ETag was built from.
+    """
+
+    def __init__(self, state: Optional[SharedState] = None):
+        self.state = state or get_shared_state()
+
+    def current(self, user_id: str) -> int:
+        """The user's data version, starting a counter if there is none"""
+        version = self.state.get(self._key(user_id))
+        if version is None:
+            self.state.add(self._key(user_id), self._start())
+            version = self.state.get(self._key(user_id))
+        return version
+
+    def bump(self, user_id: str) -> int:
+        """Mark the user's data as changed, returns the new version"""
+        self.state.add(self._key(user_id), self._start())
+        return self.state.incr(self._key(user_id))
+
+    def etag(self, user_id: str) -> str:
+        """Weak ETag of the user's data as of today"""
+        return data_etag(user_id, self.current(user_id))
+
+    @staticmethod
+    def _key(user_id: str) -> str:
+        return f"data_version:{user_id}"
+
+    @staticmethod
+    def _start() -> int:
+        return int(time.time() * 1000)
+
+
+def data_etag(user_id: str, version: int) -> str:
+    """
+    Weak ETag of a user's data version as of today. The date is included
+    because stats and today's meals change at midnight without a write.
+    """
+    user = hashlib.blake2s(user_id.encode(), digest_size=4).hexdigest()
+    return f'W/"{user}.{version:x}.{date.today():%Y%m%d}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def bumps_data_version(method):
+    """
+    Decorator for in-memory store writes: bump the data version of the
+    `user_id` written to. Supabase writes are counted by database triggers.
+    """
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        if not self.is_mock:
+            return await method(self, *args, **kwargs)
+        user_id = kwargs["user_id"] if "user_id" in kwargs else args[0]
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            # Also after a failure, which may have written part of the change
+            get_data_versions().bump(user_id)
+    return wrapper
+
+
+@lru_cache()
+def get_data_versions() -> DataVersions:
+    """Process-wide data versions shared by SupabaseService and the read endpoints"""
+    return DataVersions()
@@ -0,0 +1,132 @@
+"""
+Export
+Streams a user's history as CSV or NDJSON, one keyset page at a time
+"""
+
+import csv
+import io
+import json
+import zlib
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+
+from app.services.supabase_service import EXPORT_DATE_COLUMNS
+
+
+# Export name -> database table
+EXPORT_TABLES = {
+    "workouts": "workout_logs",
+    "meals": "diet_logs",
+    "daily": "daily_logs",
+    "weight": "weight_history"
+}
+
+# CSV columns per export table; workouts get one row per exercise set
+CSV_COLUMNS = {
+    "workouts": [
+        "id", "workout_date", "title", "workout_type", "duration_minutes", "calories_burned",
+        "notes", "is_ai_generated", "created_at", "exercise", "set_number", "reps", "weight"
+    ],
+    "meals": [
+        "id", "log_date", "meal_type", "meal_name", "calories", "protein", "carbs", "fats",
+        "description", "is_ai_generated", "created_at"
+    ],
+    "daily": [
+        "id", "log_date", "calories_consumed", "calories_burned", "steps", "water_intake",
+        "sleep_hours", "workout_completed", "notes"
+    ],
+    "weight": ["id", "recorded_at", "weight", "notes"]
+}
+
+FORMATS = ("csv", "ndjson")
+
+
+async def iter_pages(db, table: str, user_id: str, page_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Pages of a user's rows of one export table, oldest first"""
+    db_table = EXPORT_TABLES[table]
+    date_column = EXPORT_DATE_COLUMNS[db_table]
+    after: Optional[Tuple[str, str]] = None
+    while True:
+        rows = await db.get_export_page(db_table, user_id, after=after, limit=page_size)
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        after = (rows[-1][date_column], rows[-1]["id"])
+
+
+def exercise_sets(exercises) -> List[Dict[str, Any]]:
+    """
+    One entry per set of a workout's `exercises` JSON. `sets` may be a
+    count (plans: {"name", "sets": 3, "reps": "10"}) or a list of set
+    objects ({"reps", "weight"}). Workouts without exercises get one empty entry.
+    """
+    result = []
+    for exercise in exercises or []:
+        if not isinstance(exercise, dict):
+            continue
+        name = exercise.get("name")
+        sets = exercise.get("sets")
+        if isinstance(sets, list):
+            for number, done in enumerate(sets, start=1):
+                done = done if isinstance(done, dict) else {"reps": done}
+                result.append({"exercise": name, "set_number": number,
+                               "reps": done.get("reps", exercise.get("reps")),
+                               "weight": done.get("weight", exercise.get("weight"))})
+        elif isinstance(sets, int) and sets > 0:
+            for number in range(1, sets + 1):
+                result.append({"exercise": name, "set_number": number,
+                               "reps": exercise.get("reps"), "weight": exercise.get("weight")})
+        else:
+            result.append({"exercise": name, "set_number": None,
+                           "reps": exercise.get("reps"), "weight": exercise.get("weight")})
+    return result or [{}]
+
+
+def csv_header(tables: List[str]) -> List[str]:
+    """`table` followed by the union of the tables' columns, in order"""
+    header = ["table"]
+    for table in tables:
+        header.extend(column for column in CSV_COLUMNS[table] if column not in header)
+    return header
+
+
+async def export_csv(db, user_id: str, tables: List[str], page_size: int) -> AsyncIterator[bytes]:
+    """CSV of the tables in one sheet, a chunk per page"""
+    header = csv_header(tables)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=header, extrasaction="ignore", lineterminator="\n")
+    writer.writeheader()
+    yield buffer.getvalue().encode()
+
+    for table in tables:
+        async for rows in iter_pages(db, table, user_id, page_size):
+            buffer.seek(0)
+            buffer.truncate()
+            for row in rows:
+                if table == "workouts":
+                    for exercise_set in exercise_sets(row.get("exercises")):
+                        writer.writerow({**row, **exercise_set, "table": table})
+                else:
+                    writer.writerow({**row, "table": table})
+            yield buffer.getvalue().encode()
+
+
+async def export_ndjson(db, user_id: str, tables: List[str], page_size: int) -> AsyncIterator[bytes]:
+    """One JSON object per row with its `table`, a chunk per page"""
+    for table in tables:
+        async for rows in iter_pages(db, table, user_id, page_size):
+            yield "".join(
+                json.dumps({"table": table, **{k: v for k, v in row.items() if k != "user_id"}}, default=str) + "\n"
+                for row in rows
+            ).encode()
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """Gzip a stream as it is produced, for downloads saved as .gz files"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
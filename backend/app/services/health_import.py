@@ -0,0 +1,398 @@
+"""
+Health Import
+Incremental parsers for Apple Health and CSV exports, and a batched importer
+"""
+
+import codecs
+import csv
+import time
+import uuid
+from datetime import date, datetime, timezone
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+from xml.etree.ElementTree import XMLPullParser
+
+from dateutil.parser import isoparse
+
+from app.services.shared_state import SharedState
+from app.services.streaks import ActivityStreak
+
+
+SOURCES = ("apple_health", "csv")
+
+STEP_COUNT = "HKQuantityTypeIdentifierStepCount"
+ACTIVE_ENERGY = "HKQuantityTypeIdentifierActiveEnergyBurned"
+BODY_MASS = "HKQuantityTypeIdentifierBodyMass"
+
+# Unit conversions to minutes, kcal and kg
+DURATION_UNITS = {"min": 1.0, "s": 1 / 60, "sec": 1 / 60, "hr": 60.0, "h": 60.0}
+ENERGY_UNITS = {"kcal": 1.0, "Cal": 1.0, "cal": 0.001, "kJ": 1 / 4.184}
+MASS_UNITS = {"kg": 1.0, "lb": 0.45359237, "g": 0.001, "st": 6.35029318}
+
+# Import progress records are kept this long after the last update
+PROGRESS_TTL_SECONDS = 3600
+
+
+# A parsed record: ("workout", row), ("daily", {"log_date", "source", "steps", "calories_burned"})
+# or ("weight", row). ("skipped", None) counts input the importer does not map.
+Record = Tuple[str, Optional[Dict[str, Any]]]
+
+
+def _apple_datetime(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S %z")
+
+
+def _number(value, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _activity_name(activity_type: str) -> str:
+    """HKWorkoutActivityTypeTraditionalStrengthTraining -> Traditional Strength Training"""
+    name = activity_type.replace("HKWorkoutActivityType", "")
+    return "".join(f" {c}" if c.isupper() and i else c for i, c in enumerate(name)) or "Workout"
+
+
+class AppleHealthParser:
+    """
+    Parses an Apple Health export.xml fed in chunks. Each top-level element
+    is mapped when it ends and then dropped from the tree, so memory stays
+    flat however large the export is.
+    """
+
+    def __init__(self):
+        self._parser = XMLPullParser(events=("start", "end"))
+        self._root = None
+        self._depth = 0
+
+    def feed(self, chunk: bytes) -> Iterator[Record]:
+        self._parser.feed(chunk)
+        return self._records()
+
+    def close(self) -> Iterator[Record]:
+        self._parser.close()
+        return self._records()
+
+    def _records(self) -> Iterator[Record]:
+        for event, element in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = element
+                self._depth += 1
+                continue
+            self._depth -= 1
+            if self._depth != 1:
+                continue
+            if element.tag == "Record":
+                yield self._record(element)
+            elif element.tag == "Workout":
+                yield self._workout(element)
+            # Done with this element and everything before it
+            self._root.clear()
+
+    @staticmethod
+    def _record(element) -> Record:
+        kind = element.get("type")
+        if kind not in (STEP_COUNT, ACTIVE_ENERGY, BODY_MASS):
+            return "skipped", None
+        started = _apple_datetime(element.get("startDate"))
+        value = _number(element.get("value"))
+        unit = element.get("unit", "")
+        if kind == BODY_MASS:
+            if unit not in MASS_UNITS:
+                return "skipped", None
+            return "weight", {
+                "weight": round(value * MASS_UNITS[unit], 2),
+                "recorded_at": started.astimezone(timezone.utc).isoformat()
+            }
+        daily = {"log_date": started.date().isoformat(), "source": element.get("sourceName", ""),
+                 "steps": 0, "calories_burned": 0.0}
+        if kind == STEP_COUNT:
+            daily["steps"] = int(value)
+        elif unit in ENERGY_UNITS:
+            daily["calories_burned"] = value * ENERGY_UNITS[unit]
+        return "daily", daily
+
+    @staticmethod
+    def _workout(element) -> Record:
+        started = _apple_datetime(element.get("startDate"))
+        duration = _number(element.get("duration")) * DURATION_UNITS.get(element.get("durationUnit", "min"), 1.0)
+        energy = element.get("totalEnergyBurned")
+        energy_unit = element.get("totalEnergyBurnedUnit", "kcal")
+        # Newer exports report energy in WorkoutStatistics children instead
+        for stats in element.iter("WorkoutStatistics"):
+            if energy is None and stats.get("type") == ACTIVE_ENERGY:
+                energy, energy_unit = stats.get("sum"), stats.get("unit", "kcal")
+        name = _activity_name(element.get("workoutActivityType", ""))
+        return "workout", {
+            "workout_date": started.date().isoformat(),
+            "title": name,
+            "workout_type": name,
+            "duration_minutes": max(1, round(duration)),
+            "calories_burned": round(_number(energy) * ENERGY_UNITS.get(energy_unit, 1.0)) if energy else None,
+            "notes": f"Imported from Apple Health ({element.get('sourceName', 'unknown source')})",
+            "is_ai_generated": False
+        }
+
+
+class CsvHistoryParser:
+    """
+    Parses CSV in the format of GET /api/export (a `table` column, workouts
+    one row per set) fed in chunks. Rows are handed to the csv module one
+    record at a time; only the current workout's sets are held.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._pending = ""
+        self._record = ""
+        self._header: Optional[List[str]] = None
+        self._workout: Optional[Dict[str, Any]] = None
+
+    def feed(self, chunk: bytes) -> Iterator[Record]:
+        self._pending += self._decoder.decode(chunk)
+        *lines, self._pending = self._pending.split("\n")
+        return self._rows(lines)
+
+    def close(self) -> Iterator[Record]:
+        lines = [self._pending + self._decoder.decode(b"", final=True)]
+        self._pending = ""
+        yield from self._rows(lines)
+        if self._record:
+            yield from self._row(next(csv.reader([self._record])))
+        if self._workout:
+            yield "workout", self._finish_workout(self._workout)
+            self._workout = None
+
+    def _rows(self, lines: List[str]) -> Iterator[Record]:
+        for line in lines:
+            self._record += line + "\n" if self._record or line else ""
+            # A record is complete once its quotes are balanced
+            if not self._record or self._record.count('"') % 2:
+                continue
+            record, self._record = self._record, ""
+            values = next(csv.reader([record]), [])
+            if values:
+                yield from self._row(values)
+
+    def _row(self, values: List[str]) -> Iterator[Record]:
+        if self._header is None:
+            self._header = values
+            return
+        # Exports may leave trailing empty columns off a row
+        row = dict(zip(self._header, values, strict=False))
+        table = row.get("table")
+        if table != "workouts" and self._workout:
+            yield "workout", self._finish_workout(self._workout)
+            self._workout = None
+        if table == "workouts":
+            yield from self._workout_set(row)
+        elif table == "daily":
+            yield "daily", {"log_date": row["log_date"][:10], "source": "csv",
+                            "steps": int(_number(row.get("steps"))),
+                            "calories_burned": _number(row.get("calories_burned"))}
+        elif table == "weight":
+            yield "weight", {"weight": _number(row.get("weight")), "recorded_at": row["recorded_at"],
+                             "notes": row.get("notes") or None}
+        else:
+            yield "skipped", None
+
+    def _workout_set(self, row: Dict[str, str]) -> Iterator[Record]:
+        if self._workout and self._workout["_id"] != row.get("id"):
+            yield "workout", self._finish_workout(self._workout)
+            self._workout = None
+        if self._workout is None:
+            self._workout = {
+                "_id": row.get("id"),
+                "workout_date": row["workout_date"][:10],
+                "title": row.get("title") or "Workout",
+                "workout_type": row.get("workout_type") or None,
+                "duration_minutes": int(_number(row.get("duration_minutes"), 1)),
+                "calories_burned": int(_number(row["calories_burned"])) if row.get("calories_burned") else None,
+                "notes": row.get("notes") or None,
+                "is_ai_generated": row.get("is_ai_generated") == "True",
+                "exercises": []
+            }
+        if row.get("exercise"):
+            exercises = self._workout["exercises"]
+            if not exercises or exercises[-1]["name"] != row["exercise"]:
+                exercises.append({"name": row["exercise"], "sets": 0, "reps": row.get("reps") or None})
+                if row.get("weight"):
+                    exercises[-1]["weight"] = _number(row["weight"])
+            exercises[-1]["sets"] += 1
+
+    @staticmethod
+    def _finish_workout(workout: Dict[str, Any]) -> Dict[str, Any]:
+        workout.pop("_id", None)
+        workout["exercises"] = workout["exercises"] or None
+        return workout
+
+
+def progress_key(user_id: str, import_id: str) -> str:
+    return f"import:{user_id}:{import_id}"
+
+
+class ImportProgress:
+    """Progress of one import in shared state, readable from any worker"""
+
+    def __init__(self, state: SharedState, user_id: str, source: str, total_bytes: Optional[int],
+                 import_id: Optional[str] = None, min_interval_seconds: float = 0.5):
+        self.state = state
+        self.min_interval_seconds = min_interval_seconds
+        self._saved_at = 0.0
+        self.record = {
+            "id": import_id or uuid.uuid4().hex,
+            "user_id": user_id,
+            "source": source,
+            "status": "running",
+            "bytes_read": 0,
+            "total_bytes": total_bytes,
+            "parsed": {"workouts": 0, "daily": 0, "weight": 0, "skipped": 0},
+            "inserted": {"workouts": 0, "daily": 0, "weight": 0},
+            "duplicates": {"workouts": 0, "weight": 0},
+            "error": None
+        }
+        self.save()
+
+    @property
+    def id(self) -> str:
+        return self.record["id"]
+
+    def save(self, force: bool = True) -> None:
+        now = time.monotonic()
+        if force or now - self._saved_at >= self.min_interval_seconds:
+            self._saved_at = now
+            self.state.set(progress_key(self.record["user_id"], self.id), self.record, ttl_seconds=PROGRESS_TTL_SECONDS)
+
+    def finish(self, error: Optional[str] = None) -> None:
+        self.record["status"] = "failed" if error else "done"
+        self.record["error"] = error
+        self.save()
+
+
+def _weight_key(recorded_at: str) -> str:
+    # isoparse, not fromisoformat: stored rows come back with trimmed fractions (.12345)
+    return isoparse(recorded_at).astimezone(timezone.utc).isoformat()
+
+
+class HealthImporter:
+    """
+    Maps parsed records into workout_logs, daily_logs and weight_history.
+    Workouts and weights are inserted `batch_size` at a time, skipping rows
+    that already exist in the batch's date range. Daily totals are summed
+    per day and source (taking the largest source, so phone and watch are
+    not counted twice) and upserted at the end, never lowering stored
+    values, so importing the same file twice changes nothing.
+    """
+
+    def __init__(self, db, user_id: str, progress: ImportProgress, batch_size: int = 1000):
+        self.db = db
+        self.user_id = user_id
+        self.progress = progress
+        self.batch_size = batch_size
+        self._workouts: List[Dict[str, Any]] = []
+        self._weights: List[Dict[str, Any]] = []
+        # log_date -> source -> [steps, calories]
+        self._daily: Dict[str, Dict[str, List[float]]] = {}
+        self._seen_workouts = set()
+        self._workout_dates = set()
+
+    async def add(self, kind: str, row: Optional[Dict[str, Any]]) -> None:
+        parsed = self.progress.record["parsed"]
+        if kind == "workout":
+            parsed["workouts"] += 1
+            self._workouts.append(row)
+            if len(self._workouts) >= self.batch_size:
+                await self._flush_workouts()
+        elif kind == "weight":
+            parsed["weight"] += 1
+            self._weights.append(row)
+            if len(self._weights) >= self.batch_size:
+                await self._flush_weights()
+        elif kind == "daily":
+            parsed["daily"] += 1
+            totals = self._daily.setdefault(row["log_date"], {}).setdefault(row["source"], [0, 0.0])
+            totals[0] += row["steps"]
+            totals[1] += row["calories_burned"]
+        else:
+            parsed["skipped"] += 1
+
+    async def finish(self) -> None:
+        await self._flush_workouts()
+        await self._flush_weights()
+        await self._flush_daily()
+        if self._workout_dates:
+            await self._update_workout_streak()
+
+    async def _flush_workouts(self) -> None:
+        batch, self._workouts = self._workouts, []
+        if not batch:
+            return
+        dates = [w["workout_date"] for w in batch]
+        existing = await self.db.get_workout_keys_between(self.user_id, min(dates), max(dates))
+        seen = self._seen_workouts
+        seen.update((str(w["workout_date"])[:10], w["title"], w["duration_minutes"]) for w in existing)
+        new = []
+        for workout in batch:
+            key = (workout["workout_date"], workout["title"], workout["duration_minutes"])
+            if key in seen:
+                self.progress.record["duplicates"]["workouts"] += 1
+                continue
+            seen.add(key)
+            new.append(workout)
+            self._workout_dates.add(workout["workout_date"])
+        if new:
+            self.progress.record["inserted"]["workouts"] += await self.db.insert_workout_logs(self.user_id, new)
+        self.progress.save(force=False)
+
+    async def _flush_weights(self) -> None:
+        batch, self._weights = self._weights, []
+        if not batch:
+            return
+        for entry in batch:
+            entry["recorded_at"] = _weight_key(entry["recorded_at"])
+        times = [e["recorded_at"] for e in batch]
+        existing = await self.db.get_weight_history(self.user_id, min(times), max(times))
+        seen = {_weight_key(e["recorded_at"]) for e in existing}
+        new = []
+        for entry in batch:
+            if entry["recorded_at"] in seen:
+                self.progress.record["duplicates"]["weight"] += 1
+                continue
+            seen.add(entry["recorded_at"])
+            new.append(entry)
+        if new:
+            self.progress.record["inserted"]["weight"] += await self.db.insert_weight_entries(self.user_id, new)
+        self.progress.save(force=False)
+
+    async def _flush_daily(self) -> None:
+        days = sorted(self._daily)
+        for i in range(0, len(days), self.batch_size):
+            chunk = days[i:i + self.batch_size]
+            existing = {
+                str(log["log_date"])[:10]: log
+                for log in await self.db.get_daily_logs_between(self.user_id, chunk[0], chunk[-1])
+            }
+            rows = []
+            for day in chunk:
+                steps = max(int(totals[0]) for totals in self._daily[day].values())
+                calories = max(round(totals[1]) for totals in self._daily[day].values())
+                stored = existing.get(day, {})
+                row = {
+                    "log_date": day,
+                    "steps": max(steps, stored.get("steps") or 0),
+                    "calories_burned": max(calories, stored.get("calories_burned") or 0)
+                }
+                if (row["steps"], row["calories_burned"]) != (stored.get("steps"), stored.get("calories_burned")):
+                    rows.append(row)
+            if rows:
+                self.progress.record["inserted"]["daily"] += await self.db.upsert_daily_logs(self.user_id, rows)
+            self.progress.save(force=False)
+
+    async def _update_workout_streak(self) -> None:
+        rows = {row["streak_type"]: row for row in await self.db.get_user_streaks(self.user_id)}
+        streak = ActivityStreak.from_row(rows["workout"]) if "workout" in rows else ActivityStreak("workout")
+        for day in sorted(self._workout_dates):
+            streak.mark(date.fromisoformat(day))
+        await self.db.save_streaks(self.user_id, [streak.to_row()])
@@ -0,0 +1,182 @@
+"""
+Job Queue
+Bounded async worker pool for long-running AI generations
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from typing import Optional, Dict, Any, Callable, Awaitable, Set
+
+from app.services.shared_state import SharedState, MemoryState
+
+
+class QueueFullError(Exception):
+    """Raised when the queue already holds the maximum number of pending jobs"""
+
+
+class JobQueue:
+    """
+    Job queue run by a fixed number of worker tasks in this process. Job
+    records live in shared state, so with several uvicorn workers a job
+    can be polled from any of them. Finished jobs are kept for
+    `ttl_seconds`, and a job submitted with the same key as one still
+    queued or running returns the existing job.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        ttl_seconds: int = 3600,
+        max_pending: int = 100,
+        state: Optional[SharedState] = None
+    ):
+        self.workers = workers
+        self.ttl_seconds = ttl_seconds
+        self.max_pending = max_pending
+        self.state = state or MemoryState()
+        self._funcs: Dict[str, Callable[[], Awaitable[Any]]] = {}
+        self._local: Set[str] = set()  # Unfinished jobs owned by this process
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._loop = None
+
+    # ==========================================
+    # LIFECYCLE
+    # ==========================================
+
+    def start(self) -> None:
+        """Start worker tasks on the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        # Jobs queued on a previous loop can never run, fail them explicitly
+        for job_id in list(self._local):
+            job = self.state.get(f"job:{job_id}")
+            if job and job["status"] in ("queued", "running"):
+                self._finish(job, error="Job queue restarted")
+        self._local.clear()
+
+    async def stop(self) -> None:
+        """Cancel worker tasks"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ==========================================
+    # JOBS
+    # ==========================================
+
+    def submit(
+        self,
+        func: Callable[[], Awaitable[Any]],
+        key: Optional[str] = None,
+        user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Queue a job for `user_id` (None for anonymous callers), or return
+        the in-flight job with the same key
+        """
+        self.start()
+
+        if key:
+            existing = self._inflight(key)
+            if existing:
+                return existing
+
+        if self._queue.qsize() >= self.max_pending:
+            raise QueueFullError("Too many pending jobs, try again shortly")
+
+        job = {
+            "id": str(uuid.uuid4()),
+            "status": "queued",
+            "result": None,
+            "error": None,
+            "key": key,
+            "user_id": user_id,
+            "pid": os.getpid(),
+            "created_at": time.time(),
+            "finished_at": None
+        }
+        # Claim the key atomically; another worker may have just queued the same request
+        if key and not self.state.add(f"job_key:{key}", job["id"], self.ttl_seconds):
+            existing = self._inflight(key)
+            if existing:
+                return existing
+            self.state.set(f"job_key:{key}", job["id"], self.ttl_seconds)
+
+        self._save(job)
+        self._funcs[job["id"]] = func
+        self._local.add(job["id"])
+        self._queue.put_nowait(job["id"])
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by ID, or None if unknown or expired"""
+        job = self.state.get(f"job:{job_id}")
+        if job and job["status"] in ("queued", "running") and not _process_alive(job["pid"]):
+            self._finish(job, error="Worker exited before the job finished")
+        return job
+
+    def pending(self) -> int:
+        """Number of jobs waiting for a worker in this process"""
+        return self._queue.qsize() if self._queue else 0
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = self.state.get(f"job:{job_id}")
+            func = self._funcs.pop(job_id, None)
+            if job is None or func is None:
+                self._local.discard(job_id)
+                continue
+
+            job["status"] = "running"
+            self._save(job)
+            try:
+                self._finish(job, result=await func())
+            except asyncio.CancelledError:
+                self._finish(job, error="Job cancelled")
+                raise
+            except Exception as e:
+                self._finish(job, error=f"{type(e).__name__}: {str(e)}")
+
+    def _inflight(self, key: str) -> Optional[Dict[str, Any]]:
+        """The queued or running job holding `key`, if any"""
+        job_id = self.state.get(f"job_key:{key}")
+        job = self.get(job_id) if job_id else None
+        if job and job["status"] in ("queued", "running"):
+            return job
+        return None
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        self.state.set(f"job:{job['id']}", job, self.ttl_seconds)
+
+    def _finish(self, job: Dict[str, Any], result: Any = None, error: Optional[str] = None) -> None:
+        job["status"] = "failed" if error else "succeeded"
+        job["result"] = result
+        job["error"] = error
+        job["finished_at"] = time.time()
+        self._save(job)
+        self._funcs.pop(job["id"], None)
+        self._local.discard(job["id"])
+        if job["key"] and self.state.get(f"job_key:{job['key']}") == job["id"]:
+            self.state.delete(f"job_key:{job['key']}")
+
+
+def _process_alive(pid: int) -> bool:
+    """Whether the worker process that queued a job is still running"""
+    if pid == os.getpid() or os.name != "posix":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -0,0 +1,234 @@
+"""
+Log Retrieval
+Per-user index of compact facts from recent logs, used to ground chat answers
+"""
+
+import math
+from collections import OrderedDict
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Optional, List, Dict, Any
+
+from app.services.plan_index import tokenize
+from app.services.shared_state import SharedState, MemoryState, get_shared_state
+
+
+QUESTION_WORDS = {
+    "what", "did", "do", "does", "how", "much", "many", "was", "were", "have",
+    "has", "had", "this", "that", "last", "past", "been", "am", "are", "you", "about"
+}
+
+# Query words that point at one kind of log
+KIND_HINTS = {
+    "diet": {
+        "eat", "ate", "eaten", "eating", "food", "meal", "diet", "nutrition", "protein",
+        "carb", "fat", "macro", "breakfast", "lunch", "dinner", "snack", "calorie", "kcal"
+    },
+    "workout": {
+        "workout", "train", "trained", "training", "exercise", "exercised", "gym",
+        "lift", "lifted", "run", "ran", "session", "cardio", "strength", "minute"
+    },
+    "daily": {"step", "walk", "walked", "burn", "burned", "burnt", "active", "activity", "calorie", "kcal"},
+}
+
+# Query words that point at a date window, as (newest, oldest) days ago
+TIME_HINTS = {
+    "today": (0, 0),
+    "yesterday": (1, 1),
+    "week": (0, 6),
+    "weekend": (0, 6),
+    "month": (0, 29),
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return math.ceil(len(text) / 4)
+
+
+def log_fact(kind: str, log: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Turn one log row into a short fact line, or None if it has no date"""
+    if kind == "workout":
+        log_date = log.get("workout_date")
+        parts = [log.get("title") or log.get("workout_type") or "Workout"]
+        if log.get("duration_minutes"):
+            parts.append(f"{log['duration_minutes']} min")
+        if log.get("calories_burned"):
+            parts.append(f"{log['calories_burned']} kcal burned")
+        text = f"workout: {', '.join(parts)}"
+        key = log.get("id")
+    elif kind == "diet":
+        log_date = log.get("log_date")
+        text = (
+            f"{(log.get('meal_type') or 'meal').lower()}: {log.get('meal_name', '')}, "
+            f"{log.get('calories') or 0} kcal, P{round(log.get('protein') or 0)}"
+            f" C{round(log.get('carbs') or 0)} F{round(log.get('fats') or 0)}"
+        )
+        key = log.get("id")
+    elif kind == "daily":
+        log_date = log.get("log_date")
+        parts = [f"{log.get('calories_consumed') or 0} kcal eaten"]
+        parts.append(f"{log.get('calories_burned') or 0} kcal burned")
+        if log.get("steps"):
+            parts.append(f"{log['steps']} steps")
+        if log.get("weight"):
+            parts.append(f"{log['weight']} kg")
+        text = f"day total: {', '.join(parts)}"
+        # One daily log per date, later updates replace it
+        key = f"daily:{log_date}"
+    else:
+        raise ValueError(f"Unknown log kind: {kind}")
+
+    if not log_date:
+        return None
+    log_date = str(log_date)[:10]
+    return {
+        "key": key or f"{kind}:{log_date}:{text}",
+        "kind": kind,
+        "date": log_date,
+        "text": f"{log_date} {text}",
+        "tokens": set(tokenize(text)),
+    }
+
+
+class LogRetrievalIndex:
+    """
+    Compact facts from each user's recent workout, diet and daily logs.
+    Users are loaded from the database on first use and then kept current
+    by add_log as new logs are written. Least recently used users are evicted.
+    Every write bumps the user's version in shared state, so workers that
+    did not see the write reload the user on next use.
+    """
+
+    def __init__(
+        self,
+        max_facts_per_user: int = 500,
+        max_users: int = 1000,
+        state: Optional[SharedState] = None
+    ):
+        self.max_facts_per_user = max_facts_per_user
+        self.max_users = max_users
+        self.state = state or MemoryState()
+        self._users: "OrderedDict[str, Dict[str, Dict[str, Any]]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+
+    def is_loaded(self, user_id: str) -> bool:
+        """Whether the user's logs are indexed and unchanged since"""
+        return user_id in self._users and self._versions.get(user_id) == self._shared_version(user_id)
+
+    async def load_user(self, db, user_id: str, days: int = 30) -> int:
+        """Index the user's logs from the last `days` days, returns fact count"""
+        start_date = (date.today() - timedelta(days=days - 1)).isoformat()
+        facts: Dict[str, Dict[str, Any]] = {}
+        self._users[user_id] = facts
+        self._versions[user_id] = self._shared_version(user_id)
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            evicted, _ = self._users.popitem(last=False)
+            self._versions.pop(evicted, None)
+
+        workout_logs = await db.get_workout_logs_since(user_id, start_date)
+        diet_logs = await db.get_diet_logs_since(user_id, start_date)
+        daily_logs = await db.get_daily_logs(user_id, days)
+        for kind, logs in (("workout", workout_logs), ("diet", diet_logs), ("daily", daily_logs)):
+            for log in logs:
+                self._add_fact(facts, kind, log)
+        return len(facts)
+
+    def add_log(self, user_id: str, kind: str, log: Optional[Dict[str, Any]]) -> None:
+        """Add or replace one log's fact and mark the user's logs as changed"""
+        if not log:
+            return
+        self._changed(user_id)
+        facts = self._users.get(user_id)
+        if facts is not None:
+            self._add_fact(facts, kind, log)
+
+    def invalidate(self, user_id: str) -> None:
+        """Make every worker reload the user on next use, after bulk changes"""
+        self.state.incr(f"log_version:{user_id}")
+
+    def remove_log(self, user_id: str, log_id: str) -> None:
+        """Drop a deleted workout or diet log's fact"""
+        self._changed(user_id)
+        facts = self._users.get(user_id)
+        if facts is not None:
+            facts.pop(log_id, None)
+
+    def _add_fact(self, facts: Dict[str, Dict[str, Any]], kind: str, log: Dict[str, Any]) -> None:
+        fact = log_fact(kind, log)
+        if not fact:
+            return
+        facts[fact["key"]] = fact
+        if len(facts) > self.max_facts_per_user:
+            oldest = min(facts.values(), key=lambda f: f["date"])
+            del facts[oldest["key"]]
+
+    def _shared_version(self, user_id: str) -> int:
+        return self.state.get(f"log_version:{user_id}") or 0
+
+    def _changed(self, user_id: str) -> None:
+        # Our copy stays current only if no other worker wrote in between
+        version = self.state.incr(f"log_version:{user_id}")
+        if self._versions.get(user_id) == version - 1:
+            self._versions[user_id] = version
+
+    def search(
+        self,
+        user_id: str,
+        query: str,
+        token_budget: int = 200,
+        today: Optional[date] = None
+    ) -> List[str]:
+        """
+        Most relevant fact lines for the query, newest first within equal
+        relevance, packed into token_budget. Returns nothing when the query
+        does not refer to the user's logs.
+        """
+        facts = self._users.get(user_id)
+        if not facts:
+            return []
+        self._users.move_to_end(user_id)
+
+        raw = tokenize(query)
+        words = [w for w in raw if w not in QUESTION_WORDS]
+        kinds = {kind for kind, hints in KIND_HINTS.items() if hints.intersection(words)}
+        window = None
+        for word in words:
+            if word in TIME_HINTS:
+                newest, oldest = TIME_HINTS[word]
+                window = (min(newest, window[0]), max(oldest, window[1])) if window else (newest, oldest)
+        if window == (0, 6) and "last" in raw:
+            window = (7, 13)
+        terms = set(words) - set(TIME_HINTS)
+        if not kinds and not window and not terms:
+            return []
+
+        today = today or date.today()
+        scored = []
+        for fact in facts.values():
+            score = float(fact["kind"] in kinds) + len(terms & fact["tokens"])
+            if score == 0 and (kinds or terms):
+                continue
+            if window:
+                days_ago = (today - date.fromisoformat(fact["date"])).days
+                if not window[0] <= days_ago <= window[1]:
+                    continue
+                score += 1.0
+            scored.append((score, fact["date"], fact["text"]))
+
+        scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        selected, used = [], 0
+        for _, _, text in scored:
+            cost = estimate_tokens(text) + 1
+            if used + cost > token_budget:
+                break
+            selected.append(text)
+            used += cost
+        return selected
+
+
+@lru_cache()
+def get_log_index() -> LogRetrievalIndex:
+    """Process-wide log index shared by the chat and logging routers"""
+    return LogRetrievalIndex(state=get_shared_state())
@@ -0,0 +1,293 @@
+"""
+Metrics
+Counters and histograms exposed in Prometheus text format, summed across workers
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import os
+import time
+from bisect import bisect_left
+from typing import Optional, List, Dict, Tuple, Sequence
+
+from app.services.request_timing import record_span
+from app.services.shared_state import SharedState
+
+
+# Seconds; covers fast DB reads through slow plan generations
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+INF_LABEL = 'le="+Inf"'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def snapshot(self) -> Dict[str, float]:
+        return {json.dumps(labels): value for labels, value in self._values.items()}
+
+    def render(self, others: Sequence[Dict[str, float]] = ()) -> List[str]:
+        """Text lines, adding in snapshots taken from other worker processes"""
+        values = dict(self._values)
+        for other in others:
+            for key, value in other.items():
+                labels = tuple(json.loads(key))
+                values[labels] = values.get(labels, 0) + value
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram with labels"""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Per label set: [per-bucket counts..., overflow count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def snapshot(self) -> Dict[str, List[float]]:
+        return {json.dumps(labels): list(series) for labels, series in self._series.items()}
+
+    def render(self, others: Sequence[Dict[str, List[float]]] = ()) -> List[str]:
+        """Text lines, adding in snapshots taken from other worker processes"""
+        merged = {labels: list(series) for labels, series in self._series.items()}
+        for other in others:
+            for key, series in other.items():
+                labels = tuple(json.loads(key))
+                if labels in merged:
+                    merged[labels] = [a + b for a, b in zip(merged[labels], series, strict=True)]
+                else:
+                    merged[labels] = list(series)
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series[:len(self.buckets)], strict=True):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {_number(cumulative)}")
+            total = cumulative + series[-2]
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, INF_LABEL)} {_number(total)}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {_number(total)}")
+        return lines
+
+
+class MetricsRegistry:
+    """All metrics of the process, rendered together for /metrics"""
+
+    def __init__(self):
+        self._metrics: List = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """JSON-friendly copy of every series, for merging across workers"""
+        return {metric.name: metric.snapshot() for metric in self._metrics}
+
+    def render(self, others: Sequence[Dict[str, Dict]] = ()) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render([other.get(metric.name, {}) for other in others]))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# How often each worker publishes its metrics to shared state
+PUBLISH_INTERVAL_SECONDS = 10
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "fitbridge_http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "fitbridge_http_request_seconds", "HTTP request latency until the response is sent", ("method", "route")
+)
+LLM_LATENCY = REGISTRY.histogram(
+    "fitbridge_llm_request_seconds", "AI provider call latency", ("provider", "model", "route")
+)
+LLM_FIRST_TOKEN = REGISTRY.histogram(
+    "fitbridge_llm_first_token_seconds", "Time to first streamed token", ("provider", "model", "route")
+)
+LLM_TOKENS = REGISTRY.counter(
+    "fitbridge_llm_tokens_total", "Tokens reported by the provider", ("provider", "model", "kind")
+)
+LLM_ERRORS = REGISTRY.counter(
+    "fitbridge_llm_errors_total", "Failed AI provider calls", ("provider", "model", "route")
+)
+DB_LATENCY = REGISTRY.histogram(
+    "fitbridge_db_call_seconds", "Supabase call latency per SupabaseService method", ("method",)
+)
+DB_ERRORS = REGISTRY.counter(
+    "fitbridge_db_errors_total", "Failed Supabase calls per SupabaseService method", ("method",)
+)
+COMPRESSION_BYTES = REGISTRY.counter(
+    "fitbridge_response_body_bytes_total", "Compressed response bodies before (raw) and after (sent) compression",
+    ("encoding", "stage")
+)
+COMPRESSION_SECONDS = REGISTRY.counter(
+    "fitbridge_compression_seconds_total", "Time spent compressing response bodies", ("encoding",)
+)
+COMPRESSION_CACHE = REGISTRY.counter(
+    "fitbridge_compression_cache_total", "Compressed body cache lookups", ("result",)
+)
+
+
+def publish_metrics(state: SharedState) -> None:
+    """Store this worker's metrics where the other workers can read them"""
+    state.set(f"metrics:{os.getpid()}", REGISTRY.snapshot(), PUBLISH_INTERVAL_SECONDS * 3)
+
+
+async def publish_periodically(state: SharedState) -> None:
+    """Keep this worker's published metrics fresh until cancelled"""
+    while True:
+        try:
+            publish_metrics(state)
+        except Exception as e:
+            print(f"Metrics publish failed: {e}")
+        await asyncio.sleep(PUBLISH_INTERVAL_SECONDS)
+
+
+def render_metrics(state: SharedState) -> str:
+    """
+    Prometheus text for the whole server. With several workers the latest
+    published metrics of the others are added to this worker's own; those
+    of a worker that exited drop out after a few publish intervals.
+    """
+    if not state.shared:
+        return REGISTRY.render()
+    own = f"metrics:{os.getpid()}"
+    others = [snapshot for key, snapshot in state.scan("metrics:").items() if key != own]
+    return REGISTRY.render(others)
+
+
+def record_llm_usage(provider: str, model: Optional[str], usage) -> None:
+    """Count prompt and completion tokens from a provider `usage` object"""
+    if usage is None:
+        return
+    model = model or "unknown"
+    LLM_TOKENS.inc(provider, model, "prompt", amount=getattr(usage, "prompt_tokens", 0) or 0)
+    LLM_TOKENS.inc(provider, model, "completion", amount=getattr(usage, "completion_tokens", 0) or 0)
+
+
+def instrument_db_methods(cls):
+    """Class decorator timing every public async method of a database service"""
+    for name, method in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.iscoroutinefunction(method):
+            continue
+
+        def wrap(method, name=name):
+            @functools.wraps(method)
+            async def timed(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await method(*args, **kwargs)
+                except Exception:
+                    DB_ERRORS.inc(name)
+                    raise
+                finally:
+                    elapsed = time.perf_counter() - started
+                    DB_LATENCY.observe(elapsed, name)
+                    record_span(f"db.{name}", elapsed)
+            return timed
+
+        setattr(cls, name, wrap(method))
+    return cls
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and status per route template.
+    Plain ASGI rather than BaseHTTPMiddleware so streamed responses pass
+    through untouched and the per-request cost stays a few dict updates.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # Route templates keep label cardinality bounded
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_REQUESTS.inc(method, path, str(status[0]))
+            HTTP_LATENCY.observe(time.perf_counter() - started, method, path)
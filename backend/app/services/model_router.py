@@ -0,0 +1,98 @@
+"""
+Model Router
+Routes short, generic chat turns to a fast model and keeps the large model
+for plans, progress analysis and long context
+"""
+
+import re
+from functools import lru_cache
+from typing import Optional, List, Dict, Any
+
+from app.config import Settings
+
+
+# Routes that always need the large model
+LARGE_MODEL_ROUTES = {"workout_plan", "diet_plan", "progress"}
+
+
+class ModelLatencyStats:
+    """Per-route, per-model call counts and latency"""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, Dict[str, float]]] = {}
+
+    def record(self, route: str, model: str, seconds: float) -> None:
+        """Record one completed call"""
+        entry = self._stats.setdefault(route, {}).setdefault(
+            model, {"calls": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        )
+        entry["calls"] += 1
+        entry["total_seconds"] += seconds
+        entry["max_seconds"] = max(entry["max_seconds"], seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Stats with average latency, keyed by route then model"""
+        return {
+            route: {
+                model: {
+                    "calls": int(entry["calls"]),
+                    "avg_seconds": round(entry["total_seconds"] / entry["calls"], 3),
+                    "max_seconds": round(entry["max_seconds"], 3)
+                }
+                for model, entry in models.items()
+            }
+            for route, models in self._stats.items()
+        }
+
+
+@lru_cache()
+def get_model_latency_stats() -> ModelLatencyStats:
+    """Process-wide latency stats shared by all AIService instances"""
+    return ModelLatencyStats()
+
+
+class ModelRouter:
+    """Select a model for each AI call based on the route and request size"""
+
+    def __init__(self, settings: Settings, default_model: Optional[str]):
+        self.default_model = default_model
+        self.enabled = settings.ai_routing_enabled
+        if settings.ai_provider == "openai":
+            self.fast_model = settings.openai_fast_model or default_model
+        else:
+            self.fast_model = settings.deepseek_fast_model or default_model
+        self.fast_max_chars = settings.route_fast_max_chars
+        self.fast_max_history = settings.route_fast_max_history
+        keywords = [re.escape(k.strip().lower()) for k in settings.route_complex_keywords.split(",") if k.strip()]
+        # Whole words (and their plurals), so "plan" does not match "explain"
+        self.complex_pattern = (
+            re.compile(rf"\b(?:{'|'.join(keywords)})(?:s|es)?\b") if keywords else None
+        )
+        self.stats = get_model_latency_stats()
+
+    def select(
+        self,
+        route: str,
+        message: str = "",
+        history: Optional[List[Any]] = None,
+        user_context: Optional[Dict] = None
+    ) -> Optional[str]:
+        """
+        Return the fast model for short, generic chat turns and the default
+        model for everything else.
+        """
+        if not self.enabled or route in LARGE_MODEL_ROUTES:
+            return self.default_model
+        if len(message) > self.fast_max_chars:
+            return self.default_model
+        if history and len(history) > self.fast_max_history:
+            return self.default_model
+        if user_context:
+            return self.default_model
+        if self.complex_pattern and self.complex_pattern.search(message.lower()):
+            return self.default_model
+        return self.fast_model
+
+    def record(self, route: str, model: Optional[str], seconds: float) -> None:
+        """Record call latency for a route"""
+        self.stats.record(route, model or "unknown", seconds)
@@ -0,0 +1,249 @@
+"""
+Plan Index
+Local TF-IDF similarity index over vetted and previously generated plans
+"""
+
+import copy
+import math
+import re
+from collections import Counter
+from typing import Optional, List, Dict, Any
+
+from app.services.plan_library import VETTED_PLANS
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+CALORIE_PATTERN = re.compile(r"(\d{3,4})\s*(?:kcal|cal|calories)\b")
+STOP_WORDS = {
+    "a", "an", "and", "the", "for", "to", "of", "in", "on", "with", "my", "me",
+    "i", "want", "need", "plan", "please", "create", "make", "give", "per", "is"
+}
+FITNESS_LEVELS = {"beginner": "Beginner", "intermediate": "Intermediate", "advanced": "Advanced"}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split on non-alphanumerics, drop stop words and plural 's'"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOP_WORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def extract_calorie_target(text: str) -> Optional[int]:
+    """Return the calorie target mentioned in a description, if any"""
+    match = CALORIE_PATTERN.search(text.lower())
+    return int(match.group(1)) if match else None
+
+
+def personalize_plan(
+    plan_type: str,
+    plan: Dict[str, Any],
+    description: str,
+    user_profile: Optional[Dict] = None
+) -> Dict[str, Any]:
+    """
+    Cheap, deterministic adjustments applied to a plan served from the index.
+    Workout difficulty follows the profile's fitness level and diet plans are
+    rescaled to the calorie target named in the description.
+    """
+    plan = copy.deepcopy(plan)
+
+    if plan_type == "workout":
+        level = str((user_profile or {}).get("fitness_level", "")).lower()
+        if level in FITNESS_LEVELS:
+            plan["difficulty"] = FITNESS_LEVELS[level]
+        return plan
+
+    target = extract_calorie_target(description)
+    current = plan.get("dailyCalories")
+    if not target or not current or target == current:
+        return plan
+
+    factor = target / current
+    plan["dailyCalories"] = target
+    plan["macros"] = {k: round(v * factor) for k, v in plan.get("macros", {}).items()}
+    for meal in plan.get("meals", {}).values():
+        for key in ("calories", "protein", "carbs", "fats"):
+            if isinstance(meal.get(key), (int, float)):
+                meal[key] = round(meal[key] * factor)
+    return plan
+
+
+class PlanIndex:
+    """
+    In-memory TF-IDF index of plans keyed by the description that produced them.
+    Lookups are answered locally so near-duplicate requests skip the AI call.
+    """
+
+    def __init__(self, threshold: float = 0.6, max_entries: int = 2000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: Dict[str, List[Dict[str, Any]]] = {"workout": [], "diet": []}
+        self._doc_freq: Dict[str, Counter] = {"workout": Counter(), "diet": Counter()}
+        self._dirty = {"workout": False, "diet": False}
+        # Moving average of real generation time, used to estimate time saved
+        self._generation_seconds: Dict[str, float] = {}
+        self._stats = {
+            "lookups": 0,
+            "matches": 0,
+            "latency_saved_seconds": 0.0
+        }
+
+    # ==========================================
+    # BUILDING
+    # ==========================================
+
+    def add(
+        self,
+        plan_type: str,
+        description: str,
+        plan: Dict[str, Any],
+        source: str = "generated"
+    ) -> None:
+        """Add a plan to the index"""
+        if plan_type not in self._entries or not description or not plan:
+            return
+
+        tokens = tokenize(description)
+        if not tokens:
+            return
+
+        entries = self._entries[plan_type]
+        if len(entries) >= self.max_entries:
+            # Evict the oldest generated plan, vetted plans always stay
+            for i, entry in enumerate(entries):
+                if entry["source"] != "vetted":
+                    self._doc_freq[plan_type].subtract(set(entry["tf"]))
+                    del entries[i]
+                    break
+            else:
+                return
+
+        tf = Counter(tokens)
+        entries.append({
+            "description": description,
+            "plan": plan,
+            "source": source,
+            "tf": tf,
+            "numbers": {t for t in tf if t.isdigit()},
+            "weights": {},
+            "norm": 0.0
+        })
+        self._doc_freq[plan_type].update(set(tf))
+        self._dirty[plan_type] = True
+
+    def load_vetted(self) -> None:
+        """Index the built-in plan library"""
+        for entry in VETTED_PLANS:
+            self.add(entry["plan_type"], entry["description"], entry["plan"], source="vetted")
+
+    async def load_generated(self, db, limit: int = 500) -> int:
+        """Index previously generated plans from the ai_plans table"""
+        plans = await db.get_recent_ai_plans(limit=limit)
+        count = 0
+        for row in plans:
+            if row.get("prompt_used") and row.get("plan_data"):
+                self.add(row["plan_type"], row["prompt_used"], row["plan_data"])
+                count += 1
+        return count
+
+    def size(self) -> int:
+        """Total number of indexed plans"""
+        return sum(len(entries) for entries in self._entries.values())
+
+    # ==========================================
+    # SEARCH
+    # ==========================================
+
+    def _idf(self, plan_type: str, token: str) -> float:
+        n = len(self._entries[plan_type])
+        return math.log((1 + n) / (1 + self._doc_freq[plan_type][token])) + 1
+
+    def _reweight(self, plan_type: str) -> None:
+        """Recompute document weights after the corpus changed"""
+        for entry in self._entries[plan_type]:
+            weights = {t: c * self._idf(plan_type, t) for t, c in entry["tf"].items()}
+            entry["weights"] = weights
+            entry["norm"] = math.sqrt(sum(w * w for w in weights.values()))
+        self._dirty[plan_type] = False
+
+    def search(self, plan_type: str, description: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the closest plan if its cosine similarity clears the threshold.
+        Numbers in the request ("3-day", "5 days") must appear in the match,
+        except a diet calorie target which personalization rescales.
+        """
+        self._stats["lookups"] += 1
+        if plan_type not in self._entries or not self._entries[plan_type]:
+            return None
+
+        tokens = tokenize(description)
+        if not tokens:
+            return None
+
+        if self._dirty[plan_type]:
+            self._reweight(plan_type)
+
+        query_tf = Counter(tokens)
+        query = {t: c * self._idf(plan_type, t) for t, c in query_tf.items()}
+        query_norm = math.sqrt(sum(w * w for w in query.values()))
+        required_numbers = {t for t in query_tf if t.isdigit()}
+        if plan_type == "diet":
+            calories = extract_calorie_target(description)
+            required_numbers.discard(str(calories))
+
+        best, best_score = None, 0.0
+        for entry in self._entries[plan_type]:
+            if not required_numbers <= entry["numbers"]:
+                continue
+            dot = sum(w * entry["weights"].get(t, 0.0) for t, w in query.items())
+            if dot == 0:
+                continue
+            score = dot / (query_norm * entry["norm"])
+            if score > best_score:
+                best, best_score = entry, score
+
+        if best is None or best_score < self.threshold:
+            return None
+
+        return {
+            "plan": best["plan"],
+            "score": round(best_score, 3),
+            "source": best["source"],
+            "description": best["description"]
+        }
+
+    # ==========================================
+    # STATS
+    # ==========================================
+
+    def record_generation(self, plan_type: str, seconds: float) -> None:
+        """Record how long a real AI generation took"""
+        previous = self._generation_seconds.get(plan_type)
+        self._generation_seconds[plan_type] = (
+            seconds if previous is None else 0.8 * previous + 0.2 * seconds
+        )
+
+    def record_match(self, plan_type: str, lookup_seconds: float) -> None:
+        """Record a request served from the index"""
+        self._stats["matches"] += 1
+        saved = self._generation_seconds.get(plan_type, 0.0) - lookup_seconds
+        self._stats["latency_saved_seconds"] += max(saved, 0.0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Match rate and estimated latency saved"""
+        lookups = self._stats["lookups"]
+        return {
+            "indexed_plans": self.size(),
+            "lookups": lookups,
+            "matches": self._stats["matches"],
+            "match_rate": round(self._stats["matches"] / lookups, 3) if lookups else 0.0,
+            "latency_saved_seconds": round(self._stats["latency_saved_seconds"], 2),
+            "avg_generation_seconds": {
+                k: round(v, 2) for k, v in self._generation_seconds.items()
+            }
+        }
@@ -0,0 +1,178 @@
+"""
+Plan Library
+Vetted workout and diet plans served by the plan index before calling the AI
+"""
+
+from typing import List, Dict, Any
+
+
+# Each entry pairs a plan with the kind of request it answers well.
+# Descriptions are matched against user requests by the plan index, so they
+# should read like the goals users actually type.
+VETTED_PLANS: List[Dict[str, Any]] = [
+    {
+        "plan_type": "workout",
+        "description": "3-day full body beginner strength workout 3 days per week",
+        "plan": {
+            "title": "3-Day Full Body Beginner Program",
+            "duration": "6 weeks",
+            "difficulty": "Beginner",
+            "schedule": [
+                {
+                    "dayTitle": "Day 1: Full Body A",
+                    "exercises": [
+                        {"name": "Goblet Squat", "sets": 3, "reps": "10-12", "notes": "Keep chest up", "description": "Hold a dumbbell at chest height and squat to parallel"},
+                        {"name": "Push-ups", "sets": 3, "reps": "8-12", "notes": "Elevate hands if needed", "description": "Lower chest to the floor and press back up"},
+                        {"name": "Dumbbell Row", "sets": 3, "reps": "10 each arm", "notes": "Pull to the hip", "description": "Row a dumbbell with one hand supported on a bench"},
+                        {"name": "Plank", "sets": 3, "reps": "30 sec", "notes": "Squeeze glutes", "description": "Hold a straight line from head to heels on forearms"}
+                    ]
+                },
+                {
+                    "dayTitle": "Day 2: Full Body B",
+                    "exercises": [
+                        {"name": "Romanian Deadlift", "sets": 3, "reps": "10-12", "notes": "Hinge at the hips", "description": "Lower dumbbells along the legs with a flat back"},
+                        {"name": "Dumbbell Shoulder Press", "sets": 3, "reps": "10", "notes": "Brace the core", "description": "Press dumbbells overhead from shoulder height"},
+                        {"name": "Lat Pulldown", "sets": 3, "reps": "10-12", "notes": "Drive elbows down", "description": "Pull the bar to the upper chest on a cable machine"},
+                        {"name": "Glute Bridge", "sets": 3, "reps": "12-15", "notes": "Pause at the top", "description": "Drive hips up from the floor with feet planted"}
+                    ]
+                },
+                {
+                    "dayTitle": "Day 3: Full Body C",
+                    "exercises": [
+                        {"name": "Reverse Lunge", "sets": 3, "reps": "8 each leg", "notes": "Control the descent", "description": "Step back into a lunge and return to standing"},
+                        {"name": "Incline Dumbbell Press", "sets": 3, "reps": "10", "notes": "30 degree bench", "description": "Press dumbbells on an incline bench"},
+                        {"name": "Seated Cable Row", "sets": 3, "reps": "10-12", "notes": "Squeeze shoulder blades", "description": "Row the handle to the torso while seated"},
+                        {"name": "Dead Bug", "sets": 3, "reps": "8 each side", "notes": "Lower back stays flat", "description": "Extend opposite arm and leg while lying on your back"}
+                    ]
+                }
+            ]
+        }
+    },
+    {
+        "plan_type": "workout",
+        "description": "4-day upper lower split intermediate muscle gain hypertrophy 4 days per week",
+        "plan": {
+            "title": "4-Day Upper/Lower Hypertrophy Split",
+            "duration": "8 weeks",
+            "difficulty": "Intermediate",
+            "schedule": [
+                {
+                    "dayTitle": "Day 1: Upper Strength",
+                    "exercises": [
+                        {"name": "Bench Press", "sets": 4, "reps": "6-8", "notes": "Controlled eccentric", "description": "Lower the bar to mid chest and press up"},
+                        {"name": "Barbell Row", "sets": 4, "reps": "6-8", "notes": "Flat back", "description": "Row the bar to the lower chest from a hinge"},
+                        {"name": "Overhead Press", "sets": 3, "reps": "8", "notes": "Glutes tight", "description": "Press the bar overhead from the front rack"},
+                        {"name": "Pull-ups", "sets": 3, "reps": "6-10", "notes": "Full hang", "description": "Pull chin over the bar from a dead hang"}
+                    ]
+                },
+                {
+                    "dayTitle": "Day 2: Lower Strength",
+                    "exercises": [
+                        {"name": "Back Squat", "sets": 4, "reps": "6-8", "notes": "Hit depth", "description": "Squat with the bar on the upper back"},
+                        {"name": "Romanian Deadlift", "sets": 3, "reps": "8-10", "notes": "Soft knees", "description": "Hinge with the bar close to the legs"},
+                        {"name": "Walking Lunges", "sets": 3, "reps": "10 each leg", "notes": "Upright torso", "description": "Alternate forward lunges across the floor"},
+                        {"name": "Standing Calf Raise", "sets": 4, "reps": "12-15", "notes": "Pause at the top", "description": "Rise onto the toes and lower slowly"}
+                    ]
+                },
+                {
+                    "dayTitle": "Day 3: Upper Hypertrophy",
+                    "exercises": [
+                        {"name": "Incline Dumbbell Press", "sets": 3, "reps": "10-12", "notes": "Stretch at the bottom", "description": "Press dumbbells on an incline bench"},
+                        {"name": "Chest-Supported Row", "sets": 3, "reps": "10-12", "notes": "No momentum", "description": "Row dumbbells lying face down on an incline bench"},
+                        {"name": "Lateral Raises", "sets": 3, "reps": "12-15", "notes": "Lead with elbows", "description": "Raise dumbbells out to the sides to shoulder height"},
+                        {"name": "Cable Curl and Pushdown Superset", "sets": 3, "reps": "12 each", "notes": "Short rest", "description": "Alternate biceps curls and triceps pushdowns on a cable"}
+                    ]
+                },
+                {
+                    "dayTitle": "Day 4: Lower Hypertrophy",
+                    "exercises": [
+                        {"name": "Leg Press", "sets": 3, "reps": "10-12", "notes": "Full range", "description": "Press the sled with feet shoulder-width"},
+                        {"name": "Hip Thrust", "sets": 3, "reps": "10-12", "notes": "Chin tucked", "description": "Drive hips up with the upper back on a bench"},
+                        {"name": "Leg Curl", "sets": 3, "reps": "12-15", "notes": "Slow negative", "description": "Curl the pad toward the glutes on a machine"},
+                        {"name": "Leg Extension", "sets": 3, "reps": "12-15", "notes": "Squeeze at the top", "description": "Extend the knees against the pad on a machine"}
+                    ]
+                }
+            ]
+        }
+    },
+    {
+        "plan_type": "workout",
+        "description": "home bodyweight workout no equipment fat loss 3 days per week",
+        "plan": {
+            "title": "Home Bodyweight Fat Loss Circuit",
+            "duration": "4 weeks",
+            "difficulty": "Beginner",
+            "schedule": [
+                {
+                    "dayTitle": "Day 1: Lower Body Circuit",
+                    "exercises": [
+                        {"name": "Bodyweight Squat", "sets": 4, "reps": "15-20", "notes": "Sit back into the hips", "description": "Squat to parallel with arms forward"},
+                        {"name": "Reverse Lunge", "sets": 3, "reps": "10 each leg", "notes": "Knee tracks over toes", "description": "Step back into a lunge and return"},
+                        {"name": "Glute Bridge", "sets": 3, "reps": "15-20", "notes": "Pause at the top", "description": "Drive hips up from the floor"},
+                        {"name": "Jumping Jacks", "sets": 3, "reps": "45 sec", "notes": "Steady pace", "description": "Jump feet out while raising arms overhead"}
+                    ]
+                },
+                {
+                    "dayTitle": "Day 2: Upper Body and Core Circuit",
+                    "exercises": [
+                        {"name": "Push-ups", "sets": 4, "reps": "8-15", "notes": "Knees down if needed", "description": "Lower chest to the floor and press up"},
+                        {"name": "Pike Push-ups", "sets": 3, "reps": "8-10", "notes": "Hips high", "description": "Press from a pike position to target shoulders"},
+                        {"name": "Superman Hold", "sets": 3, "reps": "20 sec", "notes": "Lift chest and legs", "description": "Lie face down and lift arms and legs off the floor"},
+                        {"name": "Mountain Climbers", "sets": 3, "reps": "40 sec", "notes": "Hips level", "description": "Drive knees to chest from a plank"}
+                    ]
+                },
+                {
+                    "dayTitle": "Day 3: Full Body Conditioning",
+                    "exercises": [
+                        {"name": "Burpees", "sets": 4, "reps": "10", "notes": "Step back to regress", "description": "Squat, kick back to plank, return and jump"},
+                        {"name": "Split Squat", "sets": 3, "reps": "10 each leg", "notes": "Stay tall", "description": "Lower the back knee toward the floor in a split stance"},
+                        {"name": "Plank Shoulder Taps", "sets": 3, "reps": "20", "notes": "Minimise hip sway", "description": "Tap opposite shoulder from a high plank"},
+                        {"name": "High Knees", "sets": 3, "reps": "40 sec", "notes": "Stay on the balls of the feet", "description": "Run in place driving knees up"}
+                    ]
+                }
+            ]
+        }
+    },
+    {
+        "plan_type": "diet",
+        "description": "cut 2000 kcal high protein fat loss calorie deficit",
+        "plan": {
+            "dailyCalories": 2000,
+            "macros": {"protein": 180, "carbs": 170, "fats": 65},
+            "meals": {
+                "breakfast": {"name": "Egg White Veggie Omelette", "calories": 450, "protein": 40, "carbs": 40, "fats": 14, "description": "2 whole eggs and 150ml egg whites with spinach and peppers, 1 slice wholegrain toast, 1 orange"},
+                "lunch": {"name": "Chicken and Rice Bowl", "calories": 600, "protein": 55, "carbs": 60, "fats": 15, "description": "180g grilled chicken breast, 150g cooked basmati rice, mixed salad, 1 tsp olive oil"},
+                "dinner": {"name": "Lean Beef Stir Fry", "calories": 650, "protein": 55, "carbs": 50, "fats": 26, "description": "170g lean beef strips, stir-fried vegetables, 100g cooked noodles, soy and ginger sauce"},
+                "snack": {"name": "Skyr with Berries", "calories": 300, "protein": 30, "carbs": 20, "fats": 10, "description": "250g skyr, 100g mixed berries, 15g almonds"}
+            }
+        }
+    },
+    {
+        "plan_type": "diet",
+        "description": "bulk 3000 kcal muscle gain high calorie surplus",
+        "plan": {
+            "dailyCalories": 3000,
+            "macros": {"protein": 190, "carbs": 360, "fats": 90},
+            "meals": {
+                "breakfast": {"name": "Loaded Oats", "calories": 800, "protein": 45, "carbs": 100, "fats": 24, "description": "100g oats cooked in milk, 1 scoop whey, 1 banana, 2 tbsp peanut butter"},
+                "lunch": {"name": "Turkey Pasta", "calories": 850, "protein": 55, "carbs": 110, "fats": 22, "description": "150g dry pasta, 180g lean turkey mince, tomato sauce, parmesan"},
+                "dinner": {"name": "Salmon, Potatoes and Greens", "calories": 850, "protein": 55, "carbs": 90, "fats": 30, "description": "200g salmon fillet, 400g roasted potatoes, green beans"},
+                "snack": {"name": "Protein Shake and Bagel", "calories": 500, "protein": 35, "carbs": 60, "fats": 14, "description": "1 scoop whey in milk, 1 bagel with cream cheese"}
+            }
+        }
+    },
+    {
+        "plan_type": "diet",
+        "description": "vegetarian high protein 2200 kcal balanced maintenance",
+        "plan": {
+            "dailyCalories": 2200,
+            "macros": {"protein": 140, "carbs": 240, "fats": 75},
+            "meals": {
+                "breakfast": {"name": "Greek Yogurt Bowl", "calories": 500, "protein": 35, "carbs": 55, "fats": 15, "description": "300g Greek yogurt, 40g granola, 1 tbsp chia seeds, berries"},
+                "lunch": {"name": "Lentil and Quinoa Salad", "calories": 600, "protein": 32, "carbs": 75, "fats": 18, "description": "150g cooked lentils, 100g cooked quinoa, feta, cucumber, tomato, lemon dressing"},
+                "dinner": {"name": "Tofu Vegetable Curry", "calories": 750, "protein": 43, "carbs": 80, "fats": 28, "description": "200g firm tofu, mixed vegetables in light coconut curry, 150g cooked brown rice"},
+                "snack": {"name": "Cottage Cheese and Fruit", "calories": 350, "protein": 30, "carbs": 30, "fats": 14, "description": "200g cottage cheese, 1 apple, 20g walnuts"}
+            }
+        }
+    }
+]
@@ -0,0 +1,150 @@
+"""
+Progress Features
+Compact numeric summaries of a user's logs for progress analysis
+"""
+
+import hashlib
+import json
+from datetime import date, timedelta
+from typing import Optional, List, Dict, Any
+
+from app.services.shared_state import SharedState, MemoryState
+
+# numpy is imported inside the functions: only progress insights use it
+
+
+def _day_index(values: List[str], start: date):
+    """Convert ISO dates to integer day offsets from start"""
+    import numpy as np
+    dates = np.array([v[:10] for v in values], dtype="datetime64[D]")
+    return (dates - np.datetime64(start, "D")).astype(np.int64)
+
+
+def _slope(y) -> float:
+    """Least-squares slope per day, 0 when there are too few points"""
+    import numpy as np
+    if y.size < 2 or not np.any(y):
+        return 0.0
+    x = np.arange(y.size, dtype=np.float64)
+    return float(np.polyfit(x, y, 1)[0])
+
+
+def build_progress_summary(
+    daily_logs: List[Dict],
+    workout_logs: List[Dict],
+    diet_logs: List[Dict],
+    days: int = 28,
+    today: Optional[date] = None
+) -> Dict[str, Any]:
+    """
+    Summarize logs over the last `days` days into a few dozen numbers:
+    weekly adherence, daily trends and macro ratios.
+    """
+    import numpy as np
+
+    today = today or date.today()
+    start = today - timedelta(days=days - 1)
+    weeks = -(-days // 7)
+
+    # Dense per-day arrays, oldest first
+    consumed = np.zeros(days)
+    burned = np.zeros(days)
+    steps = np.zeros(days)
+    if daily_logs:
+        rows = [d for d in daily_logs if d.get("log_date")]
+        idx = _day_index([d["log_date"] for d in rows], start)
+        keep = (idx >= 0) & (idx < days)
+        np.add.at(consumed, idx[keep], np.array([r.get("calories_consumed") or 0 for r in rows], dtype=float)[keep])
+        np.add.at(burned, idx[keep], np.array([r.get("calories_burned") or 0 for r in rows], dtype=float)[keep])
+        np.add.at(steps, idx[keep], np.array([r.get("steps") or 0 for r in rows], dtype=float)[keep])
+
+    workout_days = np.zeros(days, dtype=bool)
+    minutes = np.zeros(days)
+    if workout_logs:
+        rows = [w for w in workout_logs if w.get("workout_date")]
+        idx = _day_index([w["workout_date"] for w in rows], start)
+        keep = (idx >= 0) & (idx < days)
+        workout_days[idx[keep]] = True
+        np.add.at(minutes, idx[keep], np.array([w.get("duration_minutes") or 0 for w in rows], dtype=float)[keep])
+
+    diet_days = np.zeros(days, dtype=bool)
+    macros = np.zeros(3)
+    if diet_logs:
+        rows = [m for m in diet_logs if m.get("log_date")]
+        idx = _day_index([m["log_date"] for m in rows], start)
+        keep = (idx >= 0) & (idx < days)
+        diet_days[idx[keep]] = True
+        grams = np.array(
+            [[m.get("protein") or 0, m.get("carbs") or 0, m.get("fats") or 0] for m in rows],
+            dtype=float
+        ).reshape(-1, 3)
+        macros = grams[keep].sum(axis=0)
+
+    # Pad to whole weeks (newest week last) and count active days per week
+    pad = weeks * 7 - days
+    weekly_workouts = np.pad(workout_days, (pad, 0)).reshape(weeks, 7).sum(axis=1)
+    weekly_diet = np.pad(diet_days, (pad, 0)).reshape(weeks, 7).sum(axis=1)
+
+    macro_calories = macros * np.array([4, 4, 9])
+    total_macro_calories = macro_calories.sum()
+    ratios = macro_calories / total_macro_calories if total_macro_calories else np.zeros(3)
+
+    logged = consumed > 0
+    return {
+        "days": days,
+        "workouts": {
+            "sessions_per_week": weekly_workouts.tolist(),
+            "adherence": round(float(workout_days.mean()), 2),
+            "avg_minutes": round(float(minutes[workout_days].mean()), 1) if workout_days.any() else 0,
+        },
+        "diet": {
+            "logged_days_per_week": weekly_diet.tolist(),
+            "avg_calories": round(float(consumed[logged].mean())) if logged.any() else 0,
+            "calories_trend_per_day": round(_slope(consumed[logged]), 1),
+            "macro_ratio": {
+                "protein": round(float(ratios[0]), 2),
+                "carbs": round(float(ratios[1]), 2),
+                "fats": round(float(ratios[2]), 2),
+            },
+        },
+        "activity": {
+            "avg_burned": round(float(burned.mean())),
+            "burned_trend_per_day": round(_slope(burned), 1),
+            "avg_steps": round(float(steps.mean())),
+            "steps_trend_per_day": round(_slope(steps), 1),
+        },
+    }
+
+
+def summary_fingerprint(summary: Dict[str, Any]) -> str:
+    """Stable hash of a summary, changes whenever new logs change the numbers"""
+    return hashlib.sha256(json.dumps(summary, sort_keys=True).encode()).hexdigest()
+
+
+class InsightCache:
+    """
+    Progress insights keyed by user and summary fingerprint. Kept in the
+    given shared state (so every worker reuses them) for ttl_seconds, or in
+    a small process-local LRU when no state is passed.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        state: Optional[SharedState] = None,
+        ttl_seconds: int = 7 * 86400
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.state = state or MemoryState(max_entries=max_entries)
+
+    def get(self, user_id: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Cached insight if the user's summary has not changed"""
+        entry = self.state.get(f"insight:{user_id}")
+        if not entry or entry["fingerprint"] != fingerprint:
+            return None
+        return entry["insight"]
+
+    def set(self, user_id: str, fingerprint: str, insight: Dict[str, Any]) -> None:
+        """Store the latest insight for a user"""
+        self.state.set(f"insight:{user_id}", {"fingerprint": fingerprint, "insight": insight}, self.ttl_seconds)
@@ -0,0 +1,130 @@
+"""
+Request Timing
+Per-request spans returned in a Server-Timing header, plus on-demand profiling
+"""
+
+import hmac
+import os
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Optional, List, Dict, Tuple
+
+from fastapi.responses import JSONResponse
+
+from app.config import get_settings
+
+
+# Spans of the request being handled: name -> [calls, total seconds]
+_spans: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("request_spans", default=None)
+
+
+def record_span(name: str, seconds: float) -> None:
+    """Add a timed call to the current request's spans (no-op outside a request)"""
+    spans = _spans.get()
+    if spans is None:
+        return
+    entry = spans.get(name)
+    if entry is None:
+        spans[name] = [1, seconds]
+    else:
+        entry[0] += 1
+        entry[1] += seconds
+
+
+def server_timing_header(spans: Dict[str, List[float]], total_seconds: float) -> str:
+    """Format spans as a Server-Timing value, durations in milliseconds"""
+    parts = []
+    for name, (calls, seconds) in spans.items():
+        part = f"{name};dur={seconds * 1000:.1f}"
+        if calls > 1:
+            part += f';desc="{int(calls)} calls"'
+        parts.append(part)
+    parts.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def _header(scope, name: bytes) -> str:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware collecting database and AI spans for each HTTP request
+    and sending them in a Server-Timing header. Spans recorded after the
+    headers go out (while a response is still streaming) are not included.
+
+    Requests with `X-Profile: 1` and a valid `X-Admin-Key` are also run
+    under pyinstrument. The HTML report is written to settings.profile_dir
+    and its file name returned in `X-Profile-Report`. Without pyinstrument
+    they are answered with 400 rather than run unprofiled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        settings = get_settings()
+        if scope["type"] != "http" or not settings.server_timing_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        spans: Dict[str, List[float]] = {}
+        token = _spans.set(spans)
+        started = time.perf_counter()
+        extra_headers: List[Tuple[bytes, bytes]] = []
+
+        profiler = None
+        report_path = None
+        if _header(scope, b"x-profile") == "1":
+            try:
+                profiler, error = self._start_profiler(scope)
+            except ImportError:
+                _spans.reset(token)
+                response = JSONResponse(
+                    {"detail": "Profiling requires pyinstrument, which is not installed on this server"},
+                    status_code=400
+                )
+                await response(scope, receive, send)
+                return
+            if profiler:
+                report_path = os.path.join(settings.profile_dir, f"{int(time.time())}-{uuid.uuid4().hex[:8]}.html")
+                extra_headers.append((b"x-profile-report", os.path.basename(report_path).encode()))
+            else:
+                extra_headers.append((b"x-profile-error", error.encode()))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                value = server_timing_header(spans, time.perf_counter() - started)
+                message = {
+                    **message,
+                    "headers": list(message.get("headers", [])) + [(b"server-timing", value.encode())] + extra_headers
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _spans.reset(token)
+            if profiler:
+                profiler.stop()
+                os.makedirs(settings.profile_dir, exist_ok=True)
+                with open(report_path, "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+
+    @staticmethod
+    def _start_profiler(scope):
+        """
+        Start a profiler for an authorized request, or explain why not.
+        Raises ImportError when pyinstrument is not installed.
+        """
+        admin_key = get_settings().admin_api_key
+        if not admin_key or not hmac.compare_digest(_header(scope, b"x-admin-key").encode(), admin_key.encode()):
+            return None, "admin key required"
+        from pyinstrument import Profiler
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        return profiler, ""
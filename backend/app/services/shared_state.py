@@ -0,0 +1,205 @@
+"""
+Shared State
+Key-value store for state that must agree across uvicorn worker processes
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Any, Dict, Tuple
+
+from app.config import get_settings
+
+
+class SharedState:
+    """
+    Minimal key-value interface used for job records, cached insights,
+    index versions and metric snapshots. Values must be JSON-serializable.
+    `shared` tells whether other processes see the same data.
+    """
+
+    shared = False
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def add(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> bool:
+        """Set only if the key is missing or expired; True if it was set"""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        """Add to an integer value (missing counts as 0), returns the new value"""
+        raise NotImplementedError
+
+    def scan(self, prefix: str) -> Dict[str, Any]:
+        """All live entries whose key starts with prefix"""
+        raise NotImplementedError
+
+
+class MemoryState(SharedState):
+    """Process-local store; the default when running a single worker"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries
+        # key -> (value, expires_at or None)
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl_seconds if ttl_seconds else None
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        self._writes += 1
+        if self._writes % 256 == 0:
+            self._purge_expired()
+        if self.max_entries:
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def add(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> bool:
+        if self.get(key) is not None:
+            return False
+        self.set(key, value, ttl_seconds)
+        return True
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        value = int(self.get(key) or 0) + amount
+        self.set(key, value)
+        return value
+
+    def scan(self, prefix: str) -> Dict[str, Any]:
+        self._purge_expired()
+        return {key: value for key, (value, _) in self._entries.items() if key.startswith(prefix)}
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        expired = [key for key, (_, expires_at) in self._entries.items() if expires_at is not None and expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+
+
+class SQLiteState(SharedState):
+    """
+    Store in a local SQLite file in WAL mode, shared by every worker on the
+    host. Each process opens its own connection; writes are single short
+    transactions, so readers never block and writers wait at most
+    busy_timeout for each other. Calls run on the event loop, so the
+    timeout is kept short: a write that cannot get the lock in time raises
+    instead of stalling every request on the worker.
+    """
+
+    shared = True
+
+    def __init__(self, path: str, busy_timeout_ms: int = 200):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork, reopen in each worker process
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS shared_state ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value FROM shared_state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, default=str), expires_at)
+            )
+
+    def add(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> bool:
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            cursor = self._connection().execute(
+                "INSERT INTO shared_state (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+                "WHERE shared_state.expires_at IS NOT NULL AND shared_state.expires_at <= ?",
+                (key, json.dumps(value, default=str), expires_at, now)
+            )
+        return cursor.rowcount > 0
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM shared_state WHERE key = ?", (key,))
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            row = self._connection().execute(
+                "INSERT INTO shared_state (key, value, expires_at) VALUES (?, ?, NULL) "
+                "ON CONFLICT(key) DO UPDATE SET value = CAST(shared_state.value AS INTEGER) + ? "
+                "RETURNING value",
+                (key, str(amount), amount)
+            ).fetchone()
+        return int(row[0])
+
+    def scan(self, prefix: str) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM shared_state WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+            rows = conn.execute(
+                "SELECT key, value FROM shared_state WHERE substr(key, 1, ?) = ?",
+                (len(prefix), prefix)
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+
+@lru_cache()
+def get_shared_state() -> SharedState:
+    """
+    Shared state of this process. 'auto' uses SQLite when running more
+    than one worker and memory otherwise.
+    """
+    settings = get_settings()
+    backend = settings.shared_state_backend
+    if backend == "auto":
+        backend = "sqlite" if settings.web_concurrency > 1 else "memory"
+    if backend == "sqlite":
+        path = settings.shared_state_path or os.path.join(tempfile.gettempdir(), "fitbridge-state.sqlite3")
+        return SQLiteState(path, settings.shared_state_busy_timeout_ms)
+    return MemoryState()
@@ -0,0 +1,215 @@
+"""
+Simulated Provider
+Offline stand-in for AsyncOpenAI with realistic latency, streaming and failures
+"""
+
+import asyncio
+import json
+import random
+import re
+from types import SimpleNamespace
+from typing import Optional, List, Dict, Any, AsyncIterator
+
+import httpx
+import openai
+
+from app.config import Settings
+from app.services.ai_service import MOCK_WORKOUT_PLAN, MOCK_DIET_PLAN, MOCK_PROGRESS_ANALYSIS
+
+
+SIMULATED_URL = "http://simulated.local/v1/chat/completions"
+
+CHAT_ANSWER = (
+    "Good question! Focus on consistency first: train three to four times a week, "
+    "add a little weight or a rep each session, and keep most sets one or two reps "
+    "short of failure. Eat enough protein (around 1.6 g per kg of body weight), "
+    "sleep seven to nine hours, and take a lighter week every month or two. "
+    "Want me to turn this into a plan for you?"
+)
+
+# Roughly one token per word piece, keeping whitespace attached
+TOKEN_PATTERN = re.compile(r"\s*\S{1,4}")
+
+
+def split_tokens(text: str) -> List[str]:
+    """Split text into token-sized pieces that join back to the original"""
+    return TOKEN_PATTERN.findall(text)
+
+
+def simulated_content(messages: List[Dict[str, Any]], json_mode: bool) -> str:
+    """Canned answer shaped like what the prompt asks for"""
+    system = next((m["content"] for m in messages if m["role"] == "system"), "")
+    if not json_mode:
+        return CHAT_ANSWER
+    if '"days": [' in system:
+        schedule = MOCK_WORKOUT_PLAN["schedule"]
+        return json.dumps({
+            "title": MOCK_WORKOUT_PLAN["title"],
+            "duration": MOCK_WORKOUT_PLAN["duration"],
+            "difficulty": MOCK_WORKOUT_PLAN["difficulty"],
+            "days": [day["dayTitle"] for day in schedule]
+        })
+    if "one day of a workout plan" in system:
+        return json.dumps(MOCK_WORKOUT_PLAN["schedule"][0])
+    if "workout" in system:
+        return json.dumps(MOCK_WORKOUT_PLAN)
+    if "nutritionist" in system:
+        return json.dumps(MOCK_DIET_PLAN)
+    return json.dumps(MOCK_PROGRESS_ANALYSIS)
+
+
+class SimulatedCompletions:
+    """chat.completions of the simulated client"""
+
+    def __init__(self, client: "SimulatedAsyncOpenAI"):
+        self._client = client
+
+    async def create(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        stream: bool = False,
+        max_tokens: Optional[int] = None,
+        stream_options: Optional[Dict[str, Any]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        **kwargs
+    ):
+        """Same contract as AsyncOpenAI.chat.completions.create, including retries"""
+        client = self._client
+        timeout = timeout if timeout is not None else client.timeout
+        attempt = 0
+        while True:
+            try:
+                return await asyncio.wait_for(
+                    self._attempt(model, messages, stream, max_tokens, stream_options, response_format),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                error = openai.APITimeoutError(request=httpx.Request("POST", SIMULATED_URL))
+            except (openai.RateLimitError, openai.InternalServerError) as e:
+                error = e
+            if attempt >= client.max_retries:
+                raise error
+            # Exponential backoff with jitter, like the openai client
+            delay = min(client.backoff_seconds * 2 ** attempt, 8.0)
+            await asyncio.sleep(delay * (1 - 0.25 * client.rng.random()))
+            attempt += 1
+
+    async def _attempt(self, model, messages, stream, max_tokens, stream_options, response_format):
+        """One request: wait for the first token, then fail or answer"""
+        client = self._client
+        client.calls += 1
+        await asyncio.sleep(client.jittered(client.ttft_seconds))
+
+        roll = client.rng.random()
+        if roll < client.rate_limit_rate:
+            raise openai.RateLimitError(
+                "Simulated rate limit", response=httpx.Response(429, request=httpx.Request("POST", SIMULATED_URL)), body=None
+            )
+        if roll < client.rate_limit_rate + client.error_rate:
+            raise openai.InternalServerError(
+                "Simulated server error", response=httpx.Response(500, request=httpx.Request("POST", SIMULATED_URL)), body=None
+            )
+
+        json_mode = bool(response_format and response_format.get("type") == "json_object")
+        tokens = split_tokens(simulated_content(messages, json_mode))
+        prompt_tokens = sum(len(split_tokens(str(m.get("content", "")))) for m in messages)
+        finish_reason = "stop"
+        if max_tokens and len(tokens) > max_tokens:
+            tokens, finish_reason = tokens[:max_tokens], "length"
+        if client.rng.random() < client.truncation_rate:
+            tokens, finish_reason = tokens[:max(1, int(len(tokens) * client.rng.uniform(0.2, 0.9)))], "length"
+        usage = SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=len(tokens),
+            total_tokens=prompt_tokens + len(tokens)
+        )
+
+        if stream:
+            include_usage = bool(stream_options and stream_options.get("include_usage"))
+            return self._stream(model, tokens, finish_reason, usage if include_usage else None)
+
+        await asyncio.sleep(client.jittered(len(tokens) / client.tokens_per_second))
+        message = SimpleNamespace(role="assistant", content="".join(tokens))
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, message=message, finish_reason=finish_reason)],
+            usage=usage
+        )
+
+    async def _stream(self, model, tokens, finish_reason, usage) -> AsyncIterator[SimpleNamespace]:
+        """Yield tokens at the configured rate; a final chunk carries usage if asked"""
+        client = self._client
+        per_token = 1 / client.tokens_per_second
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(client.jittered(per_token))
+            last = i == len(tokens) - 1
+            yield SimpleNamespace(
+                model=model,
+                choices=[SimpleNamespace(
+                    index=0,
+                    delta=SimpleNamespace(content=token),
+                    finish_reason=finish_reason if last else None
+                )],
+                usage=None
+            )
+        if usage:
+            yield SimpleNamespace(model=model, choices=[], usage=usage)
+
+
+class SimulatedAsyncOpenAI:
+    """
+    Drop-in for AsyncOpenAI that answers locally with canned content.
+    Latency follows time-to-first-token plus tokens/sec with jitter, and a
+    share of calls fail with 429s, 500s or truncated output. Failed calls
+    are retried with backoff up to max_retries, then raise the same
+    exception types as the openai client.
+    """
+
+    def __init__(
+        self,
+        ttft_seconds: float = 0.6,
+        tokens_per_second: float = 40.0,
+        jitter: float = 0.3,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        truncation_rate: float = 0.0,
+        timeout: float = 60.0,
+        max_retries: int = 2,
+        backoff_seconds: float = 0.5,
+        seed: Optional[int] = None
+    ):
+        self.ttft_seconds = ttft_seconds
+        self.tokens_per_second = max(tokens_per_second, 0.001)
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.truncation_rate = truncation_rate
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimulatedCompletions(self))
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "SimulatedAsyncOpenAI":
+        return cls(
+            ttft_seconds=settings.sim_ttft_seconds,
+            tokens_per_second=settings.sim_tokens_per_second,
+            jitter=settings.sim_jitter,
+            error_rate=settings.sim_error_rate,
+            rate_limit_rate=settings.sim_rate_limit_rate,
+            truncation_rate=settings.sim_truncation_rate,
+            timeout=settings.ai_timeout_seconds,
+            max_retries=settings.ai_max_retries,
+            seed=settings.sim_seed
+        )
+
+    def jittered(self, seconds: float) -> float:
+        """seconds with normal jitter, never negative"""
+        if seconds <= 0:
+            return 0.0
+        return max(0.0, self.rng.gauss(seconds, seconds * self.jitter))
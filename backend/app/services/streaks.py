@@ -0,0 +1,189 @@
+"""
+Streaks
+Per-user day-activity bitmaps for each streak type, with current and longest streaks
+"""
+
+import base64
+from datetime import date, timedelta
+from typing import Optional, Dict, Any, Iterable
+
+
+STREAK_TYPES = ("workout", "diet", "login", "steps")
+
+# Days of activity kept per bitmap: a year-long heatmap plus a margin
+BITMAP_DAYS = 400
+HEATMAP_DAYS = 365
+
+XP_PER_DAY = 10
+XP_PER_LEVEL = 100
+# Same titles the web client assigns
+LEVEL_TITLES = ["Beginner", "Rising Star", "Fitness Enthusiast", "Fitness Pro", "Elite Athlete"]
+
+
+def _date(value) -> Optional[date]:
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class ActivityStreak:
+    """
+    Days with activity for one user and streak type, as an integer bitmap
+    where bit i stands for `start + i days`. Only the last BITMAP_DAYS days
+    are kept (about 50 bytes); the longest streak is stored alongside.
+
+    `current` is the run of consecutive days ending at `last`. Marking the
+    day after `last` (the usual case) extends it in O(1). A day filled in
+    before `last` may join two runs, so only the run around it is rescanned.
+    Marking a day twice changes nothing.
+    """
+
+    def __init__(
+        self,
+        streak_type: str,
+        start: Optional[date] = None,
+        bits: int = 0,
+        current: int = 0,
+        longest: int = 0,
+        last: Optional[date] = None,
+        xp: int = 0
+    ):
+        self.streak_type = streak_type
+        self.start = start
+        self.bits = bits
+        self.current = current
+        self.longest = longest
+        self.last = last
+        self.xp = xp
+
+    # ==========================================
+    # STORAGE
+    # ==========================================
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "ActivityStreak":
+        """Load a `streaks` row; rows written before bitmaps existed start empty"""
+        encoded = row.get("activity_bits")
+        return cls(
+            row["streak_type"],
+            start=_date(row.get("activity_start")),
+            bits=int.from_bytes(base64.b64decode(encoded), "little") if encoded else 0,
+            current=row.get("current_streak") or 0,
+            longest=row.get("longest_streak") or 0,
+            last=_date(row.get("last_activity_date")),
+            xp=row.get("xp_earned") or 0
+        )
+
+    def to_row(self) -> Dict[str, Any]:
+        """Columns of the `streaks` row, with the streak as stored (not as of today)"""
+        level = self.xp // XP_PER_LEVEL + 1
+        return {
+            "streak_type": self.streak_type,
+            "current_streak": self.current,
+            "longest_streak": self.longest,
+            "last_activity_date": self.last.isoformat() if self.last else None,
+            "xp_earned": self.xp,
+            "level": level,
+            "level_title": LEVEL_TITLES[min(level - 1, len(LEVEL_TITLES) - 1)],
+            "activity_start": self.start.isoformat() if self.start else None,
+            "activity_bits": base64.b64encode(self.bits.to_bytes((self.bits.bit_length() + 7) // 8, "little")).decode()
+        }
+
+    # ==========================================
+    # UPDATES
+    # ==========================================
+
+    def mark(self, day: date) -> bool:
+        """Record activity on a day; False if it was already recorded or is too old to keep"""
+        if self.start is None:
+            self.start = day
+        offset = (day - self.start).days
+        if offset < 0:
+            newest = self.last or self.start
+            if (newest - day).days >= BITMAP_DAYS:
+                return False
+            self.bits <<= -offset
+            self.start, offset = day, 0
+        if self.bits >> offset & 1:
+            return False
+
+        self.bits |= 1 << offset
+        self.xp += XP_PER_DAY
+        if self.last is None or day > self.last:
+            self.current = self.current + 1 if self.last and (day - self.last).days == 1 else 1
+            self.last = day
+        else:
+            run_start, run_end = self._run_around(offset)
+            if run_end == (self.last - self.start).days:
+                self.current = max(self.current, run_end - run_start + 1)
+            self.longest = max(self.longest, run_end - run_start + 1)
+        self.longest = max(self.longest, self.current)
+        self._trim()
+        return True
+
+    @classmethod
+    def from_dates(cls, streak_type: str, days: Iterable[date]) -> "ActivityStreak":
+        """Exact streaks over all given activity days, for backfills and rebuilds"""
+        ordinals = sorted({day.toordinal() for day in days})
+        streak = cls(streak_type)
+        if not ordinals:
+            return streak
+        run = 0
+        previous = None
+        for ordinal in ordinals:
+            run = run + 1 if previous is not None and ordinal == previous + 1 else 1
+            streak.longest = max(streak.longest, run)
+            previous = ordinal
+        streak.current = run
+        streak.last = date.fromordinal(ordinals[-1])
+        streak.start = date.fromordinal(max(ordinals[0], ordinals[-1] - BITMAP_DAYS + 1))
+        first = streak.start.toordinal()
+        for ordinal in ordinals:
+            if ordinal >= first:
+                streak.bits |= 1 << (ordinal - first)
+        streak.xp = len(ordinals) * XP_PER_DAY
+        return streak
+
+    def _run_around(self, offset: int):
+        """First and last offsets of the run of set bits containing offset"""
+        run_start = offset
+        while run_start > 0 and self.bits >> (run_start - 1) & 1:
+            run_start -= 1
+        run_end = offset
+        while self.bits >> (run_end + 1) & 1:
+            run_end += 1
+        return run_start, run_end
+
+    def _trim(self) -> None:
+        """Drop days older than BITMAP_DAYS before the newest"""
+        excess = (self.last - self.start).days - BITMAP_DAYS + 1 if self.last else 0
+        if excess > 0:
+            self.bits >>= excess
+            self.start += timedelta(days=excess)
+
+    # ==========================================
+    # READS
+    # ==========================================
+
+    def current_as_of(self, today: date) -> int:
+        """The current streak, which is broken once a whole day passes without activity"""
+        if self.last is None or (today - self.last).days > 1:
+            return 0
+        return self.current
+
+    def heatmap(self, end: date, days: int = HEATMAP_DAYS) -> bytes:
+        """Activity of the `days` days ending at `end`, bit i (LSB first) for `end - days + 1 + i`"""
+        if self.start is None:
+            return bytes((days + 7) // 8)
+        shift = (end - timedelta(days=days - 1) - self.start).days
+        window = self.bits >> shift if shift >= 0 else self.bits << -shift
+        window &= (1 << days) - 1
+        return window.to_bytes((days + 7) // 8, "little")
+
+
+def present_streak(row: Dict[str, Any], today: date) -> Dict[str, Any]:
+    """A stored row as returned to clients: current streak as of today, no bitmap"""
+    streak = ActivityStreak.from_row(row)
+    result = {k: v for k, v in row.items() if k not in ("activity_start", "activity_bits")}
+    result["current_streak"] = streak.current_as_of(today)
+    return result
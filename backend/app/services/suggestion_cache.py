@@ -0,0 +1,140 @@
+"""
+Suggestion Cache
+Cached answers for the suggested chat questions
+"""
+
+import asyncio
+import os
+import time
+from typing import Optional, List, Dict, Any, Callable, Iterator
+
+from app.services.shared_state import SharedState, MemoryState
+
+
+DEFAULT_SUGGESTIONS = [
+    "What's the best workout routine for building muscle?",
+    "How many calories should I eat to lose weight?",
+    "Can you explain proper squat form?",
+    "What should I eat before a workout?",
+    "How can I improve my sleep for better recovery?",
+    "What are the benefits of HIIT training?",
+    "How do I track my macros effectively?",
+    "What's a good stretching routine?"
+]
+
+
+def _normalize(question: str) -> str:
+    return " ".join(question.split()).lower()
+
+
+class SuggestionCache:
+    """
+    Suggested questions with answers cached after they are first asked.
+    A chat message that exactly matches a suggestion and carries no history
+    or personal context is answered from the cache instead of the AI.
+    Questions and answers live in the given shared state, so a suggestion
+    registered on one worker is served by all of them.
+    """
+
+    def __init__(self, questions: Optional[List[str]] = None, state: Optional[SharedState] = None):
+        self.state = state or MemoryState()
+        for question in questions if questions is not None else DEFAULT_SUGGESTIONS:
+            self.register(question)
+
+    def questions(self) -> List[str]:
+        """Suggested questions in display order"""
+        return list(self.state.get("suggestions") or [])
+
+    def register(self, question: str, answer: Optional[str] = None) -> None:
+        """Add a suggestion, optionally with its answer"""
+        question = question.strip()
+        questions = self.questions()
+        if _normalize(question) not in {_normalize(q) for q in questions}:
+            self.state.set("suggestions", questions + [question])
+        if answer:
+            self.state.set(f"suggestion:{_normalize(question)}", {"answer": answer, "generated_at": time.time()})
+
+    def _answer(self, question: str) -> Optional[Dict[str, Any]]:
+        return self.state.get(f"suggestion:{_normalize(question)}")
+
+    def is_suggestion(
+        self,
+        message: str,
+        history: Optional[List[Any]] = None,
+        user_context: Optional[Dict] = None
+    ) -> bool:
+        """Whether a generic answer to this message may be cached"""
+        if history or user_context:
+            return False
+        return _normalize(message) in {_normalize(q) for q in self.questions()}
+
+    def lookup(
+        self,
+        message: str,
+        history: Optional[List[Any]] = None,
+        user_context: Optional[Dict] = None
+    ) -> Optional[str]:
+        """Cached answer for a generic suggestion, or None"""
+        if history or user_context:
+            return None
+        entry = self._answer(message)
+        return entry["answer"] if entry else None
+
+    def stale_questions(self, max_age_seconds: float) -> List[str]:
+        """Questions with no answer yet or one older than max_age_seconds"""
+        cutoff = time.time() - max_age_seconds
+        stale = []
+        for question in self.questions():
+            entry = self._answer(question)
+            if not entry or entry["generated_at"] < cutoff:
+                stale.append(question)
+        return stale
+
+    async def refresh(self, ai_service, questions: Optional[List[str]] = None, concurrency: int = 2) -> int:
+        """Generate answers for the given questions (all by default)"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def generate(question: str) -> bool:
+            async with semaphore:
+                try:
+                    answer = await ai_service.chat(question)
+                    if ai_service.finish_reason != "stop":
+                        raise ValueError(f"answer cut short ({ai_service.finish_reason})")
+                    self.register(question, answer)
+                    return True
+                except Exception as e:
+                    print(f"Suggestion answer failed for {question!r}: {e}")
+                    return False
+
+        results = await asyncio.gather(*[generate(q) for q in questions or self.questions()])
+        return sum(results)
+
+    async def refresh_periodically(
+        self,
+        ai_service_factory: Callable[[], Any],
+        interval_seconds: float
+    ) -> None:
+        """
+        Keep answers fresh: generate missing and stale ones, then sleep. The
+        first round runs at startup, so suggestions registered without an
+        answer are warmed before anyone asks. With several workers only the
+        one that claims a round refreshes in it.
+        """
+        while True:
+            round_seconds = min(interval_seconds, 3600)
+            stale = self.stale_questions(interval_seconds)
+            if stale and self.state.add("suggestions:refreshing", os.getpid(), round_seconds / 2):
+                ai_service = ai_service_factory()
+                refreshed = await self.refresh(ai_service, stale) if ai_service.is_ready() else 0
+                if refreshed:
+                    print(f"Suggestion cache refreshed {refreshed}/{len(stale)} answers")
+                else:
+                    # Nothing was refreshed here, let another worker try this round
+                    self.state.delete("suggestions:refreshing")
+            await asyncio.sleep(round_seconds)
+
+
+def stream_cached(answer: str, chunk_size: int = 256) -> Iterator[str]:
+    """Split a cached answer into a few large chunks for streaming"""
+    for start in range(0, len(answer), chunk_size):
+        yield answer[start:start + chunk_size]
@@ -3,13 +3,42 @@ Supabase Service
 Handles all database operations with Supabase or in-memory mock storage
 """
 
-from typing import Optional, List, Dict, Any
-from datetime import date, datetime, timedelta
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
 import uuid
 
 from app.config import Settings
+from app.services import data_version
+from app.services.data_version import bumps_data_version
+from app.services.metrics import instrument_db_methods
+from app.services.streaks import ActivityStreak
 
 
+# Column each exportable table is paged by, with `id` breaking ties
+EXPORT_DATE_COLUMNS = {
+    'workout_logs': 'workout_date',
+    'diet_logs': 'log_date',
+    'daily_logs': 'log_date',
+    'weight_history': 'recorded_at'
+}
+
+# Rows per request when reading long histories (the API caps responses at 1000)
+READ_PAGE_SIZE = 1000
+
+
+@lru_cache(maxsize=4)
+def get_supabase_client(url: str, key: str):
+    """
+    Supabase client shared by all SupabaseService instances, so its
+    connection pool is reused across requests. The SDK is imported here, so
+    mock mode never loads it.
+    """
+    from supabase import create_client
+    return create_client(url, key)
+
+
+@instrument_db_methods
 class SupabaseService:
     """Service for Supabase database operations (with mock mode support)"""
     
@@ -20,8 +49,7 @@ class SupabaseService:
         
         if not self.is_mock:
             try:
-                from supabase import create_client
-                self.client = create_client(
+                self.client = get_supabase_client(
                     settings.supabase_url,
                     settings.supabase_service_role_key
                 )
@@ -37,7 +65,8 @@ class SupabaseService:
             'daily_logs': {},
             'streaks': {},
             'ai_plans': [],
-            'weight_history': []
+            'weight_history': [],
+            'token_usage': {}
         }
     
     # ==========================================
@@ -60,6 +89,7 @@ class SupabaseService:
         response = self.client.table('users').select('*').eq('id', user_id).single().execute()
         return response.data
     
+    @bumps_data_version
     async def update_user_profile(self, user_id: str, data: Dict) -> Dict:
         """Update user profile"""
         if self.is_mock:
@@ -69,10 +99,36 @@ class SupabaseService:
         response = self.client.table('users').update(data).eq('id', user_id).execute()
         return response.data[0] if response.data else None
     
+    async def get_daily_plan_users(
+        self,
+        limit: int = 200,
+        after_id: Optional[str] = None
+    ) -> List[Dict]:
+        """Get users opted in to precomputed daily plans, paginated by ID"""
+        if self.is_mock:
+            users = sorted(
+                (u for u in self._mock_data['users'].values() if u.get('daily_plan_opt_in')),
+                key=lambda u: u['id']
+            )
+            if after_id:
+                users = [u for u in users if u['id'] > after_id]
+            return users[:limit]
+        
+        query = (
+            self.client.table('users')
+            .select('id, weight, height, goal, fitness_level, daily_plan_prompt')
+            .eq('daily_plan_opt_in', True)
+        )
+        if after_id:
+            query = query.gt('id', after_id)
+        response = query.order('id').limit(limit).execute()
+        return response.data or []
+    
     # ==========================================
     # WORKOUT LOG OPERATIONS
     # ==========================================
     
+    @bumps_data_version
     async def create_workout_log(
         self,
         user_id: str,
@@ -130,6 +186,23 @@ class SupabaseService:
         )
         return response.data or []
     
+    async def get_workout_logs_since(self, user_id: str, start_date: str) -> List[Dict]:
+        """Get all workout logs on or after start_date"""
+        if self.is_mock:
+            return [
+                l for l in self._mock_data['workout_logs']
+                if l['user_id'] == user_id and l['workout_date'] >= start_date
+            ]
+        
+        response = (
+            self.client.table('workout_logs')
+            .select('workout_date, duration_minutes, calories_burned')
+            .eq('user_id', user_id)
+            .gte('workout_date', start_date)
+            .execute()
+        )
+        return response.data or []
+    
     async def get_workout_log(self, user_id: str, workout_id: str) -> Optional[Dict]:
         """Get a specific workout log"""
         if self.is_mock:
@@ -148,6 +221,7 @@ class SupabaseService:
         )
         return response.data
     
+    @bumps_data_version
     async def delete_workout_log(self, user_id: str, workout_id: str) -> bool:
         """Delete a workout log"""
         if self.is_mock:
@@ -199,6 +273,7 @@ class SupabaseService:
     # DIET LOG OPERATIONS
     # ==========================================
     
+    @bumps_data_version
     async def create_diet_log(
         self,
         user_id: str,
@@ -268,6 +343,24 @@ class SupabaseService:
         )
         return response.data or []
     
+    async def get_diet_logs_since(self, user_id: str, start_date: str) -> List[Dict]:
+        """Get all diet logs on or after start_date"""
+        if self.is_mock:
+            return [
+                l for l in self._mock_data['diet_logs']
+                if l['user_id'] == user_id and l['log_date'] >= start_date
+            ]
+        
+        response = (
+            self.client.table('diet_logs')
+            .select('log_date, calories, protein, carbs, fats')
+            .eq('user_id', user_id)
+            .gte('log_date', start_date)
+            .execute()
+        )
+        return response.data or []
+    
+    @bumps_data_version
     async def delete_diet_log(self, user_id: str, meal_id: str) -> bool:
         """Delete a diet log"""
         if self.is_mock:
@@ -325,6 +418,7 @@ class SupabaseService:
     # DAILY LOG OPERATIONS
     # ==========================================
     
+    @bumps_data_version
     async def update_daily_log(
         self,
         user_id: str,
@@ -428,16 +522,9 @@ class SupabaseService:
     # ==========================================
     
     async def get_user_streaks(self, user_id: str) -> List[Dict]:
-        """Get all streaks for a user"""
+        """Get all streak rows of a user, including activity bitmaps"""
         if self.is_mock:
-            if user_id not in self._mock_data['streaks']:
-                self._mock_data['streaks'][user_id] = [
-                    {'streak_type': 'workout', 'current_streak': 5, 'longest_streak': 12, 'xp_earned': 250},
-                    {'streak_type': 'diet', 'current_streak': 3, 'longest_streak': 7, 'xp_earned': 150},
-                    {'streak_type': 'login', 'current_streak': 10, 'longest_streak': 15, 'xp_earned': 100},
-                    {'streak_type': 'steps', 'current_streak': 2, 'longest_streak': 5, 'xp_earned': 50}
-                ]
-            return self._mock_data['streaks'][user_id]
+            return [dict(row) for row in self._mock_data['streaks'].get(user_id, {}).values()]
         
         response = (
             self.client.table('streaks')
@@ -447,65 +534,40 @@ class SupabaseService:
         )
         return response.data or []
     
+    @bumps_data_version
     async def update_streak(
         self,
         user_id: str,
         streak_type: str,
-        increment: bool = True
+        activity_date: Optional[str] = None
     ) -> Dict:
-        """Update a specific streak"""
-        if self.is_mock:
-            streaks = await self.get_user_streaks(user_id)
-            for streak in streaks:
-                if streak['streak_type'] == streak_type:
-                    if increment:
-                        streak['current_streak'] += 1
-                        streak['xp_earned'] += 10
-                        streak['longest_streak'] = max(streak['longest_streak'], streak['current_streak'])
-                    else:
-                        streak['current_streak'] = 0
-                    return streak
-            return {}
-        
-        response = (
-            self.client.table('streaks')
-            .select('*')
-            .eq('user_id', user_id)
-            .eq('streak_type', streak_type)
-            .single()
-            .execute()
-        )
-        
-        if response.data:
-            streak = response.data
-            today = date.today().isoformat()
-            
-            if increment:
-                new_streak = streak['current_streak'] + 1
-            else:
-                new_streak = 0
-            
-            update_data = {
-                'current_streak': new_streak,
-                'longest_streak': max(streak['longest_streak'], new_streak),
-                'last_activity_date': today,
-                'xp_earned': streak['xp_earned'] + (10 if increment else 0)
-            }
-            
-            result = (
-                self.client.table('streaks')
-                .update(update_data)
-                .eq('id', streak['id'])
-                .execute()
-            )
-            return result.data[0] if result.data else None
+        """Record activity for a streak on a date or timestamp (default today); repeat days are ignored"""
+        day = date.fromisoformat(activity_date[:10]) if activity_date else date.today()
+        rows = {row['streak_type']: row for row in await self.get_user_streaks(user_id)}
+        row = rows.get(streak_type)
+        streak = ActivityStreak.from_row(row) if row else ActivityStreak(streak_type)
+        if not streak.mark(day) and row:
+            return row
+        return (await self.save_streaks(user_id, [streak.to_row()]))[0]
+    
+    @bumps_data_version
+    async def save_streaks(self, user_id: str, rows: List[Dict]) -> List[Dict]:
+        """Insert or replace streak rows (one per streak_type)"""
+        rows = [{**row, 'user_id': user_id} for row in rows]
+        if self.is_mock:
+            streaks = self._mock_data['streaks'].setdefault(user_id, {})
+            for row in rows:
+                streaks[row['streak_type']] = row
+            return rows
         
-        return None
+        response = self.client.table('streaks').upsert(rows, on_conflict='user_id,streak_type').execute()
+        return response.data or []
     
     # ==========================================
     # AI PLANS OPERATIONS
     # ==========================================
     
+    @bumps_data_version
     async def save_ai_plan(
         self,
         user_id: str,
@@ -513,7 +575,8 @@ class SupabaseService:
         title: str,
         plan_data: Dict,
         prompt_used: str,
-        generated_by: str = "openai"
+        generated_by: str = "openai",
+        plan_date: Optional[str] = None
     ) -> Dict:
         """Save an AI-generated plan"""
         plan = {
@@ -527,6 +590,8 @@ class SupabaseService:
             'is_active': True,
             'created_at': datetime.now().isoformat()
         }
+        if plan_date:
+            plan['plan_date'] = plan_date
         
         if self.is_mock:
             self._mock_data['ai_plans'].append(plan)
@@ -535,24 +600,69 @@ class SupabaseService:
         response = self.client.table('ai_plans').insert(plan).execute()
         return response.data[0] if response.data else None
     
-    async def get_active_plans(self, user_id: str) -> List[Dict]:
-        """Get active AI plans for a user"""
+    async def get_active_plans(
+        self,
+        user_id: str,
+        plan_date: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Get active AI plans for a user, optionally only those for one date.
+        Without a date, precomputed daily plans for past days (UTC) are left
+        out, so the list does not grow with every nightly batch.
+        """
+        today = datetime.now(timezone.utc).date().isoformat()
         if self.is_mock:
             return [
                 p for p in self._mock_data['ai_plans'] 
                 if p['user_id'] == user_id and p['is_active']
+                and (p.get('plan_date') == plan_date if plan_date else (p.get('plan_date') or today) >= today)
             ]
         
-        response = (
+        query = (
             self.client.table('ai_plans')
             .select('*')
             .eq('user_id', user_id)
             .eq('is_active', True)
+        )
+        if plan_date:
+            query = query.eq('plan_date', plan_date)
+        else:
+            query = query.or_(f'plan_date.is.null,plan_date.gte.{today}')
+        response = query.order('created_at', desc=True).execute()
+        return response.data or []
+    
+    async def get_planned_user_ids(self, plan_type: str, plan_date: str) -> set:
+        """IDs of users who already have a plan of this type for the date"""
+        if self.is_mock:
+            return {
+                p['user_id'] for p in self._mock_data['ai_plans']
+                if p['plan_type'] == plan_type and p.get('plan_date') == plan_date
+            }
+        
+        response = (
+            self.client.table('ai_plans')
+            .select('user_id')
+            .eq('plan_type', plan_type)
+            .eq('plan_date', plan_date)
+            .execute()
+        )
+        return {row['user_id'] for row in response.data or []}
+    
+    async def get_recent_ai_plans(self, limit: int = 500) -> List[Dict]:
+        """Get the most recently generated plans across all users"""
+        if self.is_mock:
+            return list(reversed(self._mock_data['ai_plans']))[:limit]
+        
+        response = (
+            self.client.table('ai_plans')
+            .select('plan_type, prompt_used, plan_data')
             .order('created_at', desc=True)
+            .limit(limit)
             .execute()
         )
         return response.data or []
     
+    @bumps_data_version
     async def deactivate_plan(self, user_id: str, plan_id: str) -> bool:
         """Deactivate an AI plan"""
         if self.is_mock:
@@ -563,3 +673,266 @@ class SupabaseService:
         
         self.client.table('ai_plans').update({'is_active': False}).eq('user_id', user_id).eq('id', plan_id).execute()
         return True
+    
+    # ==========================================
+    # BULK IMPORT
+    # ==========================================
+    
+    async def get_workout_keys_between(self, user_id: str, start_date: str, end_date: str) -> List[Dict]:
+        """
+        Date, title and duration of workouts in a date range, for duplicate
+        checks, read in pages so long ranges are complete
+        """
+        if self.is_mock:
+            return [
+                {k: l.get(k) for k in ('workout_date', 'title', 'duration_minutes')}
+                for l in self._mock_data['workout_logs']
+                if l['user_id'] == user_id and start_date <= l['workout_date'] <= end_date
+            ]
+        
+        keys = []
+        while True:
+            # `id` breaks ties between same-day workouts so pages don't overlap
+            page = (
+                self.client.table('workout_logs')
+                .select('workout_date, title, duration_minutes')
+                .eq('user_id', user_id)
+                .gte('workout_date', start_date)
+                .lte('workout_date', end_date)
+                .order('workout_date')
+                .order('id')
+                .range(len(keys), len(keys) + READ_PAGE_SIZE - 1)
+                .execute()
+            ).data or []
+            keys.extend(page)
+            if len(page) < READ_PAGE_SIZE:
+                return keys
+    
+    @bumps_data_version
+    async def insert_workout_logs(self, user_id: str, logs: List[Dict]) -> int:
+        """Insert many workout logs in one request, returns rows inserted"""
+        rows = [{'id': str(uuid.uuid4()), 'created_at': datetime.now().isoformat(), **log, 'user_id': user_id} for log in logs]
+        if self.is_mock:
+            self._mock_data['workout_logs'].extend(rows)
+            return len(rows)
+        
+        self.client.table('workout_logs').insert(rows, returning='minimal').execute()
+        return len(rows)
+    
+    async def get_daily_logs_between(
+        self,
+        user_id: str,
+        start_date: str,
+        end_date: str,
+        columns: str = '*'
+    ) -> List[Dict]:
+        """Daily logs in a date range, oldest first, read in pages so long ranges are complete"""
+        if self.is_mock:
+            return sorted((
+                dict(l) for l in self._mock_data['daily_logs'].values()
+                if l['user_id'] == user_id and start_date <= l['log_date'] <= end_date
+            ), key=lambda l: l['log_date'])
+        
+        logs = []
+        while True:
+            page = (
+                self.client.table('daily_logs')
+                .select(columns)
+                .eq('user_id', user_id)
+                .gte('log_date', start_date)
+                .lte('log_date', end_date)
+                .order('log_date')
+                .range(len(logs), len(logs) + READ_PAGE_SIZE - 1)
+                .execute()
+            ).data or []
+            logs.extend(page)
+            if len(page) < READ_PAGE_SIZE:
+                return logs
+    
+    @bumps_data_version
+    async def upsert_daily_logs(self, user_id: str, logs: List[Dict]) -> int:
+        """Insert or update many daily logs (one per log_date) in one request"""
+        rows = [{**log, 'user_id': user_id} for log in logs]
+        if self.is_mock:
+            for row in rows:
+                key = f"{user_id}_{row['log_date']}"
+                existing = self._mock_data['daily_logs'].get(key, {
+                    'id': str(uuid.uuid4()), 'calories_consumed': 0, 'calories_burned': 0,
+                    'steps': 0, 'workout_completed': False
+                })
+                self._mock_data['daily_logs'][key] = {**existing, **row}
+            return len(rows)
+        
+        self.client.table('daily_logs').upsert(rows, on_conflict='user_id,log_date', returning='minimal').execute()
+        return len(rows)
+    
+    # ==========================================
+    # WEIGHT HISTORY OPERATIONS
+    # ==========================================
+    
+    async def get_weight_history(
+        self,
+        user_id: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Weight entries oldest first, optionally within [start, end] (ISO
+        timestamps). Read in pages so years of readings are not cut off at
+        the API's row limit.
+        """
+        if self.is_mock:
+            entries = [
+                e for e in self._mock_data['weight_history']
+                if e['user_id'] == user_id and (not start or e['recorded_at'] >= start)
+                and (not end or e['recorded_at'] <= end)
+            ]
+            return sorted(entries, key=lambda e: e['recorded_at'])
+        
+        entries = []
+        while True:
+            query = self.client.table('weight_history').select('id, weight, recorded_at, notes').eq('user_id', user_id)
+            if start:
+                query = query.gte('recorded_at', start)
+            if end:
+                query = query.lte('recorded_at', end)
+            page = query.order('recorded_at').order('id').range(
+                len(entries), len(entries) + READ_PAGE_SIZE - 1
+            ).execute().data or []
+            entries.extend(page)
+            if len(page) < READ_PAGE_SIZE:
+                return entries
+    
+    @bumps_data_version
+    async def create_weight_entry(
+        self,
+        user_id: str,
+        weight: float,
+        recorded_at: Optional[str] = None,
+        notes: Optional[str] = None
+    ) -> Dict:
+        """Create a weight entry"""
+        entry = {
+            'id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'weight': weight,
+            'recorded_at': recorded_at or datetime.now(timezone.utc).isoformat(),
+            'notes': notes
+        }
+        
+        if self.is_mock:
+            self._mock_data['weight_history'].append(entry)
+            return entry
+        
+        response = self.client.table('weight_history').insert(entry).execute()
+        return response.data[0] if response.data else None
+    
+    @bumps_data_version
+    async def insert_weight_entries(self, user_id: str, entries: List[Dict]) -> int:
+        """Insert many weight entries in one request, returns rows inserted"""
+        rows = [{'id': str(uuid.uuid4()), **entry, 'user_id': user_id} for entry in entries]
+        if self.is_mock:
+            self._mock_data['weight_history'].extend(rows)
+            return len(rows)
+        
+        self.client.table('weight_history').insert(rows, returning='minimal').execute()
+        return len(rows)
+    
+    @bumps_data_version
+    async def delete_weight_entry(self, user_id: str, entry_id: str) -> bool:
+        """Delete a weight entry"""
+        if self.is_mock:
+            self._mock_data['weight_history'] = [
+                e for e in self._mock_data['weight_history']
+                if not (e['id'] == entry_id and e['user_id'] == user_id)
+            ]
+            return True
+        
+        self.client.table('weight_history').delete().eq('user_id', user_id).eq('id', entry_id).execute()
+        return True
+    
+    # ==========================================
+    # EXPORT
+    # ==========================================
+    
+    async def get_export_page(
+        self,
+        table: str,
+        user_id: str,
+        after: Optional[Tuple[str, str]] = None,
+        limit: int = 500
+    ) -> List[Dict]:
+        """
+        One page of a user's rows in (date, id) order, starting after the
+        (date, id) of the previous page's last row. Keyset paging keeps each
+        page an index range scan however deep into the history it is.
+        """
+        date_column = EXPORT_DATE_COLUMNS[table]
+        if self.is_mock:
+            rows = self._mock_data[table]
+            rows = rows.values() if isinstance(rows, dict) else rows
+            rows = sorted(
+                (r for r in rows if r['user_id'] == user_id and (not after or (r[date_column], r['id']) > after)),
+                key=lambda r: (r[date_column], r['id'])
+            )
+            return rows[:limit]
+        
+        query = self.client.table(table).select('*').eq('user_id', user_id)
+        if after:
+            after_date, after_id = after
+            query = query.or_(
+                f'{date_column}.gt."{after_date}",and({date_column}.eq."{after_date}",id.gt.{after_id})'
+            )
+        response = query.order(date_column).order('id').limit(limit).execute()
+        return response.data or []
+    
+    # ==========================================
+    # TOKEN USAGE
+    # ==========================================
+    
+    async def get_token_usage(self, user_id: str, since: str) -> List[Dict]:
+        """Hourly token usage rows of a user from `since` (ISO timestamp)"""
+        if self.is_mock:
+            return [
+                {'endpoint': endpoint, 'hour': hour, **usage}
+                for (uid, endpoint, hour), usage in self._mock_data['token_usage'].items()
+                if uid == user_id and hour >= since
+            ]
+        
+        response = (
+            self.client.table('token_usage')
+            .select('endpoint, hour, prompt_tokens, completion_tokens')
+            .eq('user_id', user_id)
+            .gte('hour', since)
+            .execute()
+        )
+        return response.data or []
+    
+    async def record_token_usage(self, rows: List[Dict]) -> None:
+        """Add usage deltas (user_id, endpoint, hour, prompt_tokens, completion_tokens)"""
+        if self.is_mock:
+            for row in rows:
+                key = (row['user_id'], row['endpoint'], row['hour'])
+                usage = self._mock_data['token_usage'].setdefault(key, {'prompt_tokens': 0, 'completion_tokens': 0})
+                usage['prompt_tokens'] += row['prompt_tokens']
+                usage['completion_tokens'] += row['completion_tokens']
+            return
+        
+        self.client.rpc('record_token_usage', {'rows': rows}).execute()
+    
+    # ==========================================
+    # DATA VERSIONS
+    # ==========================================
+    
+    async def get_data_version(self, user_id: str) -> int:
+        """Version of the user's data, changed by every write to it"""
+        if self.is_mock:
+            return data_version.get_data_versions().current(user_id)
+        
+        response = (
+            self.client.table('data_versions')
+            .select('version')
+            .eq('user_id', user_id)
+            .execute()
+        )
+        return response.data[0]['version'] if response.data else 0
@@ -0,0 +1,289 @@
+"""
+Token Quota
+Per-user accounting of AI tokens over a rolling day, with quotas per endpoint
+"""
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional, List, Dict, Tuple, Callable, Any
+
+from app.config import Settings, get_settings
+
+
+ENDPOINTS = ("chat", "plan", "progress")
+
+# Quota, user ID and endpoint that AI calls in the current task are billed to
+_owner: ContextVar[Optional[Tuple["TokenQuota", str, str]]] = ContextVar("token_usage_owner", default=None)
+
+
+class QuotaExceededError(Exception):
+    """Raised before a provider call when the user's daily quota is used up"""
+
+    def __init__(self, endpoint: str, used: int, quota: int, retry_after: int):
+        super().__init__(f"Daily {endpoint} token quota reached ({used}/{quota}), try again later")
+        self.endpoint = endpoint
+        self.used = used
+        self.quota = quota
+        self.retry_after = retry_after
+
+
+def billable_user(user_id: Optional[str]) -> Optional[str]:
+    """
+    The user ID if usage can be stored for it, else None. token_usage.user_id
+    is a UUID, and with auth_mode "user_id" a client can send any bearer
+    string, so other IDs are treated like anonymous users.
+    """
+    if not user_id:
+        return None
+    try:
+        uuid.UUID(user_id)
+    except ValueError:
+        return None
+    return user_id
+
+
+def _is_rejected(error: Exception) -> bool:
+    """Whether the database refused rows for good (unknown user, bad UUID) rather than failing for now"""
+    return getattr(error, "code", None) in ("23503", "22P02")
+
+
+def _hour_iso(hour: int) -> str:
+    return datetime.fromtimestamp(hour * 3600, timezone.utc).isoformat()
+
+
+def _hour_of(value: str) -> int:
+    return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()) // 3600
+
+
+class TokenQuota:
+    """
+    Prompt and completion tokens per user and endpoint in hourly buckets.
+    Usage from the last `window_hours` counts against the endpoint's quota
+    (0 means unlimited). A user's history is loaded from the database on
+    first check and reloaded after `reload_seconds`, which also picks up
+    usage flushed by other workers. New usage stays in memory until flush,
+    for at most `max_users` users; while the database is unreachable the
+    oldest users' pending usage is dropped beyond that.
+    """
+
+    def __init__(
+        self,
+        quotas: Dict[str, int],
+        window_hours: int = 24,
+        reload_seconds: float = 300,
+        max_users: int = 10000
+    ):
+        self.quotas = quotas
+        self.window_hours = window_hours
+        self.reload_seconds = reload_seconds
+        self.max_users = max_users
+        # user -> (loaded_at, {(endpoint, hour): [prompt, completion]}) as stored in the database
+        self._stored: "OrderedDict[str, Tuple[float, Dict[Tuple[str, int], List[int]]]]" = OrderedDict()
+        # user -> {(endpoint, hour): [prompt, completion]} not yet flushed
+        self._pending: Dict[str, Dict[Tuple[str, int], List[int]]] = {}
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "TokenQuota":
+        return cls(
+            {
+                "chat": settings.token_quota_chat,
+                "plan": settings.token_quota_plan,
+                "progress": settings.token_quota_progress
+            },
+            reload_seconds=settings.token_quota_flush_seconds * 5
+        )
+
+    # ==========================================
+    # CHECKS
+    # ==========================================
+
+    async def check(self, user_id: Optional[str], endpoint: str, db) -> None:
+        """Raise QuotaExceededError if the user has used up the endpoint's quota"""
+        quota = self.quotas.get(endpoint, 0)
+        user_id = billable_user(user_id)
+        if not user_id or quota <= 0:
+            return
+        await self.ensure_loaded(user_id, db)
+
+        hours = self._hourly_totals(user_id, endpoint)
+        used = sum(hours.values())
+        if used < quota:
+            return
+        # Wait until enough of the oldest hours leave the window
+        now_hour = int(time.time()) // 3600
+        excess = used - quota + 1
+        for hour in sorted(hours):
+            excess -= hours[hour]
+            if excess <= 0:
+                retry_after = (hour + self.window_hours) * 3600 - int(time.time())
+                break
+        else:
+            retry_after = (now_hour + self.window_hours) * 3600 - int(time.time())
+        raise QuotaExceededError(endpoint, used, quota, max(1, retry_after))
+
+    async def ensure_loaded(self, user_id: str, db) -> None:
+        """Load the user's stored usage if missing or older than reload_seconds"""
+        entry = self._stored.get(user_id)
+        if entry is None or time.monotonic() - entry[0] > self.reload_seconds:
+            await self._load(user_id, db)
+
+    def usage(self, user_id: str) -> Dict[str, Dict[str, int]]:
+        """Tokens used per endpoint in the current window, with the quota"""
+        result = {}
+        for endpoint in ENDPOINTS:
+            result[endpoint] = {
+                "used": sum(self._hourly_totals(user_id, endpoint).values()),
+                "quota": self.quotas.get(endpoint, 0)
+            }
+        return result
+
+    def _hourly_totals(self, user_id: str, endpoint: str) -> Dict[int, int]:
+        since = int(time.time()) // 3600 - self.window_hours + 1
+        totals: Dict[int, int] = {}
+        for buckets in (self._stored.get(user_id, (0, {}))[1], self._pending.get(user_id, {})):
+            for (kind, hour), (prompt, completion) in buckets.items():
+                if kind == endpoint and hour >= since:
+                    totals[hour] = totals.get(hour, 0) + prompt + completion
+        return totals
+
+    async def _load(self, user_id: str, db) -> None:
+        since = int(time.time()) // 3600 - self.window_hours + 1
+        rows = await db.get_token_usage(user_id, _hour_iso(since))
+        stored: Dict[Tuple[str, int], List[int]] = {}
+        for row in rows:
+            stored[(row["endpoint"], _hour_of(row["hour"]))] = [row["prompt_tokens"] or 0, row["completion_tokens"] or 0]
+        self._stored[user_id] = (time.monotonic(), stored)
+        self._stored.move_to_end(user_id)
+        while len(self._stored) > self.max_users:
+            self._stored.popitem(last=False)
+
+    # ==========================================
+    # RECORDING
+    # ==========================================
+
+    def add(self, user_id: str, endpoint: str, prompt_tokens: int, completion_tokens: int) -> None:
+        """Count tokens used by one provider call"""
+        if not billable_user(user_id):
+            return
+        _add(self._pending.setdefault(user_id, {}), endpoint, int(time.time()) // 3600, prompt_tokens, completion_tokens)
+        self._trim_pending()
+
+    @contextmanager
+    def track(self, user_id: Optional[str], endpoint: str):
+        """Bill AI calls made inside the block (and tasks it starts) to the user"""
+        user_id = billable_user(user_id)
+        token = _owner.set((self, user_id, endpoint) if user_id else None)
+        try:
+            yield
+        finally:
+            _owner.reset(token)
+
+    def bind(self, user_id: Optional[str], endpoint: str) -> None:
+        """
+        Bill AI calls for the rest of the current task to the user. For
+        streaming generators and per-message tasks, where a context manager
+        could be closed from another context.
+        """
+        user_id = billable_user(user_id)
+        _owner.set((self, user_id, endpoint) if user_id else None)
+
+    async def flush(self, db) -> int:
+        """
+        Write pending usage to the database, returns rows written. All users
+        go in one request; if it fails, each user is retried alone so one
+        user's rows can't hold back the others'. Rows the database rejects
+        for good are dropped, the rest is kept for the next flush.
+        """
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            written = await self._write(db, pending)
+        except Exception:
+            if len(pending) == 1:
+                self._keep_failed(pending)
+                raise
+            written, error = 0, None
+            for user_id, buckets in pending.items():
+                try:
+                    written += await self._write(db, {user_id: buckets})
+                except Exception as e:
+                    if _is_rejected(e):
+                        print(f"Dropping token usage the database rejected: {e}")
+                        continue
+                    self._keep_failed({user_id: buckets})
+                    error = e
+            if error:
+                raise error
+        return written
+
+    async def _write(self, db, pending: Dict[str, Dict[Tuple[str, int], List[int]]]) -> int:
+        rows = [
+            {"user_id": user_id, "endpoint": endpoint, "hour": _hour_iso(hour),
+             "prompt_tokens": prompt, "completion_tokens": completion}
+            for user_id, buckets in pending.items()
+            for (endpoint, hour), (prompt, completion) in buckets.items()
+        ]
+        await db.record_token_usage(rows)
+        # Flushed usage now counts as stored until the user is reloaded
+        self._merge({user_id: entry[1] for user_id, entry in self._stored.items()}, pending, existing_only=True)
+        return len(rows)
+
+    def _keep_failed(self, pending: Dict[str, Dict[Tuple[str, int], List[int]]]) -> None:
+        self._merge(self._pending, pending)
+        self._trim_pending()
+
+    def _trim_pending(self) -> None:
+        while len(self._pending) > self.max_users:
+            self._pending.pop(next(iter(self._pending)))
+
+    @staticmethod
+    def _merge(target, source, existing_only: bool = False) -> None:
+        for user_id, buckets in source.items():
+            if existing_only and user_id not in target:
+                continue
+            user_buckets = target.setdefault(user_id, {})
+            for (endpoint, hour), (prompt, completion) in buckets.items():
+                _add(user_buckets, endpoint, hour, prompt, completion)
+
+    async def flush_periodically(self, db_factory: Callable[[], Any], interval_seconds: float) -> None:
+        """Flush on an interval until cancelled, then once more"""
+        try:
+            while True:
+                await asyncio.sleep(interval_seconds)
+                try:
+                    await self.flush(db_factory())
+                except Exception as e:
+                    print(f"Token usage flush failed: {e}")
+        finally:
+            try:
+                await self.flush(db_factory())
+            except Exception as e:
+                print(f"Token usage flush failed: {e}")
+
+
+def _add(buckets: Dict[Tuple[str, int], List[int]], endpoint: str, hour: int, prompt: int, completion: int) -> None:
+    usage = buckets.setdefault((endpoint, hour), [0, 0])
+    usage[0] += prompt
+    usage[1] += completion
+
+
+def record_token_usage(prompt_tokens: int, completion_tokens: int) -> None:
+    """Bill tokens of a provider call to the user tracked in this context, if any"""
+    owner = _owner.get()
+    if owner is None:
+        return
+    quota, user_id, endpoint = owner
+    quota.add(user_id, endpoint, prompt_tokens or 0, completion_tokens or 0)
+
+
+@lru_cache()
+def get_token_quota() -> TokenQuota:
+    """Process-wide token quota shared by the AI and chat routers"""
+    return TokenQuota.from_settings(get_settings())
@@ -0,0 +1,54 @@
+"""
+Warm Up
+Background start-up work that keeps heavy imports and connection setup off
+the first user request
+"""
+
+import asyncio
+import importlib
+import time
+
+from app.config import Settings
+from app.services.ai_service import AIService
+from app.services.supabase_service import SupabaseService
+
+
+# Imported lazily by the services, pre-loaded here once the server is up
+LAZY_MODULES = ["numpy"]
+
+
+async def warm_up(settings: Settings) -> dict:
+    """
+    Import lazily loaded modules and open provider and database connections.
+    Each step is timed; failures are reported, never raised.
+    """
+    timings = {}
+
+    async def step(name, func):
+        started = time.perf_counter()
+        try:
+            await func()
+            timings[name] = round(time.perf_counter() - started, 3)
+        except Exception as e:
+            timings[name] = f"failed: {e}"
+
+    async def import_modules():
+        for module in LAZY_MODULES:
+            await asyncio.to_thread(importlib.import_module, module)
+
+    async def connect_provider():
+        # Builds the shared client (importing the SDK) and opens a connection
+        ai_service = AIService(settings)
+        if settings.ai_provider in ("openai", "deepseek") and ai_service.is_ready():
+            await ai_service.client.models.list()
+
+    async def connect_database():
+        db = SupabaseService(settings)
+        if not db.is_mock:
+            await asyncio.to_thread(
+                lambda: db.client.table("users").select("id").limit(1).execute()
+            )
+
+    await step("imports", import_modules)
+    await asyncio.gather(step("ai_provider", connect_provider), step("database", connect_database))
+    return timings
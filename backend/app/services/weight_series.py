@@ -0,0 +1,109 @@
+"""
+Weight Series
+Downsampling and moving averages for weight history charts
+"""
+
+from datetime import timezone
+from typing import Optional, List, Dict, Any, Sequence
+
+from dateutil.parser import isoparse
+
+# Trailing moving-average windows, in days
+AVERAGE_WINDOWS = (7, 30)
+
+DEFAULT_POINTS = 300
+MAX_POINTS = 2000
+
+
+def _epoch_seconds(value: str) -> float:
+    """
+    ISO date or timestamp to Unix seconds; naive values are taken as UTC.
+    isoparse also reads the 1-5 digit fractions Postgres returns.
+    """
+    moment = isoparse(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def lttb(x, y, threshold: int):
+    """
+    Indices of the points Largest-Triangle-Three-Buckets keeps to draw
+    (x, y) with `threshold` points. The first and last points are always
+    kept; each bucket in between keeps the point forming the largest
+    triangle with the previous pick and the next bucket's mean.
+    """
+    import numpy as np
+
+    n = x.size
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # threshold - 2 buckets over points 1..n-2, each at least one point wide
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    mean_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+    # The last bucket looks ahead to the final point
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a])
+        )
+        a = lo + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def moving_average(seconds, values, window_days: int):
+    """Trailing mean of the readings in the `window_days` up to each reading"""
+    import numpy as np
+
+    totals = np.concatenate(([0.0], np.cumsum(values)))
+    end = np.arange(1, values.size + 1)
+    start = np.searchsorted(seconds, seconds - window_days * 86400, side="right")
+    return (totals[end] - totals[start]) / (end - start)
+
+
+def build_weight_series(
+    entries: List[Dict[str, Any]],
+    start: Optional[str] = None,
+    points: int = DEFAULT_POINTS,
+    windows: Sequence[int] = AVERAGE_WINDOWS
+) -> Dict[str, Any]:
+    """
+    Chart series for weight entries sorted oldest first. Moving averages
+    are computed over every reading, including those before `start` (fetched
+    so averages are full from the first point), then the readings from
+    `start` on are downsampled to at most `points`.
+    """
+    import numpy as np
+
+    seconds = np.array([_epoch_seconds(e["recorded_at"]) for e in entries], dtype=np.float64)
+    weights = np.array([float(e["weight"]) for e in entries], dtype=np.float64)
+    averages = {window: moving_average(seconds, weights, window) for window in windows}
+
+    first = int(np.searchsorted(seconds, _epoch_seconds(start))) if start else 0
+    in_range = weights[first:]
+    keep = first + lttb(seconds[first:], in_range, points)
+
+    series = []
+    for i in keep.tolist():
+        point = {"recorded_at": entries[i]["recorded_at"], "weight": round(float(weights[i]), 2)}
+        for window in windows:
+            point[f"avg_{window}d"] = round(float(averages[window][i]), 2)
+        series.append(point)
+
+    return {
+        "points": series,
+        "count": int(in_range.size),
+        "min": round(float(in_range.min()), 2) if in_range.size else None,
+        "max": round(float(in_range.max()), 2) if in_range.size else None,
+        "change": round(float(in_range[-1] - in_range[0]), 2) if in_range.size else None
+    }
@@ -0,0 +1,131 @@
+"""
+Activity Series Benchmark
+Time to aggregate multi-year daily logs into day, week and month buckets
+for all metrics at once, against a pure-Python loop per metric (what
+charts built from raw `get_daily_logs` rows do today). Also compares the
+JSON size of the series with the raw rows.
+
+Usage (from backend/):
+    python -m benchmarks.activity_series --years 1 3 5 10 --iterations 20 --output activity_series.json
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Any, List, Callable
+
+os.environ.setdefault("SUPABASE_URL", "")
+os.environ.setdefault("SUPABASE_ANON_KEY", "")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "")
+
+from app.services.activity_series import BUCKETS, METRICS, build_activity_series
+
+
+def daily_rows(start: date, days: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Daily logs with about one day in six missing, like a real user's"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(days):
+        if rng.random() < 0.17:
+            continue
+        rows.append({
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "user_id": "3b1f6a52-9c1e-4a57-8d1e-1f0c2b7a9e11",
+            "log_date": (start + timedelta(days=i)).isoformat(),
+            "calories_consumed": rng.randint(1500, 3000),
+            "calories_burned": rng.randint(0, 800),
+            "steps": rng.randint(2000, 16000),
+            "water_intake": rng.randint(4, 10),
+            "sleep_hours": round(rng.uniform(5, 9), 1),
+            "workout_completed": rng.random() < 0.5,
+            "notes": None
+        })
+    return rows
+
+
+def python_series(rows, metrics, bucket, start: date, end: date) -> List[Dict[str, Any]]:
+    """Baseline: one loop over the rows per metric, then gap filling"""
+    def key(day: date) -> date:
+        if bucket == "week":
+            return day - timedelta(days=day.weekday())
+        if bucket == "month":
+            return day.replace(day=1)
+        return day
+
+    days_in_bucket = defaultdict(int)
+    day = start
+    while day <= end:
+        days_in_bucket[key(day)] += 1
+        day += timedelta(days=1)
+    result = {k: {"date": k.isoformat(), "days": n} for k, n in days_in_bucket.items()}
+    for metric in metrics:
+        totals = defaultdict(float)
+        for row in rows:
+            day = date.fromisoformat(row["log_date"])
+            if start <= day <= end:
+                totals[key(day)] += float(row[METRICS[metric]] or 0)
+        for k, point in result.items():
+            value = totals[k]
+            point[metric] = round(value / point["days"], 3) if metric == "workout_adherence" else value
+    return sorted(result.values(), key=lambda p: p["date"])
+
+
+def _time(func: Callable[[], Any], iterations: int) -> float:
+    """Mean milliseconds per call"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e3
+
+
+def run(years: List[int], iterations: int) -> Dict[str, Any]:
+    metrics = list(METRICS)
+    results = {}
+    for span in years:
+        end = date(2025, 12, 31)
+        start = end - timedelta(days=365 * span - 1)
+        rows = daily_rows(start, (end - start).days + 1)
+        raw_bytes = len(json.dumps({"success": True, "data": rows}))
+        by_bucket = {}
+        for bucket in BUCKETS:
+            points = build_activity_series(rows, metrics, bucket, start, end)
+            by_bucket[bucket] = {
+                "points": len(points),
+                "bytes": len(json.dumps({"success": True, "data": {"points": points}})),
+                "numpy_ms": round(_time(
+                    lambda rows=rows, bucket=bucket, start=start, end=end: build_activity_series(rows, metrics, bucket, start, end),
+                    iterations
+                ), 2),
+                "python_ms": round(_time(
+                    lambda rows=rows, bucket=bucket, start=start, end=end: python_series(rows, metrics, bucket, start, end),
+                    iterations
+                ), 2)
+            }
+        results[f"{span}y"] = {"rows": len(rows), "raw_bytes": raw_bytes, "buckets": by_bucket}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 3, 5, 10], help="History lengths to aggregate")
+    parser.add_argument("--iterations", type=int, default=20, help="Aggregations timed per case")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.years, args.iterations)
+    for name, result in results.items():
+        print(f"{name}: {result['rows']} rows, {result['raw_bytes']} B raw")
+        for bucket, row in result["buckets"].items():
+            print(f"  {bucket:<6}{row['points']:>6} points{row['bytes']:>9} B"
+                  f"{row['numpy_ms']:>9.2f} ms numpy{row['python_ms']:>9.2f} ms python")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"iterations": args.iterations, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
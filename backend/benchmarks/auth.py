@@ -0,0 +1,97 @@
+"""
+Auth Benchmark
+Microbenchmark of bearer token resolution: raw user ID mode, first-time
+verification of HS256 and ES256 tokens (with the signing key parsed once),
+ES256 with the key parsed per call (no key cache), and repeated tokens
+served from the claims cache.
+
+Usage (from backend/):
+    python -m benchmarks.auth --iterations 2000 --output auth.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Any, Callable, Awaitable
+
+os.environ.setdefault("SUPABASE_URL", "")
+os.environ.setdefault("SUPABASE_ANON_KEY", "")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "")
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from jose import jwk, jwt
+
+from app.auth import JWKSCache, TokenVerifier, resolve_user_id
+
+
+SECRET = "benchmark-secret"
+
+
+def _tokens(count: int, key, algorithm: str, kid: str = None):
+    expires = int(time.time()) + 3600
+    headers = {"kid": kid} if kid else None
+    return [
+        jwt.encode({"sub": f"user-{i}", "aud": "authenticated", "exp": expires}, key, algorithm=algorithm, headers=headers)
+        for i in range(count)
+    ]
+
+
+async def _time(func: Callable[[int], Awaitable[Any]], iterations: int) -> float:
+    """Mean microseconds per call"""
+    started = time.perf_counter()
+    for i in range(iterations):
+        await func(i)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def run(iterations: int) -> Dict[str, float]:
+    private = ec.generate_private_key(ec.SECP256R1())
+    signing_pem = private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    public_jwk = jwk.construct(
+        private.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo),
+        "ES256"
+    ).to_dict()
+
+    jwks = JWKSCache("https://bench.supabase.co/auth/v1/.well-known/jwks.json")
+    jwks._keys = {"bench": jwk.construct(public_jwk, "ES256")}
+    hs_tokens = _tokens(iterations, SECRET, "HS256")
+    es_tokens = _tokens(iterations, signing_pem, "ES256", kid="bench")
+
+    hs_verifier = TokenVerifier(secret=SECRET)
+    es_verifier = TokenVerifier(jwks=jwks)
+
+    results = {}
+    results["user_id_mode"] = await _time(lambda i: resolve_user_id(f"Bearer user-{i}"), iterations)
+    results["hs256_first_use"] = await _time(lambda i: hs_verifier.verify(hs_tokens[i]), iterations)
+    results["hs256_cached"] = await _time(lambda i: hs_verifier.verify(hs_tokens[i]), iterations)
+    results["es256_first_use"] = await _time(lambda i: es_verifier.verify(es_tokens[i]), iterations)
+    results["es256_cached"] = await _time(lambda i: es_verifier.verify(es_tokens[i]), iterations)
+
+    async def es256_key_per_call(i):
+        return jwt.decode(es_tokens[i], public_jwk, algorithms=["ES256"], audience="authenticated")
+
+    results["es256_no_key_cache"] = await _time(es256_key_per_call, iterations)
+    return {name: round(us, 2) for name, us in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000, help="Distinct tokens per case")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.iterations))
+    for name, us in results.items():
+        print(f"{name:<22}{us:>10.2f} us/token")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"iterations": args.iterations, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Compact Schema Benchmark
+Compares completion tokens and latency of the verbose and compact plan
+schemas on the same prompts against the configured AI provider.
+
+Usage (from backend/):
+    python -m benchmarks.compact_schema --runs 3 --output compact_schema.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import List, Dict, Any
+
+from app.config import get_settings
+from app.services.ai_service import AIService
+
+
+PROMPTS = [
+    ("workout", "4-day upper lower split for an intermediate lifter"),
+    ("workout", "3-day full body beginner plan with dumbbells only"),
+    ("diet", "cut 2000 kcal high protein"),
+    ("diet", "vegetarian 2500 kcal for muscle gain"),
+]
+
+
+def instrument(service: AIService, samples: List[Dict[str, Any]]) -> None:
+    """Record latency and token usage of every completion the service makes"""
+    create = service.client.chat.completions.create
+
+    async def timed_create(**kwargs):
+        started = time.perf_counter()
+        response = await create(**kwargs)
+        usage = getattr(response, "usage", None)
+        samples.append({
+            "seconds": time.perf_counter() - started,
+            "prompt_tokens": getattr(usage, "prompt_tokens", None),
+            "completion_tokens": getattr(usage, "completion_tokens", None)
+        })
+        return response
+
+    service.client.chat.completions.create = timed_create
+
+
+async def run(runs: int) -> Dict[str, Any]:
+    service = AIService(get_settings())
+    if service.client is None:
+        raise SystemExit("Configure a real AI provider (AI_PROVIDER=openai/deepseek) to benchmark")
+
+    samples: List[Dict[str, Any]] = []
+    instrument(service, samples)
+
+    results = {}
+    for plan_type, description in PROMPTS:
+        for compact in (False, True):
+            samples.clear()
+            for _ in range(runs):
+                if plan_type == "workout":
+                    await service.generate_workout_plan(description, compact=compact, fan_out=False)
+                else:
+                    await service.generate_diet_plan(description, compact=compact)
+
+            completion_tokens = [s["completion_tokens"] for s in samples if s["completion_tokens"] is not None]
+            prompt_tokens = [s["prompt_tokens"] for s in samples if s["prompt_tokens"] is not None]
+            results[f"{plan_type}|{description}|{'compact' if compact else 'verbose'}"] = {
+                "runs": runs,
+                "median_seconds": round(statistics.median(s["seconds"] for s in samples), 3),
+                "median_completion_tokens": statistics.median(completion_tokens) if completion_tokens else None,
+                "median_prompt_tokens": statistics.median(prompt_tokens) if prompt_tokens else None
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Generations per prompt and format")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.runs))
+    for name, result in results.items():
+        print(f"{name}: {result}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Compression Benchmark
+Bytes on the wire and CPU time per response body for gzip levels and
+brotli qualities, on a generated workout plan, a long workout log listing
+and today's meals. Also times a compressed body cache hit, which is what
+repeated payloads (cached and mock plans) cost after the first request.
+
+Usage (from backend/):
+    python -m benchmarks.compression --iterations 200 --output compression.json
+"""
+
+import argparse
+import json
+import os
+import time
+import zlib
+from typing import Dict, Any, Callable
+
+os.environ.setdefault("SUPABASE_URL", "")
+os.environ.setdefault("SUPABASE_ANON_KEY", "")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "")
+
+from app.services.ai_service import MOCK_WORKOUT_PLAN
+from app.services.compression import CompressedBodyCache, _brotli
+
+
+def payloads() -> Dict[str, bytes]:
+    logs = [
+        {
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "user_id": "3b1f6a52-9c1e-4a57-8d1e-1f0c2b7a9e11",
+            "title": ["Upper Body Strength", "Morning Run", "Leg Day", "HIIT Circuit"][i % 4],
+            "workout_type": ["Strength", "Cardio", "Strength", "HIIT"][i % 4],
+            "duration_minutes": 30 + i % 45,
+            "calories_burned": 180 + (i * 37) % 400,
+            "exercises": [{"name": "Squat", "sets": 4, "reps": "8"}, {"name": "Lunge", "sets": 3, "reps": "12"}],
+            "notes": None,
+            "is_ai_generated": i % 3 == 0,
+            "workout_date": f"2025-{1 + i // 28 % 12:02d}-{1 + i % 28:02d}",
+            "created_at": f"2025-{1 + i // 28 % 12:02d}-{1 + i % 28:02d}T07:{i % 60:02d}:00"
+        }
+        for i in range(100)
+    ]
+    meals = [
+        {"id": f"meal-{i}", "meal_type": t, "meal_name": n, "calories": c, "protein": 30, "carbs": 40, "fats": 12,
+         "log_date": "2025-12-21", "created_at": "2025-12-21T08:00:00"}
+        for i, (t, n, c) in enumerate([("Breakfast", "Oatmeal with berries", 420), ("Lunch", "Chicken salad", 610),
+                                       ("Snack", "Greek yogurt", 180), ("Dinner", "Salmon with rice", 720)])
+    ]
+    return {
+        "workout_plan": json.dumps({"success": True, "data": {"plan": MOCK_WORKOUT_PLAN}}).encode(),
+        "workout_logs_100": json.dumps({"success": True, "data": logs}).encode(),
+        "meals_today": json.dumps({"success": True, "data": {"meals": meals}}).encode(),
+    }
+
+
+def _time(func: Callable[[], Any], iterations: int) -> float:
+    """Mean microseconds per call"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    def gzip_level(level):
+        def run(body):
+            compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+            return compressor.compress(body) + compressor.flush()
+        return run
+
+    result = {f"gzip-{level}": gzip_level(level) for level in (1, 6, 9)}
+    brotli = _brotli()
+    if brotli:
+        for quality in (4, 5, 11):
+            result[f"br-{quality}"] = lambda body, q=quality: brotli.compress(body, quality=q)
+    return result
+
+
+def run(iterations: int) -> Dict[str, Any]:
+    results = {}
+    for name, body in payloads().items():
+        rows = {"identity": {"bytes": len(body), "us": 0.0}}
+        for label, func in compressors().items():
+            rows[label] = {"bytes": len(func(body)), "us": round(_time(lambda func=func, body=body: func(body), iterations), 1)}
+        cache = CompressedBodyCache(max_bytes=1 << 20)
+        cache.get_or_compress(body, "gzip")
+        rows["cache_hit"] = {"bytes": rows["gzip-6"]["bytes"],
+                             "us": round(_time(lambda cache=cache, body=body: cache.get_or_compress(body, "gzip"), iterations), 1)}
+        results[name] = rows
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200, help="Compressions timed per case")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    for name, rows in results.items():
+        print(name)
+        identity = rows["identity"]["bytes"]
+        for label, row in rows.items():
+            print(f"  {label:<10}{row['bytes']:>8} B {row['bytes'] / identity:>7.1%}{row['us']:>10.1f} us")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"iterations": args.iterations, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+Load Benchmark
+Drives concurrent virtual users against the app with mock AI and database
+backends and reports requests/sec, p50/p95/p99 latency and peak Python
+memory per endpoint.
+
+Each endpoint is first run alone (so its peak memory is its own), then all
+endpoints are run together in a weighted mix. Request choice is seeded, so
+two runs with the same arguments send the same sequence of requests.
+
+Usage (from backend/):
+    python -m benchmarks.load --users 20 --requests 200 --output load.json
+    python -m benchmarks.load --ai-latency 0.5 --db-latency 0.02 --baseline load.json
+    python -m benchmarks.load --provider simulated  # SIM_* settings drive AI latency and failures
+    python -m benchmarks.load --url http://localhost:8000  # running server, real backends
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Callable
+
+import httpx
+import numpy as np
+
+# Mock backends unless the environment says otherwise
+os.environ.setdefault("SUPABASE_URL", "")
+os.environ.setdefault("SUPABASE_ANON_KEY", "")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "")
+os.environ.setdefault("AI_PROVIDER", "mock")
+
+
+CHAT_MESSAGES = [
+    "How do I fix my squat depth?",
+    "What should I eat after leg day?",
+    "Is it fine to train abs every day?",
+    "How much protein do I need to build muscle?",
+]
+
+PLAN_REQUESTS = [
+    {"plan_type": "workout", "user_description": "4-day upper lower split for an intermediate lifter"},
+    {"plan_type": "workout", "user_description": "3-day full body beginner plan with dumbbells only"},
+    {"plan_type": "diet", "user_description": "cut 2000 kcal high protein"},
+    {"plan_type": "diet", "user_description": "vegetarian 2500 kcal for muscle gain"},
+]
+
+
+def _chat_stream(rng: random.Random) -> Dict[str, Any]:
+    return {"method": "POST", "url": "/api/chat/stream", "json": {"message": rng.choice(CHAT_MESSAGES)}}
+
+
+def _ai_generate(rng: random.Random) -> Dict[str, Any]:
+    return {"method": "POST", "url": "/api/ai/generate", "json": {**rng.choice(PLAN_REQUESTS), "use_index": False}}
+
+
+def _workout_log(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "method": "POST",
+        "url": "/api/workout/log",
+        "json": {"title": "Bench session", "duration_minutes": rng.randint(20, 90), "calories_burned": rng.randint(150, 600)}
+    }
+
+
+def _diet_log(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "method": "POST",
+        "url": "/api/diet/log",
+        "json": {"meal_type": "Lunch", "meal_name": "Chicken rice", "calories": rng.randint(300, 900), "protein": 40}
+    }
+
+
+# name -> (weight in the mix, request factory)
+ENDPOINTS: Dict[str, tuple] = {
+    "chat_stream": (2, _chat_stream),
+    "ai_generate": (1, _ai_generate),
+    "workout_log": (2, _workout_log),
+    "diet_log": (3, _diet_log),
+    "workout_logs": (3, lambda rng: {"method": "GET", "url": "/api/workout/logs"}),
+    "workout_stats": (2, lambda rng: {"method": "GET", "url": "/api/workout/stats"}),
+    "diet_today": (3, lambda rng: {"method": "GET", "url": "/api/diet/logs/today"}),
+    "diet_stats": (2, lambda rng: {"method": "GET", "url": "/api/diet/stats"}),
+}
+
+
+def _with_latency(obj, seconds: float, jitter: float, rng: random.Random) -> None:
+    """Add a simulated round trip before every public coroutine method of obj"""
+    if seconds <= 0:
+        return
+    for name in dir(obj):
+        method = getattr(obj, name)
+        if name.startswith("_") or not asyncio.iscoroutinefunction(method):
+            continue
+
+        def wrap(method):
+            async def delayed(*args, **kwargs):
+                await asyncio.sleep(max(0.0, rng.gauss(seconds, seconds * jitter)))
+                return await method(*args, **kwargs)
+            return delayed
+
+        setattr(obj, name, wrap(method))
+
+
+def _with_stream_latency(ai_service, seconds: float, jitter: float, rng: random.Random) -> None:
+    """Delay the first chunk of chat_stream by `seconds` and later chunks slightly"""
+    if seconds <= 0:
+        return
+    chat_stream = ai_service.chat_stream
+
+    async def delayed_stream(*args, **kwargs):
+        first = True
+        async for chunk in chat_stream(*args, **kwargs):
+            await asyncio.sleep(max(0.0, rng.gauss(seconds, seconds * jitter)) if first else 0.01)
+            first = False
+            yield chunk
+
+    ai_service.chat_stream = delayed_stream
+
+
+def build_app(ai_latency: float, db_latency: float, jitter: float, seed: int):
+    """The FastAPI app with shared mock backends and simulated latency"""
+    from app.config import get_settings
+    from app.main import app
+    from app.routers import ai, chat, diet, workout
+    from app.services.ai_service import AIService
+    from app.services.plan_index import PlanIndex
+    from app.services.supabase_service import SupabaseService
+
+    settings = get_settings()
+    rng = random.Random(seed)
+    db = SupabaseService(settings)
+    ai_service = AIService(settings)
+    _with_latency(db, db_latency, jitter, rng)
+    if settings.ai_provider == "mock":
+        _with_latency(ai_service, ai_latency, jitter, rng)
+        _with_stream_latency(ai_service, ai_latency, jitter, rng)
+
+    for router in (ai, diet, workout, chat):
+        app.dependency_overrides[router.get_supabase_service] = lambda: db
+    for router in (ai, chat):
+        app.dependency_overrides[router.get_ai_service] = lambda: ai_service
+    # Empty index so /generate measures the AI path, not index hits
+    plan_index = PlanIndex()
+    app.dependency_overrides[ai.get_plan_index] = lambda: plan_index
+    return app
+
+
+async def _drive(
+    client: httpx.AsyncClient,
+    users: int,
+    total_requests: int,
+    pick: Callable[[random.Random], tuple],
+    seed: int
+) -> Dict[str, Dict[str, List]]:
+    """Run virtual users until total_requests are sent, collecting per-endpoint samples"""
+    samples: Dict[str, Dict[str, List]] = {}
+    remaining = [total_requests]
+
+    async def user(index: int):
+        rng = random.Random(seed * 1000 + index)
+        headers = {"Authorization": f"Bearer bench-user-{index}"}
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            name, factory = pick(rng)
+            request = factory(rng)
+            started = time.perf_counter()
+            try:
+                response = await client.request(request["method"], request["url"], json=request.get("json"), headers=headers)
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            entry = samples.setdefault(name, {"latencies": [], "errors": []})
+            entry["latencies"].append(time.perf_counter() - started)
+            entry["errors"].append(not ok)
+
+    await asyncio.gather(*[user(i) for i in range(users)])
+    return samples
+
+
+def _summarize(samples: Dict[str, List], seconds: float, peak_bytes: Optional[int]) -> Dict[str, Any]:
+    latencies = np.array(samples["latencies"]) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "requests": int(latencies.size),
+        "errors": int(sum(samples["errors"])),
+        "rps": round(latencies.size / seconds, 1),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "peak_memory_kb": round(peak_bytes / 1024) if peak_bytes is not None else None,
+    }
+
+
+async def _phase(client, users, requests, pick, seed, memory) -> tuple:
+    if memory:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    samples = await _drive(client, users, requests, pick, seed)
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] - baseline if memory else None
+    return samples, seconds, peak
+
+
+async def run(args) -> Dict[str, Any]:
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=120)
+    else:
+        app = build_app(args.ai_latency, args.db_latency, args.jitter, args.seed)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120)
+
+    names = [n for n in ENDPOINTS if not args.endpoints or n in args.endpoints]
+    memory = not args.no_memory and not args.url
+    if memory:
+        tracemalloc.start()
+
+    results: Dict[str, Any] = {}
+    async with client:
+        # Warm-up: one request per endpoint
+        rng = random.Random(args.seed)
+        for name in names:
+            request = ENDPOINTS[name][1](rng)
+            await client.request(request["method"], request["url"], json=request.get("json"),
+                                 headers={"Authorization": "Bearer bench-warmup"})
+
+        for name in names:
+            samples, seconds, peak = await _phase(
+                client, args.users, args.requests, lambda rng, name=name: (name, ENDPOINTS[name][1]), args.seed, memory
+            )
+            results[name] = _summarize(samples[name], seconds, peak)
+
+        weights = [ENDPOINTS[n][0] for n in names]
+
+        def pick_mixed(rng: random.Random):
+            name = rng.choices(names, weights)[0]
+            return name, ENDPOINTS[name][1]
+
+        samples, seconds, peak = await _phase(client, args.users, args.requests * len(names), pick_mixed, args.seed, memory)
+        mix = {name: _summarize(samples[name], seconds, None) for name in names if name in samples}
+        all_latencies = {"latencies": [x for s in samples.values() for x in s["latencies"]],
+                         "errors": [x for s in samples.values() for x in s["errors"]]}
+        mix["all"] = _summarize(all_latencies, seconds, peak)
+        results["mix"] = mix
+
+    if memory:
+        tracemalloc.stop()
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _print_table(results: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    print(f"{'endpoint':<22}{'reqs':>7}{'err':>5}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'peak KB':>9}")
+    rows = [(n, r) for n, r in results.items() if n != "mix"]
+    rows += [(f"mix/{n}", r) for n, r in results.get("mix", {}).items()]
+    for name, r in rows:
+        line = (
+            f"{name:<22}{r['requests']:>7}{r['errors']:>5}{r['rps']:>9}"
+            f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{r['peak_memory_kb'] if r['peak_memory_kb'] is not None else '-':>9}"
+        )
+        before = _lookup(baseline, name) if baseline else None
+        if before and before["p95_ms"]:
+            line += f"   p95 {100 * (r['p95_ms'] - before['p95_ms']) / before['p95_ms']:+.0f}%"
+            line += f"  rps {100 * (r['rps'] - before['rps']) / before['rps']:+.0f}%" if before["rps"] else ""
+        print(line)
+
+
+def _lookup(report: Dict[str, Any], name: str) -> Optional[Dict[str, Any]]:
+    results = report.get("results", {})
+    if name.startswith("mix/"):
+        return results.get("mix", {}).get(name[4:])
+    return results.get(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint (mix sends this many per endpoint in total)")
+    parser.add_argument("--endpoints", nargs="*", choices=list(ENDPOINTS), help="Only these endpoints")
+    parser.add_argument("--provider", choices=["mock", "simulated"], help="AI provider (default: AI_PROVIDER or mock)")
+    parser.add_argument("--ai-latency", type=float, default=0.0, help="Added seconds per mock AI call (and to first streamed chunk)")
+    parser.add_argument("--db-latency", type=float, default=0.0, help="Simulated seconds per database call")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latency standard deviation as a fraction of the mean")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for request choice and latency jitter")
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc (faster, no peak memory)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Earlier JSON results to compare against")
+    args = parser.parse_args()
+    if args.provider:
+        os.environ["AI_PROVIDER"] = args.provider
+
+    results = asyncio.run(run(args))
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        },
+        "results": results,
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    _print_table(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
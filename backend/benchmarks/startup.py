@@ -0,0 +1,113 @@
+"""
+Startup Benchmark
+Measures cold start: interpreter plus app import time (with the slowest
+imports from -X importtime), and time until a fresh uvicorn process
+answers /health and a first real request.
+
+Usage (from backend/):
+    python -m benchmarks.startup --runs 5 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Dict, Any
+
+import httpx
+
+
+# Mock database unless the environment configures one
+ENV = dict(os.environ)
+for key in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY"):
+    ENV.setdefault(key, "")
+
+
+def import_profile(top: int) -> Dict[str, Any]:
+    """Total app import time and the slowest modules by cumulative time"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=ENV, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        self_us, cumulative_us = self_us.strip(), cumulative_us.strip()
+        if not self_us.isdigit():
+            continue
+        rows.append({"module": name.strip(), "depth": (len(name) - len(name.lstrip())) // 2,
+                     "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    total = next((r["cumulative_ms"] for r in rows if r["module"] == "app.main"), None)
+    top_level = sorted((r for r in rows if r["depth"] <= 1), key=lambda r: r["cumulative_ms"], reverse=True)
+    return {"app_main_ms": total, "slowest": top_level[:top]}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_first_response(path: str, timeout: float = 30.0) -> Dict[str, float]:
+    """Start uvicorn and time until /health answers, then the first `path` request"""
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=ENV, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            while True:
+                try:
+                    client.get("/health")
+                    break
+                except httpx.TransportError:
+                    if time.perf_counter() - started > timeout:
+                        raise RuntimeError("Server did not start")
+                    time.sleep(0.01)
+            health = time.perf_counter() - started
+            request_started = time.perf_counter()
+            client.get(path, headers={"Authorization": "Bearer bench-user"})
+            first_request = time.perf_counter() - request_started
+    finally:
+        server.terminate()
+        server.wait()
+    return {"health_seconds": health, "first_request_seconds": first_request}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Cold starts to measure")
+    parser.add_argument("--path", default="/api/workout/stats", help="First request after /health")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    profile = import_profile(args.top)
+    starts: List[Dict[str, float]] = [time_to_first_response(args.path) for _ in range(args.runs)]
+    results = {
+        "import": profile,
+        "median_health_seconds": round(statistics.median(s["health_seconds"] for s in starts), 3),
+        "median_first_request_seconds": round(statistics.median(s["first_request_seconds"] for s in starts), 3),
+        "runs": starts,
+    }
+
+    print(f"app.main import: {profile['app_main_ms']:.0f} ms")
+    for row in profile["slowest"]:
+        print(f"  {row['cumulative_ms']:8.1f} ms  {row['module']}")
+    print(f"uvicorn start to /health: {results['median_health_seconds']} s (median of {args.runs})")
+    print(f"first {args.path}: {results['median_first_request_seconds']} s")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
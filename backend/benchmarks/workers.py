@@ -0,0 +1,125 @@
+"""
+Worker Scaling Benchmark
+Starts uvicorn with 1..N worker processes (mock AI and database, shared
+state in SQLite) and drives each with the load benchmark from several
+client processes, so the client is not the bottleneck. Reports total
+requests/sec and p95 latency of the mixed phase and the speedup over one
+worker.
+
+Usage (from backend/):
+    python -m benchmarks.workers --workers 1 2 4 --output workers.json
+    python -m benchmarks.workers --workers 1 4 --clients 4 --endpoints workout_stats diet_today
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Dict, Any
+
+import httpx
+
+from benchmarks.load import ENDPOINTS
+from benchmarks.startup import _free_port
+
+
+def start_server(workers: int, state_dir: str, timeout: float = 60.0):
+    """Start uvicorn with `workers` processes and wait until /health answers"""
+    port = _free_port()
+    env = dict(os.environ)
+    for key in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY"):
+        env.setdefault(key, "")
+    env.setdefault("AI_PROVIDER", "mock")
+    env.update({
+        "WEB_CONCURRENCY": str(workers),
+        "SHARED_STATE_BACKEND": "sqlite",
+        "SHARED_STATE_PATH": os.path.join(state_dir, f"state-{workers}.sqlite3"),
+        "WARM_UP_ENABLED": "false",
+    })
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    started = time.perf_counter()
+    url = f"http://127.0.0.1:{port}"
+    while True:
+        try:
+            httpx.get(f"{url}/health")
+            break
+        except httpx.TransportError:
+            if time.perf_counter() - started > timeout:
+                server.terminate()
+                raise RuntimeError("Server did not start")
+            time.sleep(0.05)
+    # /health answers once the first worker is up, give the rest time to boot
+    time.sleep(1.0 + 0.25 * workers)
+    return server, url
+
+
+def drive(url: str, args, out_dir: str) -> Dict[str, Any]:
+    """Run the load benchmark from args.clients processes at once, return summed mix results"""
+    clients = []
+    for i in range(args.clients):
+        output = os.path.join(out_dir, f"client-{i}.json")
+        command = [
+            sys.executable, "-m", "benchmarks.load", "--url", url, "--no-memory",
+            "--users", str(args.users), "--requests", str(args.requests),
+            "--seed", str(args.seed + i), "--output", output
+        ]
+        if args.endpoints:
+            command += ["--endpoints", *args.endpoints]
+        clients.append((subprocess.Popen(command, stdout=subprocess.DEVNULL), output))
+
+    totals = {"requests": 0, "errors": 0, "rps": 0.0, "p95_ms": 0.0}
+    for process, output in clients:
+        if process.wait() != 0:
+            raise RuntimeError("Load client failed")
+        with open(output) as f:
+            mix = json.load(f)["results"]["mix"]["all"]
+        totals["requests"] += mix["requests"]
+        totals["errors"] += mix["errors"]
+        totals["rps"] += mix["rps"]
+        totals["p95_ms"] = max(totals["p95_ms"], mix["p95_ms"])
+    totals["rps"] = round(totals["rps"], 1)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to measure")
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 2, help="Load client processes")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users per client")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint per client")
+    parser.add_argument("--endpoints", nargs="*", choices=list(ENDPOINTS), help="Only these endpoints")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the first client, the rest count up")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in args.workers:
+            server, url = start_server(workers, tmp)
+            try:
+                result = {"workers": workers, **drive(url, args, tmp)}
+            finally:
+                server.terminate()
+                server.wait()
+            results.append(result)
+
+    base = results[0]["rps"] or 1
+    print(f"{'workers':>8}{'reqs':>9}{'err':>6}{'rps':>10}{'p95 ms':>9}{'speedup':>9}")
+    for r in results:
+        r["speedup"] = round(r["rps"] / base, 2)
+        print(f"{r['workers']:>8}{r['requests']:>9}{r['errors']:>6}{r['rps']:>10}{r['p95_ms']:>9}{r['speedup']:>8}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cpus": os.cpu_count(), "args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -79,6 +79,12 @@ def mock_supabase_service():
     return mock
 
 
+@pytest.fixture
+def mock_db() -> SupabaseService:
+    """SupabaseService running on its in-memory mock store."""
+    return SupabaseService(Settings(supabase_url="", supabase_anon_key="", supabase_service_role_key=""))
+
+
 # -----------------------------------------------------------------------------
 # Mock AI Service
 # -----------------------------------------------------------------------------
@@ -165,3 +171,24 @@ def client(mock_supabase_service):
     
     # Clean up overrides
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def db_routers() -> tuple:
+    """
+    Routers whose Supabase dependency `db_client` points at `mock_db`.
+    Test modules override this fixture to choose them.
+    """
+    return ()
+
+
+@pytest.fixture
+def db_client(mock_db, db_routers):
+    """FastAPI test client with `db_routers` reading and writing `mock_db`."""
+    for router in db_routers:
+        app.dependency_overrides[router.get_supabase_service] = lambda: mock_db
+    
+    with TestClient(app) as test_client:
+        yield test_client
+    
+    app.dependency_overrides.clear()
@@ -0,0 +1,84 @@
+"""
+Tests for bucketed activity series over daily logs
+"""
+
+from datetime import date
+
+import pytest
+
+from app.routers import activity as activity_router
+from app.services.activity_series import build_activity_series
+
+
+ROWS = [
+    {"log_date": "2025-01-06", "calories_consumed": 2000, "calories_burned": 300, "steps": 8000, "workout_completed": True},
+    {"log_date": "2025-01-08", "calories_consumed": 2400, "calories_burned": 0, "steps": 4000, "workout_completed": False},
+    {"log_date": "2025-01-20", "calories_consumed": 1800, "calories_burned": 500, "steps": 12000, "workout_completed": True},
+]
+
+
+@pytest.fixture
+def db_routers():
+    return (activity_router,)
+
+
+class TestActivitySeries:
+    """Tests for aggregation and gap filling"""
+
+    def test_weekly_buckets_fill_gaps(self):
+        """Should return every Monday-start week, empty ones as zeros"""
+        points = build_activity_series(ROWS, ["steps", "workout_adherence"], "week",
+                                       date(2025, 1, 6), date(2025, 1, 26))
+
+        assert [p["date"] for p in points] == ["2025-01-06", "2025-01-13", "2025-01-20"]
+        assert [p["steps"] for p in points] == [12000, 0, 12000]
+        assert [p["days_logged"] for p in points] == [2, 0, 1]
+        assert points[0]["workout_adherence"] == round(1 / 7, 3)
+
+    def test_partial_month_and_average(self):
+        """Should count only days in range and average over logged days"""
+        points = build_activity_series(ROWS, ["calories_consumed"], "month",
+                                       date(2024, 12, 30), date(2025, 1, 10), agg="avg")
+
+        assert [(p["date"], p["days"]) for p in points] == [("2024-12-01", 2), ("2025-01-01", 10)]
+        assert points[0]["calories_consumed"] is None
+        assert points[1]["calories_consumed"] == 2200
+
+    def test_week_starting_midweek(self):
+        """Should label a partial first week with its Monday"""
+        points = build_activity_series([], ["steps"], "week", date(2025, 1, 1), date(2025, 1, 12))
+
+        assert [(p["date"], p["days"]) for p in points] == [("2024-12-30", 5), ("2025-01-06", 7)]
+
+
+class TestActivityEndpoint:
+    """Tests for GET /api/activity/series"""
+
+    def test_multiple_metrics(self, db_client, mock_db, test_user_id, auth_headers):
+        """Should serve several metrics per bucket in one response"""
+        for row in ROWS:
+            mock_db._mock_data["daily_logs"][f"{test_user_id}_{row['log_date']}"] = {**row, "user_id": test_user_id}
+
+        response = db_client.get("/api/activity/series?metric=steps,calories_burned&bucket=day&from=2025-01-05&to=2025-01-08",
+                               headers=auth_headers)
+        data = response.json()["data"]
+
+        assert data["metrics"] == ["steps", "calories_burned"]
+        assert [(p["date"], p["steps"], p["calories_burned"]) for p in data["points"]] == [
+            ("2025-01-05", 0, 0), ("2025-01-06", 8000, 300), ("2025-01-07", 0, 0), ("2025-01-08", 4000, 0)
+        ]
+
+    def test_default_range(self, db_client, auth_headers):
+        """Should default to the last 30 days by day"""
+        points = db_client.get("/api/activity/series", headers=auth_headers).json()["data"]["points"]
+
+        assert len(points) == 30
+        assert points[-1]["date"] == date.today().isoformat()
+
+    @pytest.mark.parametrize("query", [
+        "metric=heart_rate", "bucket=year", "agg=max", "from=2025-02-01&to=2025-01-01", "from=2010-01-01&to=2025-01-01",
+        "from=yesterday"
+    ])
+    def test_invalid_parameters(self, db_client, auth_headers, query):
+        """Should return 400 for unknown metrics, buckets and bad ranges"""
+        assert db_client.get(f"/api/activity/series?{query}", headers=auth_headers).status_code == 400
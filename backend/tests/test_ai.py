@@ -3,12 +3,19 @@ Tests for AI generation endpoints.
 AI service is mocked to avoid external API calls.
 """
 
+import asyncio
+import time
+from datetime import date, timedelta
+
 import pytest
 from unittest.mock import MagicMock, AsyncMock, patch
 from fastapi.testclient import TestClient
 
 from app.main import app
 from app.routers import ai as ai_router
+from app.services.job_queue import JobQueue
+from app.services.plan_index import PlanIndex
+from app.services.progress_features import InsightCache, build_progress_summary
 
 
 @pytest.fixture
@@ -17,17 +24,40 @@ def mock_ai_service(mock_ai_response, mock_diet_response):
     mock = MagicMock()
     mock.generate_workout_plan = AsyncMock(return_value=mock_ai_response)
     mock.generate_diet_plan = AsyncMock(return_value=mock_diet_response)
+    mock.analyze_progress = AsyncMock(return_value={
+        "summary": "Solid month",
+        "achievements": [],
+        "recommendations": [],
+        "score": 80
+    })
     mock.is_ready = MagicMock(return_value=True)
     return mock
 
 
 @pytest.fixture
-def client_with_ai(mock_ai_service):
+def plan_index():
+    """Empty plan index so requests reach the mocked AI service."""
+    return PlanIndex()
+
+
+@pytest.fixture
+def job_queue():
+    """Fresh job queue per test."""
+    return JobQueue(workers=2, ttl_seconds=60, max_pending=10)
+
+
+@pytest.fixture
+def client_with_ai(mock_ai_service, plan_index, job_queue, mock_db):
     """Test client with mocked AI service."""
     def get_mock_ai():
         return mock_ai_service
     
     app.dependency_overrides[ai_router.get_ai_service] = get_mock_ai
+    app.dependency_overrides[ai_router.get_plan_index] = lambda: plan_index
+    app.dependency_overrides[ai_router.get_job_queue] = lambda: job_queue
+    app.dependency_overrides[ai_router.get_supabase_service] = lambda: mock_db
+    insight_cache = InsightCache()
+    app.dependency_overrides[ai_router.get_insight_cache] = lambda: insight_cache
     
     with TestClient(app) as test_client:
         yield test_client
@@ -101,6 +131,230 @@ class TestGenerateDietPlan:
         mock_ai_service.generate_diet_plan.assert_called_once()
 
 
+class TestPlanIndex:
+    """Tests for serving plans from the local plan index."""
+
+    def test_vetted_plan_served_without_ai_call(self, client_with_ai, mock_ai_service, plan_index):
+        """Should serve a close vetted match and skip the AI call."""
+        plan_index.load_vetted()
+        payload = {
+            "user_description": "3-day full body beginner",
+            "plan_type": "workout"
+        }
+        
+        response = client_with_ai.post("/api/ai/generate", json=payload)
+        
+        data = response.json()
+        assert data["success"] is True
+        assert data["source"] == "vetted"
+        assert data["plan"]["title"] == "3-Day Full Body Beginner Program"
+        mock_ai_service.generate_workout_plan.assert_not_called()
+
+    def test_diet_match_rescaled_to_calorie_target(self, client_with_ai, plan_index):
+        """Should rescale a matched diet plan to the requested calories."""
+        plan_index.load_vetted()
+        payload = {
+            "user_description": "cut 1800 kcal high protein fat loss",
+            "plan_type": "diet"
+        }
+        
+        response = client_with_ai.post("/api/ai/generate", json=payload)
+        
+        data = response.json()
+        assert data["source"] == "vetted"
+        assert data["plan"]["dailyCalories"] == 1800
+        assert data["plan"]["macros"]["protein"] == 162
+
+    def test_different_day_count_falls_through(self, client_with_ai, mock_ai_service, plan_index):
+        """Should not serve a 3-day plan for a 5-day request."""
+        plan_index.load_vetted()
+        payload = {
+            "user_description": "5-day full body beginner",
+            "plan_type": "workout"
+        }
+        
+        response = client_with_ai.post("/api/ai/generate", json=payload)
+        
+        assert response.json()["source"] == "ai"
+        mock_ai_service.generate_workout_plan.assert_called_once()
+
+    def test_generated_plan_reused(self, client_with_ai, mock_ai_service, plan_index):
+        """Should index generated plans and reuse them for repeat requests."""
+        payload = {
+            "user_description": "Kettlebell conditioning twice a week",
+            "plan_type": "workout"
+        }
+        
+        client_with_ai.post("/api/ai/generate", json=payload)
+        response = client_with_ai.post("/api/ai/generate", json=payload)
+        
+        assert response.json()["source"] == "generated"
+        mock_ai_service.generate_workout_plan.assert_called_once()
+        assert plan_index.get_stats()["matches"] == 1
+
+    def test_use_index_false_forces_generation(self, client_with_ai, mock_ai_service, plan_index):
+        """Should skip the index when use_index is false."""
+        plan_index.load_vetted()
+        payload = {
+            "user_description": "3-day full body beginner",
+            "plan_type": "workout",
+            "use_index": False
+        }
+        
+        response = client_with_ai.post("/api/ai/generate", json=payload)
+        
+        assert response.json()["source"] == "ai"
+        mock_ai_service.generate_workout_plan.assert_called_once()
+
+
+def wait_for_job(client, job_id: str, headers: dict = None, timeout: float = 5.0) -> dict:
+    """Poll a job until it leaves the queued/running states."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        data = client.get(f"/api/ai/jobs/{job_id}", headers=headers).json()
+        if data["status"] not in ("queued", "running"):
+            return data
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+class TestGenerationJobs:
+    """Tests for POST /api/ai/jobs and GET /api/ai/jobs/{job_id}."""
+
+    def test_job_returns_id_then_result(self, client_with_ai, auth_headers):
+        """Should accept the job immediately and expose the plan when done."""
+        payload = {"user_description": "Build muscle", "plan_type": "workout"}
+        
+        response = client_with_ai.post("/api/ai/jobs", json=payload, headers=auth_headers)
+        
+        assert response.status_code == 202
+        job = wait_for_job(client_with_ai, response.json()["job_id"], auth_headers)
+        assert job["status"] == "succeeded"
+        assert job["result"]["plan"]["title"] == "Test Workout Plan"
+
+    def test_duplicate_inflight_job_deduplicated(self, client_with_ai, mock_ai_service, auth_headers):
+        """Should return the same job for identical in-flight requests from one user."""
+        async def slow_plan(*args, **kwargs):
+            await asyncio.sleep(0.2)
+            return {"title": "Slow Plan", "schedule": []}
+        mock_ai_service.generate_workout_plan = AsyncMock(side_effect=slow_plan)
+        payload = {"user_description": "Build muscle", "plan_type": "workout"}
+        
+        first = client_with_ai.post("/api/ai/jobs", json=payload, headers=auth_headers).json()
+        second = client_with_ai.post("/api/ai/jobs", json=payload, headers=auth_headers).json()
+        
+        assert first["job_id"] == second["job_id"]
+        assert wait_for_job(client_with_ai, first["job_id"], auth_headers)["status"] == "succeeded"
+        mock_ai_service.generate_workout_plan.assert_called_once()
+
+    def test_failed_generation_marks_job_failed(self, client_with_ai):
+        """Should report generation errors on the job."""
+        payload = {"user_description": "Something", "plan_type": "invalid_type"}
+        
+        response = client_with_ai.post("/api/ai/jobs", json=payload)
+        
+        job = wait_for_job(client_with_ai, response.json()["job_id"])
+        assert job["status"] == "failed"
+        assert "Invalid plan_type" in job["error"]
+
+    def test_other_users_job_returns_404(self, client_with_ai, auth_headers):
+        """Should hide a job from anyone but the user who created it."""
+        payload = {"user_description": "Build muscle", "plan_type": "workout"}
+        job_id = client_with_ai.post("/api/ai/jobs", json=payload, headers=auth_headers).json()["job_id"]
+        
+        other = client_with_ai.get(f"/api/ai/jobs/{job_id}", headers={"Authorization": "Bearer other-user"})
+        anonymous = client_with_ai.get(f"/api/ai/jobs/{job_id}")
+        
+        assert other.status_code == 404
+        assert anonymous.status_code == 404
+        assert wait_for_job(client_with_ai, job_id, auth_headers)["status"] == "succeeded"
+
+    def test_unknown_job_returns_404(self, client_with_ai):
+        """Should return 404 for unknown or expired jobs."""
+        response = client_with_ai.get("/api/ai/jobs/does-not-exist")
+        
+        assert response.status_code == 404
+
+
+class TestProgressInsights:
+    """Tests for POST /api/ai/progress."""
+
+    async def seed_logs(self, db, user_id):
+        today = date.today()
+        for offset in range(0, 14, 2):
+            day = (today - timedelta(days=offset)).isoformat()
+            await db.create_workout_log(user_id, "Run", 30, workout_date=day)
+            await db.create_diet_log(user_id, "Lunch", "Bowl", 600, protein=40, carbs=60, fats=20, log_date=day)
+            await db.update_daily_log(user_id, day, calories_consumed_add=600, steps_add=8000)
+
+    async def test_progress_sends_compact_summary(self, client_with_ai, mock_ai_service, mock_db, auth_headers, test_user_id):
+        """Should send only the numeric summary to the model."""
+        await self.seed_logs(mock_db, test_user_id)
+        
+        response = client_with_ai.post("/api/ai/progress", json={"days": 14}, headers=auth_headers)
+        
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["insight"]["score"] == 80
+        assert data["cached"] is False
+        assert data["summary"]["workouts"]["sessions_per_week"] == [3, 4]
+        sent = mock_ai_service.analyze_progress.call_args[0][0]
+        assert sent == data["summary"]
+
+    async def test_progress_cached_until_new_logs(self, client_with_ai, mock_ai_service, mock_db, auth_headers, test_user_id):
+        """Should reuse the insight until a new log changes the summary."""
+        await self.seed_logs(mock_db, test_user_id)
+        
+        client_with_ai.post("/api/ai/progress", json={"days": 14}, headers=auth_headers)
+        second = client_with_ai.post("/api/ai/progress", json={"days": 14}, headers=auth_headers)
+        assert second.json()["data"]["cached"] is True
+        
+        await mock_db.create_workout_log(test_user_id, "Lift", 45, workout_date=(date.today() - timedelta(days=1)).isoformat())
+        third = client_with_ai.post("/api/ai/progress", json={"days": 14}, headers=auth_headers)
+        
+        assert third.json()["data"]["cached"] is False
+        assert mock_ai_service.analyze_progress.call_count == 2
+
+    def test_progress_requires_user(self, client_with_ai):
+        """Should return 401 without an Authorization header."""
+        response = client_with_ai.post("/api/ai/progress", json={})
+        
+        assert response.status_code == 401
+
+    def test_summary_macro_ratio(self):
+        """Should compute macro calorie ratios from diet logs."""
+        today = date.today().isoformat()
+        summary = build_progress_summary(
+            [], [], [{"log_date": today, "protein": 100, "carbs": 100, "fats": 0}], days=7
+        )
+        
+        assert summary["diet"]["macro_ratio"] == {"protein": 0.5, "carbs": 0.5, "fats": 0.0}
+
+
+class TestDailyPlans:
+    """Tests for GET /api/ai/plans."""
+
+    async def test_plans_filtered_by_date(self, client_with_ai, mock_db, auth_headers, test_user_id):
+        """Should return only the plan precomputed for the requested date."""
+        for plan_date in ["2026-01-01", "2026-01-02"]:
+            await mock_db.save_ai_plan(
+                test_user_id, "diet", f"Daily plan {plan_date}", {"name": plan_date},
+                "Daily meal plan", "mock", plan_date=plan_date
+            )
+
+        response = client_with_ai.get("/api/ai/plans?plan_date=2026-01-02", headers=auth_headers)
+
+        assert response.status_code == 200
+        plans = response.json()["data"]
+        assert [p["plan_date"] for p in plans] == ["2026-01-02"]
+
+    def test_plans_requires_user(self, client_with_ai):
+        """Should return 401 without an Authorization header."""
+        response = client_with_ai.get("/api/ai/plans")
+
+        assert response.status_code == 401
+
+
 class TestInvalidPlanType:
     """Tests for invalid plan_type handling."""
 
@@ -0,0 +1,459 @@
+"""
+Tests for AIService generation logic.
+The provider client is replaced with a scripted fake.
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from app.config import Settings
+from app.services import ai_service as ai_service_module
+from app.services.ai_service import AIService
+from app.services.metrics import LLM_FIRST_TOKEN, LLM_LATENCY, LLM_TOKENS
+
+
+def make_settings(**overrides) -> Settings:
+    """Settings for an OpenAI-backed service without touching the environment."""
+    values = {
+        "supabase_url": "",
+        "supabase_anon_key": "",
+        "supabase_service_role_key": "",
+        "ai_provider": "openai",
+        "openai_api_key": "test-key",
+    }
+    values.update(overrides)
+    return Settings(**values)
+
+
+def completion(content: str) -> SimpleNamespace:
+    """Shape of a non-streaming chat completion."""
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeCompletions:
+    """Records calls and answers them with a responder function."""
+
+    def __init__(self, responder, delay: float = 0.0):
+        self.responder = responder
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            return completion(self.responder(kwargs))
+        finally:
+            self.active -= 1
+
+
+def make_service(responder, delay: float = 0.0, **overrides):
+    service = AIService(make_settings(**overrides))
+    completions = FakeCompletions(responder, delay)
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return service, completions
+
+
+def fan_out_responder(kwargs) -> str:
+    """Outline call lists six days; day calls return one exercise."""
+    system = kwargs["messages"][0]["content"]
+    if "Outline a workout plan" in system:
+        return json.dumps({
+            "title": "Six Day Split",
+            "duration": "6 weeks",
+            "difficulty": "Advanced",
+            "days": [f"Day {i}" for i in range(1, 7)]
+        })
+    return json.dumps({
+        "dayTitle": "ignored",
+        "exercises": [{"name": "Squat", "sets": 3, "reps": "5", "notes": "", "description": ""}]
+    })
+
+
+class TestWorkoutFanOut:
+    """Tests for parallel day-level workout generation."""
+
+    async def test_fan_out_merges_days_into_plan_shape(self):
+        """Should merge outline and day calls into the usual plan structure."""
+        service, completions = make_service(fan_out_responder)
+
+        plan = await service.generate_workout_plan("6 day split", fan_out=True)
+
+        assert plan["title"] == "Six Day Split"
+        assert plan["difficulty"] == "Advanced"
+        assert [d["dayTitle"] for d in plan["schedule"]] == [f"Day {i}" for i in range(1, 7)]
+        assert plan["schedule"][0]["exercises"][0]["name"] == "Squat"
+        assert len(completions.calls) == 7
+
+    async def test_fan_out_generates_days_concurrently(self):
+        """Should run all day calls at the same time."""
+        service, completions = make_service(fan_out_responder, delay=0.05)
+
+        await service.generate_workout_plan("6 day split", fan_out=True)
+
+        assert completions.max_active == 6
+
+    async def test_fan_out_respects_max_days(self):
+        """Should cap the number of generated days."""
+        service, _ = make_service(fan_out_responder, workout_fan_out_max_days=3)
+
+        plan = await service.generate_workout_plan("6 day split", fan_out=True)
+
+        assert len(plan["schedule"]) == 3
+
+    async def test_empty_outline_falls_back_to_single_call(self):
+        """Should use the single-call prompt when the outline has no days."""
+        def responder(kwargs):
+            if "Outline a workout plan" in kwargs["messages"][0]["content"]:
+                return json.dumps({"title": "Empty", "days": []})
+            return json.dumps({"title": "Single Call Plan", "schedule": []})
+        service, completions = make_service(responder)
+
+        plan = await service.generate_workout_plan("anything", fan_out=True)
+
+        assert plan["title"] == "Single Call Plan"
+        assert len(completions.calls) == 2
+
+    async def test_invalid_outline_falls_back_to_single_call(self):
+        """Should use the single-call prompt when the outline is not JSON."""
+        def responder(kwargs):
+            if "Outline a workout plan" in kwargs["messages"][0]["content"]:
+                return "Here is your outline: Day 1, Day 2"
+            return json.dumps({"title": "Single Call Plan", "schedule": []})
+        service, _ = make_service(responder)
+
+        plan = await service.generate_workout_plan("anything", fan_out=True)
+
+        assert plan["title"] == "Single Call Plan"
+
+    async def test_failed_day_is_retried_alone(self):
+        """Should retry only the day that failed and keep the others."""
+        attempts = {"Day 3": 0}
+        def responder(kwargs):
+            if '"Day 3" only' in kwargs["messages"][1]["content"]:
+                attempts["Day 3"] += 1
+                if attempts["Day 3"] == 1:
+                    return "not json"
+            return fan_out_responder(kwargs)
+        service, completions = make_service(responder)
+
+        plan = await service.generate_workout_plan("6 day split", fan_out=True)
+
+        assert [d["dayTitle"] for d in plan["schedule"]] == [f"Day {i}" for i in range(1, 7)]
+        assert len(completions.calls) == 8
+
+    async def test_day_failing_twice_falls_back_to_single_call(self):
+        """Should use the single-call prompt when a day fails its retry."""
+        def responder(kwargs):
+            if '"Day 2" only' in kwargs["messages"][1]["content"]:
+                return "not json"
+            if "Create a detailed workout plan" in kwargs["messages"][1]["content"]:
+                return json.dumps({"title": "Single Call Plan", "schedule": []})
+            return fan_out_responder(kwargs)
+        service, _ = make_service(responder)
+
+        plan = await service.generate_workout_plan("6 day split", fan_out=True)
+
+        assert plan["title"] == "Single Call Plan"
+
+
+class TestCompactSchema:
+    """Tests for the compact wire schema and its server-side expansion."""
+
+    async def test_compact_workout_expands_to_verbose_shape(self):
+        """Should expand short keys and positional exercises."""
+        compact = {
+            "t": "Push Pull",
+            "du": "4 weeks",
+            "df": "Intermediate",
+            "s": [{"d": "Day 1: Push", "e": [["Bench Press", 4, "8-10", "Control", "Press the bar"]]}]
+        }
+        service, completions = make_service(lambda kwargs: json.dumps(compact))
+
+        plan = await service.generate_workout_plan("push pull", compact=True)
+
+        assert plan == {
+            "title": "Push Pull",
+            "duration": "4 weeks",
+            "difficulty": "Intermediate",
+            "schedule": [{
+                "dayTitle": "Day 1: Push",
+                "exercises": [{
+                    "name": "Bench Press",
+                    "sets": 4,
+                    "reps": "8-10",
+                    "notes": "Control",
+                    "description": "Press the bar"
+                }]
+            }]
+        }
+        assert "compact structure" in completions.calls[0]["messages"][0]["content"]
+
+    async def test_compact_diet_expands_to_verbose_shape(self, mock_diet_response):
+        """Should expand macros and meal arrays into the diet plan shape."""
+        compact = {
+            "c": 2000,
+            "m": [150, 200, 70],
+            "ml": {
+                "b": ["Oatmeal with fruits", 400, 15, 60, 10, "Healthy start"],
+                "l": ["Grilled chicken salad", 600, 45, 40, 25, "Protein-rich lunch"],
+                "d": ["Salmon with vegetables", 700, 50, 50, 30, "Omega-3 rich dinner"],
+                "s": ["Greek yogurt", 300, 40, 50, 5, "Protein snack"]
+            }
+        }
+        service, _ = make_service(lambda kwargs: json.dumps(compact))
+
+        plan = await service.generate_diet_plan("balanced", compact=True)
+
+        assert plan == mock_diet_response
+
+    async def test_verbose_answer_passes_through_in_compact_mode(self, mock_diet_response):
+        """Should accept a verbose answer even when compact was requested."""
+        service, _ = make_service(lambda kwargs: json.dumps(mock_diet_response))
+
+        plan = await service.generate_diet_plan("balanced", compact=True)
+
+        assert plan == mock_diet_response
+
+    async def test_top_level_exercises_keep_title(self):
+        """Should not treat a verbose plan without a schedule as compact."""
+        verbose = {"title": "My plan", "exercises": [{"name": "Squat", "sets": 3, "reps": "5"}]}
+        service, _ = make_service(lambda kwargs: json.dumps(verbose))
+
+        plan = await service.generate_workout_plan("legs", compact=False)
+
+        assert plan["title"] == "My plan"
+        assert plan["schedule"] == [{"dayTitle": "Day 1", "exercises": verbose["exercises"]}]
+
+    async def test_compact_fan_out_days(self):
+        """Should expand compact day answers in fan-out mode."""
+        def responder(kwargs):
+            if "Outline a workout plan" in kwargs["messages"][0]["content"]:
+                return json.dumps({"title": "Split", "days": ["Day 1", "Day 2"]})
+            return json.dumps({"d": "Day", "e": [["Row", 3, "10", "", ""]]})
+        service, _ = make_service(responder)
+
+        plan = await service.generate_workout_plan("split", fan_out=True, compact=True)
+
+        assert plan["schedule"][1] == {
+            "dayTitle": "Day 2",
+            "exercises": [{"name": "Row", "sets": 3, "reps": "10", "notes": "", "description": ""}]
+        }
+
+
+class TestModelRouting:
+    """Tests for complexity-based model routing."""
+
+    async def test_short_generic_chat_uses_fast_model(self):
+        """Should send a one-line question to the fast model."""
+        service, completions = make_service(lambda kwargs: "3-4 sets", openai_fast_model="gpt-fast")
+
+        await service.chat("How many sets for abs?")
+
+        assert completions.calls[0]["model"] == "gpt-fast"
+
+    async def test_long_or_personal_chat_uses_default_model(self):
+        """Should keep long, keyword-heavy or personalized turns on the large model."""
+        service, completions = make_service(lambda kwargs: "ok", openai_fast_model="gpt-fast")
+
+        await service.chat("x" * 500)
+        await service.chat("Can you adjust my program?")
+        await service.chat("Hi", user_context={"name": "Sam"})
+
+        assert [c["model"] for c in completions.calls] == ["gpt-4o"] * 3
+
+    async def test_keywords_match_whole_words(self):
+        """Should not treat words containing a keyword as complex."""
+        service, completions = make_service(lambda kwargs: "ok", openai_fast_model="gpt-fast")
+
+        await service.chat("Can you explain proper squat form?")
+        await service.chat("Is running in Spain fun?")
+        await service.chat("Any tips for my meal plans?")
+
+        assert [c["model"] for c in completions.calls] == ["gpt-fast", "gpt-fast", "gpt-4o"]
+
+    async def test_plans_always_use_default_model(self):
+        """Should never route plan generation to the fast model."""
+        service, completions = make_service(
+            lambda kwargs: json.dumps({"title": "Plan", "schedule": []}),
+            openai_fast_model="gpt-fast"
+        )
+
+        await service.generate_workout_plan("abs")
+
+        assert completions.calls[0]["model"] == "gpt-4o"
+
+    async def test_routing_disabled_uses_default_model(self):
+        """Should use the configured model for everything when disabled."""
+        service, completions = make_service(
+            lambda kwargs: "ok", openai_fast_model="gpt-fast", ai_routing_enabled=False
+        )
+
+        await service.chat("How many sets for abs?")
+
+        assert completions.calls[0]["model"] == "gpt-4o"
+
+    async def test_latency_recorded_per_route_and_model(self):
+        """Should keep latency stats keyed by route and model."""
+        service, _ = make_service(lambda kwargs: "ok", openai_fast_model="gpt-stats")
+
+        await service.chat("Quick tip?")
+
+        stats = service.router.stats.snapshot()
+        assert stats["chat"]["gpt-stats"]["calls"] >= 1
+
+
+def stream_chunk(content=None, usage=None) -> SimpleNamespace:
+    """Shape of one streamed chunk; the usage chunk has no choices."""
+    choices = [] if content is None else [SimpleNamespace(delta=SimpleNamespace(content=content))]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class TestProviderMetrics:
+    """Tests for latency and token accounting of provider calls."""
+
+    async def test_usage_tokens_counted(self):
+        """Should add the provider's reported tokens to the counters."""
+        service, completions = make_service(lambda kwargs: "ok", openai_fast_model="gpt-usage")
+        usage = SimpleNamespace(prompt_tokens=120, completion_tokens=30)
+        original = completions.create
+
+        async def create_with_usage(**kwargs):
+            response = await original(**kwargs)
+            response.usage = usage
+            return response
+        completions.create = create_with_usage
+
+        await service.chat("Quick tip?")
+
+        assert LLM_TOKENS.value("openai", "gpt-usage", "prompt") == 120
+        assert LLM_TOKENS.value("openai", "gpt-usage", "completion") == 30
+        assert LLM_LATENCY.count("openai", "gpt-usage", "chat") == 1
+
+    async def test_stream_first_token_and_usage(self):
+        """Should time the first streamed token and read usage from the last chunk."""
+        service, _ = make_service(lambda kwargs: "ok", openai_fast_model="gpt-stream")
+        calls = []
+
+        async def create_stream(**kwargs):
+            calls.append(kwargs)
+
+            async def chunks():
+                for content in ["Hi ", "there"]:
+                    yield stream_chunk(content)
+                yield stream_chunk(usage=SimpleNamespace(prompt_tokens=50, completion_tokens=2))
+            return chunks()
+        service.client.chat.completions.create = create_stream
+
+        text = "".join([chunk async for chunk in service.chat_stream("Quick tip?")])
+
+        assert text == "Hi there"
+        assert calls[0]["stream_options"] == {"include_usage": True}
+        assert LLM_FIRST_TOKEN.count("openai", "gpt-stream", "chat_stream") == 1
+        assert LLM_TOKENS.value("openai", "gpt-stream", "completion") == 2
+
+    async def test_stream_retried_without_rejected_usage_option(self, monkeypatch):
+        """Should stream without stream_options when the backend rejects it, and remember that."""
+        monkeypatch.setattr(ai_service_module, "_stream_usage_rejected", set())
+        service, _ = make_service(lambda kwargs: "ok", ai_provider="deepseek", deepseek_api_key="key")
+        calls = []
+
+        async def create_stream(**kwargs):
+            calls.append(kwargs)
+            if "stream_options" in kwargs:
+                raise openai.BadRequestError(
+                    "Unrecognized request argument: stream_options",
+                    response=httpx.Response(400, request=httpx.Request("POST", "http://provider")),
+                    body=None
+                )
+
+            async def chunks():
+                yield stream_chunk("Hi")
+            return chunks()
+        service.client.chat.completions.create = create_stream
+
+        assert [chunk async for chunk in service.chat_stream("Quick tip?")] == ["Hi"]
+        assert [chunk async for chunk in service.chat_stream("Quick tip?")] == ["Hi"]
+        assert ["stream_options" in c for c in calls] == [True, False, False]
+
+    async def test_stream_usage_can_be_disabled(self):
+        """Should not send stream_options when disabled in settings."""
+        service, _ = make_service(lambda kwargs: "ok", ai_stream_usage=False)
+        calls = []
+
+        async def create_stream(**kwargs):
+            calls.append(kwargs)
+
+            async def chunks():
+                yield stream_chunk("Hi")
+            return chunks()
+        service.client.chat.completions.create = create_stream
+
+        [chunk async for chunk in service.chat_stream("Quick tip?")]
+
+        assert "stream_options" not in calls[0]
+
+
+def make_simulated(**overrides) -> AIService:
+    """AIService on the simulated provider with fast, seeded defaults."""
+    values = {"ai_provider": "simulated", "sim_ttft_seconds": 0.01, "sim_tokens_per_second": 5000, "sim_seed": 7}
+    values.update(overrides)
+    service = AIService(make_settings(**values))
+    service.client.backoff_seconds = 0
+    return service
+
+
+class TestSimulatedProvider:
+    """Tests for the offline simulated provider."""
+
+    async def test_stream_yields_answer_in_pieces(self):
+        """Should stream the canned answer token by token."""
+        service = make_simulated()
+
+        chunks = [chunk async for chunk in service.chat_stream("Quick tip?")]
+
+        assert len(chunks) > 10
+        assert "".join(chunks).startswith("Good question!")
+
+    async def test_plans_parse_through_normal_path(self):
+        """Should answer plan prompts with JSON the service can parse, fan-out included."""
+        service = make_simulated()
+
+        plan = await service.generate_workout_plan("3-day split", fan_out=True)
+        diet = await service.generate_diet_plan("2200 kcal")
+
+        assert [day["dayTitle"] for day in plan["schedule"]][0] == "Day 1: Upper Body Push"
+        assert diet["dailyCalories"] == 2200
+
+    async def test_rate_limits_retried_then_raised(self):
+        """Should retry 429s max_retries times before raising RateLimitError."""
+        service = make_simulated(sim_rate_limit_rate=1.0, ai_max_retries=2)
+
+        with pytest.raises(openai.RateLimitError):
+            await service.chat("Quick tip?")
+
+        assert service.client.calls == 3
+
+    async def test_timeout_raises_api_timeout(self):
+        """Should time out a slow first token like the openai client."""
+        service = make_simulated(sim_ttft_seconds=0.5, sim_jitter=0, ai_timeout_seconds=0.05, ai_max_retries=0)
+
+        with pytest.raises(openai.APITimeoutError):
+            await service.chat("Quick tip?")
+
+    async def test_truncated_output_is_invalid_json(self):
+        """Should cut answers short so truncation handling can be exercised."""
+        service = make_simulated(sim_truncation_rate=1.0)
+
+        with pytest.raises(ValueError):
+            await service.generate_diet_plan("2200 kcal")
@@ -0,0 +1,149 @@
+"""
+Tests for bearer token authentication.
+Tokens are signed locally; no Supabase project is contacted.
+"""
+
+import time
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi import WebSocketDisconnect
+from jose import jwk, jwt
+
+from app import auth
+from app.auth import AuthError, JWKSCache, TokenVerifier
+from app.config import get_settings
+
+
+SECRET = "test-jwt-secret"
+
+
+def make_token(sub="user-1", expires_in=3600, key=SECRET, algorithm="HS256", headers=None, **claims):
+    payload = {"sub": sub, "aud": "authenticated", "exp": int(time.time()) + expires_in, **claims}
+    return jwt.encode(payload, key, algorithm=algorithm, headers=headers)
+
+
+@pytest.fixture
+def verifier():
+    return TokenVerifier(secret=SECRET)
+
+
+@pytest.fixture
+def jwt_mode(monkeypatch, verifier):
+    """App configured to verify tokens with the test verifier."""
+    monkeypatch.setattr(get_settings(), "auth_mode", "jwt")
+    monkeypatch.setattr(auth, "get_token_verifier", lambda: verifier)
+    return verifier
+
+
+class TestTokenVerifier:
+    """Tests for signature, claim and cache handling"""
+
+    async def test_valid_token_returns_claims(self, verifier):
+        """Should return the claims of a correctly signed token"""
+        claims = await verifier.verify(make_token())
+        assert claims["sub"] == "user-1"
+
+    async def test_repeated_token_served_from_cache(self, verifier, monkeypatch):
+        """Should not decode a token again once it has been verified"""
+        token = make_token()
+        await verifier.verify(token)
+        monkeypatch.setattr(jwt, "decode", lambda *args, **kwargs: pytest.fail("decoded twice"))
+
+        assert (await verifier.verify(token))["sub"] == "user-1"
+
+    @pytest.mark.parametrize("token", [
+        make_token(key="wrong-secret"),
+        make_token(expires_in=-3600),
+        make_token(aud="anon"),
+        make_token(sub=""),
+        "not-a-jwt",
+    ])
+    async def test_invalid_tokens_rejected(self, verifier, token):
+        """Should reject bad signatures, expired tokens, wrong audience and missing subject"""
+        with pytest.raises(AuthError):
+            await verifier.verify(token)
+
+    async def test_cached_claims_expire_with_token(self, verifier):
+        """Should drop cached claims once the token expires"""
+        verifier.claims.set("token", {"sub": "user-1"}, time.time() - 1)
+        assert verifier.claims.get("token") is None
+
+    async def test_jwks_key_fetched_for_unknown_kid(self, monkeypatch):
+        """Should refresh the key set when a token names an unknown key"""
+        private = ec.generate_private_key(ec.SECP256R1())
+        pem = private.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        signing_key = private.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        jwks = JWKSCache("https://example.supabase.co/auth/v1/.well-known/jwks.json")
+        refreshes = []
+
+        async def refresh():
+            refreshes.append(1)
+            jwks._keys = {"key-2": jwk.construct(pem, "ES256")}
+            jwks._fetched_at = time.monotonic()
+            return 1
+
+        monkeypatch.setattr(jwks, "refresh", refresh)
+        verifier = TokenVerifier(jwks=jwks)
+        token = make_token(key=signing_key, algorithm="ES256", headers={"kid": "key-2"})
+
+        assert (await verifier.verify(token))["sub"] == "user-1"
+        with pytest.raises(AuthError):
+            await verifier.verify(make_token(key=signing_key, algorithm="ES256", headers={"kid": "key-3"}))
+        assert len(refreshes) == 1
+
+    async def test_unreachable_jwks_is_auth_error(self, monkeypatch):
+        """Should reject a token with an unknown key when JWKS cannot be fetched, and not refetch at once"""
+        private = ec.generate_private_key(ec.SECP256R1())
+        signing_key = private.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        jwks = JWKSCache("https://example.supabase.co/auth/v1/.well-known/jwks.json")
+        attempts = []
+
+        async def refresh():
+            attempts.append(1)
+            raise httpx.ConnectError("unreachable")
+
+        monkeypatch.setattr(jwks, "refresh", refresh)
+        verifier = TokenVerifier(jwks=jwks)
+        token = make_token(key=signing_key, algorithm="ES256", headers={"kid": "forged"})
+
+        for _ in range(2):
+            with pytest.raises(AuthError):
+                await verifier.verify(token)
+        assert len(attempts) == 1
+
+
+class TestAuthDependency:
+    """Tests for the shared user ID dependencies"""
+
+    def test_user_id_mode_accepts_raw_id(self, client, auth_headers, mock_supabase_service):
+        """Should accept the bearer value as the user ID by default"""
+        response = client.get("/api/workout/logs", headers=auth_headers)
+        assert response.status_code == 200
+        assert mock_supabase_service.get_workout_logs.call_args[0][0] == "test-user-123"
+
+    def test_jwt_mode_uses_subject(self, client, jwt_mode, mock_supabase_service):
+        """Should resolve the user ID from a verified token's subject"""
+        response = client.get("/api/workout/logs", headers={"Authorization": f"Bearer {make_token(sub='user-9')}"})
+        assert response.status_code == 200
+        assert mock_supabase_service.get_workout_logs.call_args[0][0] == "user-9"
+
+    def test_jwt_mode_rejects_raw_id(self, client, jwt_mode, auth_headers):
+        """Should return 401 for a bearer value that is not a valid token"""
+        response = client.get("/api/workout/logs", headers=auth_headers)
+        assert response.status_code == 401
+
+    def test_websocket_rejects_invalid_query_token(self, client, jwt_mode):
+        """Should close a WebSocket whose ?token= does not verify with 1008"""
+        with pytest.raises(WebSocketDisconnect) as closed:
+            with client.websocket_connect("/api/chat/ws?token=not-a-jwt") as websocket:
+                websocket.receive_json()
+        assert closed.value.code == 1008
@@ -0,0 +1,116 @@
+"""
+Tests for the daily plan batch pipeline.
+AI service is mocked to avoid external API calls.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+
+from app.services.batch_plans import DailyPlanBatch, seconds_until_hour
+
+
+PLAN_DATE = "2026-02-01"
+
+
+@pytest.fixture
+def mock_db(mock_db):
+    """Supabase service with five opted-in users and one who opted out."""
+    for i in range(5):
+        user_id = f"user-{i}"
+        mock_db._mock_data['users'][user_id] = {"id": user_id, "goal": "Weight Loss", "daily_plan_opt_in": True}
+    mock_db._mock_data['users']["user-out"] = {"id": "user-out", "daily_plan_opt_in": False}
+    return mock_db
+
+
+@pytest.fixture
+def mock_ai_service(mock_diet_response):
+    """Mock AI service returning a fixed diet plan."""
+    mock = MagicMock()
+    mock.provider = "mock"
+    mock.generate_diet_plan = AsyncMock(return_value=mock_diet_response)
+    return mock
+
+
+def daily_plans(db):
+    return [p for p in db._mock_data['ai_plans'] if p.get('plan_date') == PLAN_DATE]
+
+
+class TestDailyPlanBatch:
+    """Tests for DailyPlanBatch.run."""
+
+    async def test_generates_plan_per_opted_in_user(self, mock_db, mock_ai_service):
+        """Should save one dated diet plan per opted-in user across pages."""
+        stats = await DailyPlanBatch(mock_db, mock_ai_service, page_size=2).run(PLAN_DATE)
+
+        assert stats["users"] == 5
+        assert stats["generated"] == 5
+        assert sorted(p["user_id"] for p in daily_plans(mock_db)) == [f"user-{i}" for i in range(5)]
+
+    async def test_rerun_skips_finished_users(self, mock_db, mock_ai_service):
+        """Should resume by skipping users who already have a plan for the date."""
+        await mock_db.save_ai_plan("user-1", "diet", "Daily plan", {}, "", "mock", plan_date=PLAN_DATE)
+
+        stats = await DailyPlanBatch(mock_db, mock_ai_service).run(PLAN_DATE)
+
+        assert stats["skipped"] == 1
+        assert stats["generated"] == 4
+        assert mock_ai_service.generate_diet_plan.call_count == 4
+
+    async def test_failures_do_not_stop_the_run(self, mock_db, mock_ai_service, mock_diet_response):
+        """Should count a failed user and carry on with the rest."""
+        mock_ai_service.generate_diet_plan.side_effect = [Exception("boom")] + [mock_diet_response] * 4
+
+        stats = await DailyPlanBatch(mock_db, mock_ai_service, concurrency=1).run(PLAN_DATE)
+
+        assert stats["failed"] == 1
+        assert stats["generated"] == 4
+
+    async def test_concurrency_is_bounded(self, mock_db, mock_ai_service, mock_diet_response):
+        """Should never run more generations at once than the limit."""
+        active = {"now": 0, "max": 0}
+
+        async def slow_generate(*args):
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+            await asyncio.sleep(0.01)
+            active["now"] -= 1
+            return mock_diet_response
+        mock_ai_service.generate_diet_plan = AsyncMock(side_effect=slow_generate)
+
+        await DailyPlanBatch(mock_db, mock_ai_service, concurrency=2).run(PLAN_DATE)
+
+        assert active["max"] == 2
+
+    async def test_past_daily_plans_leave_active_list(self, mock_db):
+        """Should list today's and tomorrow's daily plans but not earlier ones."""
+        today = datetime.now(timezone.utc).date()
+        await mock_db.save_ai_plan("user-1", "workout", "My plan", {}, "", "mock")
+        for offset in (-2, -1, 0, 1):
+            plan_date = (today + timedelta(days=offset)).isoformat()
+            await mock_db.save_ai_plan("user-1", "diet", "Daily plan", {}, "", "mock", plan_date=plan_date)
+
+        plans = await mock_db.get_active_plans("user-1")
+
+        assert sorted(p.get("plan_date") or "" for p in plans) == [
+            "", today.isoformat(), (today + timedelta(days=1)).isoformat()
+        ]
+        assert len(await mock_db.get_active_plans("user-1", (today - timedelta(days=2)).isoformat())) == 1
+
+
+class TestSchedule:
+    """Tests for the nightly schedule helper."""
+
+    def test_seconds_until_later_today(self):
+        """Should wait until the hour later the same day."""
+        now = datetime(2026, 1, 1, 1, 30, tzinfo=timezone.utc)
+
+        assert seconds_until_hour(3, now) == 90 * 60
+
+    def test_seconds_until_tomorrow(self):
+        """Should wait until tomorrow once the hour has passed."""
+        now = datetime(2026, 1, 1, 4, 0, tzinfo=timezone.utc)
+
+        assert seconds_until_hour(3, now) == 23 * 3600
@@ -0,0 +1,348 @@
+"""
+Tests for chat router endpoints.
+AI service is mocked to avoid external API calls.
+"""
+
+import asyncio
+import json
+
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+from fastapi.testclient import TestClient
+
+from datetime import date, timedelta
+
+from app.config import get_settings
+from app.main import app
+from app.routers import chat as chat_router
+from app.routers import workout as workout_router
+from app.services.log_retrieval import LogRetrievalIndex, estimate_tokens
+from app.services.suggestion_cache import SuggestionCache
+
+
+@pytest.fixture
+def mock_ai_service():
+    """Mock AI service with a short streamed answer."""
+    async def fake_stream(**kwargs):
+        for chunk in ["Live ", "answer"]:
+            yield chunk
+
+    mock = MagicMock()
+    mock.chat = AsyncMock(return_value="Live answer")
+    mock.chat_stream = MagicMock(side_effect=fake_stream)
+    mock.is_ready = MagicMock(return_value=True)
+    mock.finish_reason = "stop"
+    return mock
+
+
+@pytest.fixture
+def suggestion_cache():
+    """Suggestion cache with one prepared answer."""
+    cache = SuggestionCache(questions=["Can you explain proper squat form?", "What's a good stretching routine?"])
+    cache.register("Can you explain proper squat form?", "Cached squat answer")
+    return cache
+
+
+@pytest.fixture
+def log_index():
+    """Empty log retrieval index per test."""
+    return LogRetrievalIndex()
+
+
+@pytest.fixture
+def client_with_chat(mock_ai_service, suggestion_cache, mock_db, log_index):
+    """Test client with mocked AI service and suggestion cache."""
+    app.dependency_overrides[chat_router.get_ai_service] = lambda: mock_ai_service
+    app.dependency_overrides[chat_router.get_suggestion_cache] = lambda: suggestion_cache
+    app.dependency_overrides[chat_router.get_supabase_service] = lambda: mock_db
+    app.dependency_overrides[chat_router.get_log_index] = lambda: log_index
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+    app.dependency_overrides.clear()
+
+
+def read_sse(response) -> list:
+    """Parse SSE data lines into dicts."""
+    return [
+        json.loads(line[len("data: "):])
+        for line in response.text.splitlines()
+        if line.startswith("data: ")
+    ]
+
+
+class TestChatStream:
+    """Tests for POST /api/chat/stream."""
+
+    def test_stream_live_answer(self, client_with_chat, mock_ai_service):
+        """Should stream chunks from the AI service."""
+        response = client_with_chat.post("/api/chat/stream", json={"message": "Hello coach"})
+
+        events = read_sse(response)
+        assert "".join(e.get("content", "") for e in events) == "Live answer"
+        assert events[-1] == {"done": True}
+        mock_ai_service.chat_stream.assert_called_once()
+
+    def test_stream_cached_suggestion(self, client_with_chat, mock_ai_service):
+        """Should stream a suggestion's cached answer without calling the AI."""
+        response = client_with_chat.post(
+            "/api/chat/stream",
+            json={"message": "Can you explain proper squat form?"}
+        )
+
+        events = read_sse(response)
+        assert "".join(e.get("content", "") for e in events) == "Cached squat answer"
+        mock_ai_service.chat_stream.assert_not_called()
+
+    def test_personal_context_bypasses_cache(self, client_with_chat, mock_ai_service):
+        """Should go live when the request carries personal context."""
+        client_with_chat.post(
+            "/api/chat/stream",
+            json={
+                "message": "Can you explain proper squat form?",
+                "user_context": {"goal": "Muscle Gain"}
+            }
+        )
+
+        mock_ai_service.chat_stream.assert_called_once()
+
+
+class TestChatSend:
+    """Tests for POST /api/chat/send."""
+
+    def test_send_cached_suggestion(self, client_with_chat, mock_ai_service):
+        """Should answer an exact suggestion from the cache."""
+        response = client_with_chat.post(
+            "/api/chat/send",
+            json={"message": "can you explain  proper squat form?"}
+        )
+
+        assert response.json()["response"] == "Cached squat answer"
+        mock_ai_service.chat.assert_not_called()
+
+
+class TestSuggestions:
+    """Tests for GET and POST /api/chat/suggestions."""
+
+    def test_get_suggestions(self, client_with_chat):
+        """Should list suggestions from the cache."""
+        response = client_with_chat.get("/api/chat/suggestions")
+
+        assert response.json()["suggestions"] == [
+            "Can you explain proper squat form?",
+            "What's a good stretching routine?"
+        ]
+
+    def test_register_requires_admin_key(self, client_with_chat):
+        """Should reject registration without the admin key."""
+        response = client_with_chat.post(
+            "/api/chat/suggestions",
+            json={"question": "How much water should I drink?", "answer": "About 2-3 litres."}
+        )
+
+        assert response.status_code == 403
+
+    def test_register_with_answer(self, client_with_chat, suggestion_cache, monkeypatch):
+        """Should add the suggestion and serve its answer from the cache."""
+        monkeypatch.setattr(get_settings(), "admin_api_key", "secret")
+
+        response = client_with_chat.post(
+            "/api/chat/suggestions",
+            json={"question": "How much water should I drink?", "answer": "About 2-3 litres."},
+            headers={"X-Admin-Key": "secret"}
+        )
+
+        assert response.status_code == 200
+        assert "How much water should I drink?" in suggestion_cache.questions()
+        assert suggestion_cache.lookup("How much water should I drink?") == "About 2-3 litres."
+
+    def test_first_answer_fills_cache(self, client_with_chat, suggestion_cache, mock_ai_service):
+        """Should cache a suggestion's answer the first time it is asked."""
+        question = "What's a good stretching routine?"
+        client_with_chat.post("/api/chat/stream", json={"message": question})
+        client_with_chat.post("/api/chat/stream", json={"message": question})
+
+        assert suggestion_cache.lookup(question) == "Live answer"
+        mock_ai_service.chat_stream.assert_called_once()
+
+    def test_truncated_answer_not_cached(self, client_with_chat, suggestion_cache, mock_ai_service):
+        """Should not cache an answer the provider cut off at max_tokens."""
+        mock_ai_service.finish_reason = "length"
+        question = "What's a good stretching routine?"
+        client_with_chat.post("/api/chat/send", json={"message": question})
+
+        assert suggestion_cache.lookup(question) is None
+
+    async def test_refresh_warms_missing_answers(self, suggestion_cache, mock_ai_service):
+        """Should generate missing answers on start and keep fresh ones."""
+        task = asyncio.create_task(suggestion_cache.refresh_periodically(lambda: mock_ai_service, 3600))
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+        mock_ai_service.chat.assert_called_once_with("What's a good stretching routine?")
+        assert suggestion_cache.lookup("What's a good stretching routine?") == "Live answer"
+        assert suggestion_cache.lookup("Can you explain proper squat form?") == "Cached squat answer"
+
+    async def test_refresh_skips_truncated_answers(self, suggestion_cache, mock_ai_service):
+        """Should leave a question unanswered when its generated answer was cut short."""
+        mock_ai_service.finish_reason = "length"
+        await suggestion_cache.refresh(mock_ai_service, ["What's a good stretching routine?"])
+
+        assert suggestion_cache.lookup("What's a good stretching routine?") is None
+
+    async def test_claim_released_when_nothing_refreshed(self, suggestion_cache, mock_ai_service, monkeypatch):
+        """Should release the refresh claim when the AI service is not ready."""
+        monkeypatch.setattr(suggestion_cache, "stale_questions", lambda max_age: ["Can you explain proper squat form?"])
+        mock_ai_service.is_ready.return_value = False
+        task = asyncio.create_task(suggestion_cache.refresh_periodically(lambda: mock_ai_service, 3600))
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+        assert suggestion_cache.state.get("suggestions:refreshing") is None
+
+
+def receive_until(websocket, final_types=("done", "cancelled", "error")) -> list:
+    """Collect frames until one of the final types arrives."""
+    frames = []
+    while True:
+        frame = websocket.receive_json()
+        frames.append(frame)
+        if frame["type"] in final_types:
+            return frames
+
+
+class TestChatWebSocket:
+    """Tests for the /api/chat/ws WebSocket endpoint."""
+
+    def test_message_streams_chunks(self, client_with_chat):
+        """Should stream chunk frames then done."""
+        with client_with_chat.websocket_connect("/api/chat/ws") as websocket:
+            websocket.send_json({"type": "message", "message": "Hello coach"})
+            frames = receive_until(websocket)
+
+        assert frames[0] == {"type": "typing", "active": True}
+        assert "".join(f["content"] for f in frames if f["type"] == "chunk") == "Live answer"
+        assert frames[-1] == {"type": "done"}
+
+    def test_multiple_turns_on_one_connection(self, client_with_chat, mock_ai_service):
+        """Should serve several turns over the same socket."""
+        with client_with_chat.websocket_connect("/api/chat/ws") as websocket:
+            for _ in range(2):
+                websocket.send_json({"type": "message", "message": "Hello coach"})
+                receive_until(websocket)
+
+        assert mock_ai_service.chat_stream.call_count == 2
+
+    def test_cancel_aborts_upstream_stream(self, client_with_chat, mock_ai_service):
+        """Should stop streaming and close the upstream generator on cancel."""
+        closed = []
+
+        async def slow_stream(**kwargs):
+            try:
+                for i in range(100):
+                    yield f"chunk{i} "
+                    await asyncio.sleep(0.05)
+            finally:
+                closed.append(True)
+        mock_ai_service.chat_stream = MagicMock(side_effect=slow_stream)
+
+        with client_with_chat.websocket_connect("/api/chat/ws") as websocket:
+            websocket.send_json({"type": "message", "message": "Tell me everything"})
+            assert websocket.receive_json()["type"] == "typing"
+            assert websocket.receive_json()["type"] == "chunk"
+            websocket.send_json({"type": "cancel"})
+            frames = receive_until(websocket, final_types=("cancelled",))
+
+        assert frames[-1] == {"type": "cancelled"}
+        assert closed == [True]
+
+    def test_typing_and_unknown_frames(self, client_with_chat):
+        """Should ignore typing frames and report unknown frame types."""
+        with client_with_chat.websocket_connect("/api/chat/ws") as websocket:
+            websocket.send_json({"type": "typing"})
+            websocket.send_json({"type": "bogus"})
+            frame = websocket.receive_json()
+
+        assert frame["type"] == "error"
+        assert "bogus" in frame["error"]
+
+    def test_cached_suggestion_over_websocket(self, client_with_chat, mock_ai_service):
+        """Should reuse the suggestion cache like the HTTP endpoints."""
+        with client_with_chat.websocket_connect("/api/chat/ws") as websocket:
+            websocket.send_json({"type": "message", "message": "Can you explain proper squat form?"})
+            frames = receive_until(websocket)
+
+        assert "".join(f["content"] for f in frames if f["type"] == "chunk") == "Cached squat answer"
+        mock_ai_service.chat_stream.assert_not_called()
+
+
+def days_ago(days: int) -> str:
+    return (date.today() - timedelta(days=days)).isoformat()
+
+
+class TestLogRetrieval:
+    """Tests for chat answers grounded in the user's own logs."""
+
+    async def seed_logs(self, db, user_id):
+        await db.create_diet_log(user_id, "Lunch", "Chicken salad", 450, 35, 20, 18, log_date=days_ago(1))
+        await db.create_diet_log(user_id, "Dinner", "Salmon and rice", 700, 40, 80, 20, log_date=days_ago(20))
+        await db.create_workout_log(user_id, "Push Day", 45, calories_burned=320, workout_date=days_ago(2))
+
+    async def test_send_includes_relevant_facts(self, client_with_chat, mock_ai_service, mock_db, auth_headers, test_user_id):
+        """Should pass only facts about recent meals for a diet question."""
+        await self.seed_logs(mock_db, test_user_id)
+
+        client_with_chat.post("/api/chat/send", json={"message": "What did I eat this week?"}, headers=auth_headers)
+
+        facts = mock_ai_service.chat.call_args.kwargs["user_facts"]
+        assert facts == [f"{days_ago(1)} lunch: Chicken salad, 450 kcal, P35 C20 F18"]
+
+    async def test_general_question_has_no_facts(self, client_with_chat, mock_ai_service, mock_db, auth_headers, test_user_id):
+        """Should not inject logs into questions unrelated to them."""
+        await self.seed_logs(mock_db, test_user_id)
+
+        client_with_chat.post("/api/chat/send", json={"message": "How can I sleep better?"}, headers=auth_headers)
+
+        assert mock_ai_service.chat.call_args.kwargs["user_facts"] is None
+
+    @pytest.mark.parametrize("via", ["query", "frame"])
+    async def test_websocket_identifies_user(self, client_with_chat, mock_ai_service, mock_db, test_user_id, via):
+        """Should identify browser WebSocket users from ?token= or an auth frame."""
+        await self.seed_logs(mock_db, test_user_id)
+
+        path = f"/api/chat/ws?token={test_user_id}" if via == "query" else "/api/chat/ws"
+        with client_with_chat.websocket_connect(path) as websocket:
+            if via == "frame":
+                websocket.send_json({"type": "auth", "token": f"Bearer {test_user_id}"})
+            websocket.send_json({"type": "message", "message": "What did I eat this week?"})
+            receive_until(websocket)
+
+        facts = mock_ai_service.chat_stream.call_args.kwargs["user_facts"]
+        assert facts == [f"{days_ago(1)} lunch: Chicken salad, 450 kcal, P35 C20 F18"]
+
+    def test_new_log_updates_index(self, client_with_chat, mock_ai_service, mock_db, auth_headers):
+        """Should see a workout logged after the index was loaded."""
+        client_with_chat.post("/api/chat/send", json={"message": "Hi"}, headers=auth_headers)
+        app.dependency_overrides[workout_router.get_supabase_service] = lambda: mock_db
+        client_with_chat.post(
+            "/api/workout/log",
+            json={"title": "Leg Day", "duration_minutes": 50},
+            headers=auth_headers
+        )
+
+        client_with_chat.post("/api/chat/send", json={"message": "When did I last train legs?"}, headers=auth_headers)
+
+        facts = mock_ai_service.chat.call_args.kwargs["user_facts"]
+        assert facts[0] == f"{date.today().isoformat()} workout: Leg Day, 50 min"
+
+    def test_facts_fit_token_budget(self, log_index):
+        """Should stop adding facts once the token budget is spent."""
+        log_index._users["u1"] = {}
+        for i in range(30):
+            log_index.add_log("u1", "diet", {"id": str(i), "meal_type": "Snack", "meal_name": "Apple", "calories": 95, "log_date": days_ago(i % 7)})
+
+        facts = log_index.search("u1", "What snacks did I eat?", token_budget=50)
+
+        assert 0 < len(facts) < 30
+        assert sum(estimate_tokens(f) + 1 for f in facts) <= 50
@@ -0,0 +1,141 @@
+"""
+Tests for negotiated response compression.
+A small app behind the middleware serves JSON, streamed NDJSON and SSE bodies.
+"""
+
+import gzip
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.services import compression
+from app.services.compression import CompressedBodyCache, CompressionMiddleware, negotiate
+
+
+BIG = {"items": [{"id": i, "title": "Upper body strength", "exercises": ["Bench", "Row"]} for i in range(200)]}
+
+
+def make_app() -> FastAPI:
+    test_app = FastAPI()
+    test_app.add_middleware(CompressionMiddleware)
+
+    @test_app.get("/big")
+    async def big():
+        return BIG
+
+    @test_app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @test_app.get("/export")
+    async def export():
+        async def rows():
+            for item in BIG["items"]:
+                yield json.dumps(item) + "\n"
+        return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+    @test_app.get("/events")
+    async def events():
+        async def stream():
+            for i in range(3):
+                yield f"data: {'x' * 600} {i}\n\n"
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return test_app
+
+
+@pytest.fixture
+def client():
+    with TestClient(make_app()) as test_client:
+        yield test_client
+
+
+class TestNegotiation:
+    """Tests for Accept-Encoding parsing"""
+
+    @pytest.mark.parametrize("header,available,expected", [
+        ("gzip, deflate, br", ("br", "gzip"), "br"),
+        ("gzip, deflate, br", ("gzip",), "gzip"),
+        ("br;q=0.5, gzip", ("br", "gzip"), "gzip"),
+        ("gzip;q=0", ("gzip",), None),
+        ("identity", ("br", "gzip"), None),
+        ("*", ("br", "gzip"), "br"),
+    ])
+    def test_negotiate(self, header, available, expected):
+        """Should honour q-values and prefer brotli on ties"""
+        assert negotiate(header, available) == expected
+
+
+class TestCompressionMiddleware:
+    """Tests for which responses are compressed and how"""
+
+    def test_large_json_gzipped(self, client):
+        """Should gzip bodies above the threshold and set Vary"""
+        response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) < len(json.dumps(BIG)) / 5
+        assert response.json() == BIG
+
+    def test_small_and_unaccepted_bodies_untouched(self, client):
+        """Should skip bodies under the threshold and clients without gzip"""
+        assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+        assert "content-encoding" not in client.get("/big", headers={"Accept-Encoding": "identity"}).headers
+
+    def test_uncompressed_bodies_still_vary(self, client):
+        """Should set Vary on compressible responses sent uncompressed, but not on event streams"""
+        small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+        identity = client.get("/big", headers={"Accept-Encoding": "identity"})
+        events = client.get("/events", headers={"Accept-Encoding": "gzip"})
+
+        assert small.headers["vary"] == "Accept-Encoding"
+        assert identity.headers["vary"] == "Accept-Encoding"
+        assert "vary" not in events.headers
+
+    def test_repeated_body_compressed_once(self, client, monkeypatch):
+        """Should serve the cached compressed body for a repeated payload"""
+        calls = []
+        original = compression.compress
+        monkeypatch.setattr(compression, "compress", lambda body, encoding: calls.append(1) or original(body, encoding))
+
+        first = client.get("/big", headers={"Accept-Encoding": "gzip"})
+        second = client.get("/big", headers={"Accept-Encoding": "gzip"})
+
+        assert len(calls) == 1
+        assert first.content == second.content
+
+    def test_streamed_body_compressed_per_chunk(self, client):
+        """Should compress streamed exports without buffering the whole body"""
+        with client.stream("GET", "/export", headers={"Accept-Encoding": "gzip"}) as response:
+            assert response.headers["content-encoding"] == "gzip"
+            assert "content-length" not in response.headers
+            raw = b"".join(response.iter_raw())
+        lines = gzip.decompress(raw).decode().splitlines()
+        assert [json.loads(line) for line in lines] == BIG["items"]
+
+    def test_server_sent_events_not_compressed(self, client):
+        """Should leave event streams alone so each event arrives immediately"""
+        response = client.get("/events", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert response.text.count("data: ") == 3
+
+    def test_brotli_when_installed(self, client):
+        """Should prefer brotli when the package is available"""
+        brotli = pytest.importorskip("brotli")
+        with client.stream("GET", "/big", headers={"Accept-Encoding": "gzip, br"}) as response:
+            assert response.headers["content-encoding"] == "br"
+            assert json.loads(brotli.decompress(b"".join(response.iter_raw()))) == BIG
+
+
+class TestCompressedBodyCache:
+    """Tests for the bounded cache of compressed bodies"""
+
+    def test_evicts_least_recently_used(self):
+        """Should stay within its byte budget"""
+        cache = CompressedBodyCache(max_bytes=200)
+        for i in range(20):
+            cache.get_or_compress(json.dumps({"n": i, "pad": "y" * 50}).encode(), "gzip")
+        assert 0 < cache.size <= 200
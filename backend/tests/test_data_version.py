@@ -0,0 +1,137 @@
+"""
+Tests for per-user data versions and conditional GETs.
+Reads and writes go through the mock Supabase store.
+"""
+
+import time
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.routers import diet, workout
+from app.services.data_version import DataVersions, etag_matches
+from app.services.shared_state import MemoryState, SQLiteState
+
+
+@pytest.fixture
+def versions():
+    return DataVersions(MemoryState())
+
+
+@pytest.fixture
+def mock_db(mock_db, versions, monkeypatch):
+    """Supabase service on its in-memory store, bumping the test versions."""
+    monkeypatch.setattr("app.services.data_version.get_data_versions", lambda: versions)
+    return mock_db
+
+
+@pytest.fixture
+def db_routers():
+    return (workout, diet,)
+
+
+class TestDataVersions:
+    """Tests for version counters and ETag matching"""
+
+    def test_bump_changes_etag(self, versions):
+        """Should give a new ETag after each write"""
+        before = versions.etag("u1")
+        assert versions.etag("u1") == before
+        versions.bump("u1")
+        assert versions.etag("u1") != before
+
+    def test_lost_counter_never_reuses_version(self, versions, monkeypatch):
+        """Should restart above the old version after the counter is lost"""
+        for _ in range(3):
+            versions.bump("u1")
+        old = versions.current("u1")
+        now = time.time()
+        monkeypatch.setattr("app.services.data_version.time.time", lambda: now + 1)
+        restarted = DataVersions(MemoryState())
+        assert restarted.current("u1") > old
+
+    def test_versions_shared_between_workers(self, tmp_path):
+        """Should see a write made in another worker"""
+        path = str(tmp_path / "state.sqlite3")
+        first, second = DataVersions(SQLiteState(path)), DataVersions(SQLiteState(path))
+        etag = second.etag("u1")
+        first.bump("u1")
+        assert second.etag("u1") != etag
+
+    @pytest.mark.parametrize("header,expected", [
+        ('W/"a.1.20250101"', True),
+        ('"a.1.20250101"', True),
+        ('"x", W/"a.1.20250101"', True),
+        ("*", True),
+        ('W/"a.2.20250101"', False),
+    ])
+    def test_etag_matching(self, header, expected):
+        """Should compare weakly and accept lists and *"""
+        assert etag_matches(header, 'W/"a.1.20250101"') is expected
+
+    @pytest.fixture
+    def supabase_db(self, mock_db):
+        """Supabase service with a stubbed client in place of the mock store"""
+        mock_db.is_mock = False
+        mock_db.client = MagicMock()
+        return mock_db
+
+    async def test_supabase_version_read_from_database(self, supabase_db):
+        """Should take the version the database triggers keep"""
+        query = supabase_db.client.table.return_value.select.return_value.eq.return_value
+        query.execute.return_value.data = [{"version": 41}]
+
+        assert await supabase_db.get_data_version("u1") == 41
+        supabase_db.client.table.assert_called_with("data_versions")
+
+    async def test_supabase_writes_leave_shared_counter(self, supabase_db, versions):
+        """Should leave counting Supabase writes to the database triggers"""
+        supabase_db.client.table.return_value.insert.return_value.execute.return_value.data = [{"id": "w1"}]
+        before = versions.current("u1")
+
+        await supabase_db.create_workout_log(user_id="u1", title="Run", duration_minutes=30)
+
+        assert versions.current("u1") == before
+
+
+class TestConditionalGet:
+    """Tests for ETags on the workout and diet read endpoints"""
+
+    @pytest.mark.parametrize("path", [
+        "/api/workout/logs", "/api/workout/stats", "/api/diet/logs", "/api/diet/logs/today", "/api/diet/stats"
+    ])
+    def test_unchanged_data_returns_304_without_db(self, db_client, mock_db, auth_headers, path, monkeypatch):
+        """Should answer a matching If-None-Match with 304 and no database call"""
+        first = db_client.get(path, headers=auth_headers)
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+
+        for name in ("get_workout_logs", "get_workout_stats", "get_diet_logs", "get_diet_stats"):
+            monkeypatch.setattr(mock_db, name, AsyncMock(side_effect=AssertionError("database touched")))
+        response = db_client.get(path, headers={**auth_headers, "If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+
+    def test_write_invalidates_etag(self, db_client, auth_headers):
+        """Should return fresh data after the user logs a meal"""
+        etag = db_client.get("/api/diet/logs/today", headers=auth_headers).headers["etag"]
+        db_client.post("/api/diet/log", json={"meal_type": "Lunch", "meal_name": "Salad", "calories": 350},
+                    headers=auth_headers)
+
+        response = db_client.get("/api/diet/logs/today", headers={**auth_headers, "If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["data"]["totals"]["calories"] == 350
+
+    def test_other_users_writes_keep_etag(self, db_client, auth_headers):
+        """Should not invalidate a user's ETag when another user writes"""
+        etag = db_client.get("/api/workout/logs", headers=auth_headers).headers["etag"]
+        db_client.post("/api/workout/log", json={"title": "Run", "duration_minutes": 30},
+                    headers={"Authorization": "Bearer other-user"})
+
+        response = db_client.get("/api/workout/logs", headers={**auth_headers, "If-None-Match": etag})
+
+        assert response.status_code == 304
@@ -0,0 +1,120 @@
+"""
+Tests for streaming history export.
+Rows come from the mock Supabase store or a generated in-memory table.
+"""
+
+import csv
+import gzip
+import io
+import json
+import tracemalloc
+from datetime import date, timedelta
+
+import pytest
+
+from app.routers import export as export_router
+from app.services.export import export_csv, exercise_sets
+
+
+class GeneratedHistory:
+    """Database stand-in that builds each page on request, holding no rows"""
+
+    def __init__(self, workouts: int):
+        self.workouts = workouts
+        self.pages = 0
+
+    async def get_export_page(self, table, user_id, after=None, limit=500):
+        self.pages += 1
+        if table != "workout_logs":
+            return []
+        first = int(after[1]) + 1 if after else 0
+        return [
+            {"id": f"{i:08d}", "user_id": user_id, "workout_date": (date(2020, 1, 1) + timedelta(days=i // 3)).isoformat(),
+             "title": "Strength", "duration_minutes": 45,
+             "exercises": [{"name": "Squat", "sets": 3, "reps": "5"}, {"name": "Bench", "sets": 3, "reps": "5"}]}
+            for i in range(first, min(first + limit, self.workouts))
+        ]
+
+
+@pytest.fixture
+def mock_db(mock_db):
+    for i, day in enumerate(["2025-01-02", "2025-01-01", "2025-01-02"]):
+        mock_db._mock_data["workout_logs"].append({
+            "id": f"w{i}", "user_id": "test-user-123", "workout_date": day, "title": f"Workout {i}",
+            "duration_minutes": 30, "exercises": [{"name": "Row", "sets": 2, "reps": "12"}],
+            "created_at": f"{day}T08:00:00"
+        })
+    mock_db._mock_data["diet_logs"].append({
+        "id": "m1", "user_id": "test-user-123", "log_date": "2025-01-01", "meal_type": "Lunch",
+        "meal_name": "Salad, with feta", "calories": 420, "created_at": "2025-01-01T12:00:00"
+    })
+    mock_db._mock_data["workout_logs"].append({"id": "x", "user_id": "someone-else", "workout_date": "2025-01-01"})
+    return mock_db
+
+
+@pytest.fixture
+def db_routers():
+    return (export_router,)
+
+
+class TestExport:
+    """Tests for export formats, paging and memory use"""
+
+    def test_csv_flattens_sets_in_date_order(self, db_client, auth_headers, monkeypatch):
+        """Should write one row per set, oldest first, across keyset pages"""
+        monkeypatch.setattr(export_router.get_settings(), "export_page_size", 2)
+        response = db_client.get("/api/export?format=csv&tables=workouts,meals", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-disposition"].startswith("attachment;")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        workouts = [r for r in rows if r["table"] == "workouts"]
+        assert [(r["id"], r["set_number"]) for r in workouts] == [
+            ("w1", "1"), ("w1", "2"), ("w0", "1"), ("w0", "2"), ("w2", "1"), ("w2", "2")
+        ]
+        assert [r["meal_name"] for r in rows if r["table"] == "meals"] == ["Salad, with feta"]
+
+    def test_ndjson_keeps_nested_exercises(self, db_client, auth_headers):
+        """Should write one JSON object per row without the user ID"""
+        response = db_client.get("/api/export?format=ndjson&tables=workouts", headers=auth_headers)
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert len(lines) == 3
+        assert lines[0]["exercises"] == [{"name": "Row", "sets": 2, "reps": "12"}]
+        assert "user_id" not in lines[0]
+
+    def test_gzip_download(self, db_client, auth_headers):
+        """Should stream a gzip file when asked"""
+        with db_client.stream("GET", "/api/export?format=ndjson&tables=meals&gzip=true", headers=auth_headers) as response:
+            assert response.headers["content-type"] == "application/gzip"
+            body = b"".join(response.iter_raw())
+        assert json.loads(gzip.decompress(body))["meal_name"] == "Salad, with feta"
+
+    def test_invalid_parameters(self, db_client, auth_headers):
+        """Should reject unknown formats and tables"""
+        assert db_client.get("/api/export?format=xlsx", headers=auth_headers).status_code == 400
+        assert db_client.get("/api/export?tables=workouts,secrets", headers=auth_headers).status_code == 400
+
+    def test_exercise_sets_shapes(self):
+        """Should handle set counts, per-set lists and missing exercises"""
+        assert len(exercise_sets([{"name": "Squat", "sets": 3, "reps": "5"}])) == 3
+        assert exercise_sets([{"name": "Bench", "sets": [{"reps": 8, "weight": 60}]}])[0]["weight"] == 60
+        assert exercise_sets(None) == [{}]
+
+    async def test_memory_flat_with_history_size(self):
+        """Should use about the same peak memory for 2k and 20k workouts"""
+        async def peak(workouts):
+            db = GeneratedHistory(workouts)
+            tracemalloc.start()
+            size = 0
+            async for chunk in export_csv(db, "u1", ["workouts"], page_size=500):
+                size += len(chunk)
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return peak_bytes, size
+
+        small_peak, small_size = await peak(2000)
+        large_peak, large_size = await peak(20000)
+
+        assert large_size > 9 * small_size
+        assert large_peak < small_peak * 1.5
@@ -2,9 +2,12 @@
 Tests for health endpoints.
 """
 
+import sys
+
 import pytest
 from fastapi.testclient import TestClient
 
+from app.config import get_settings
 from app.main import app
 
 
@@ -36,3 +39,86 @@ class TestHealthEndpoints:
         assert data["version"] == "1.0.0"
         assert data["status"] == "running"
         assert "docs" in data
+
+
+class TestMetricsEndpoint:
+    """Tests for GET /metrics."""
+
+    def test_metrics_prometheus_format(self, client):
+        """Should report request counts and latency per route template."""
+        client.get("/ping")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert "# TYPE fitbridge_http_request_seconds histogram" in body
+        assert 'fitbridge_http_requests_total{method="GET",route="/ping",status="200"}' in body
+        assert 'fitbridge_http_request_seconds_bucket{method="GET",route="/ping",le="+Inf"}' in body
+
+    def test_metrics_token_required_when_set(self, client, monkeypatch):
+        """Should only serve metrics to scrapers sending the metrics token."""
+        monkeypatch.setattr(get_settings(), "metrics_token", "scrape-secret")
+
+        missing = client.get("/metrics")
+        wrong = client.get("/metrics", headers={"Authorization": "Bearer nope"})
+        valid = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+
+        assert missing.status_code == 401
+        assert wrong.status_code == 401
+        assert valid.status_code == 200
+
+    def test_metrics_db_calls(self, client, auth_headers):
+        """Should time SupabaseService calls per method."""
+        client.get("/api/workout/logs", headers=auth_headers)
+
+        body = client.get("/metrics").text
+
+        assert 'fitbridge_db_call_seconds_count{method="get_workout_logs"}' in body
+        assert 'route="/api/workout/logs"' in body
+
+
+class TestServerTiming:
+    """Tests for the Server-Timing header and on-demand profiling."""
+
+    def test_server_timing_lists_db_spans(self, client, auth_headers):
+        """Should report each SupabaseService call made by the request."""
+        response = client.post(
+            "/api/diet/log",
+            json={"meal_type": "Lunch", "meal_name": "Salad", "calories": 400},
+            headers=auth_headers
+        )
+
+        timing = response.headers["server-timing"]
+        assert "db.create_diet_log;dur=" in timing
+        assert "db.update_daily_log;dur=" in timing
+        assert "total;dur=" in timing
+
+    def test_profile_requires_admin_key(self, client):
+        """Should not profile without the admin key."""
+        response = client.get("/ping", headers={"X-Profile": "1"})
+
+        assert response.headers["x-profile-error"] == "admin key required"
+        assert "x-profile-report" not in response.headers
+
+    def test_profile_writes_report(self, client, monkeypatch, tmp_path):
+        """Should store a profile report for an authorized request."""
+        settings = get_settings()
+        monkeypatch.setattr(settings, "admin_api_key", "secret")
+        monkeypatch.setattr(settings, "profile_dir", str(tmp_path))
+
+        response = client.get("/ping", headers={"X-Profile": "1", "X-Admin-Key": "secret"})
+
+        report = tmp_path / response.headers["x-profile-report"]
+        assert report.exists()
+
+    def test_profile_without_pyinstrument_rejected(self, client, monkeypatch):
+        """Should answer 400 instead of running unprofiled when pyinstrument is missing."""
+        monkeypatch.setattr(get_settings(), "admin_api_key", "secret")
+        monkeypatch.setitem(sys.modules, "pyinstrument", None)
+
+        response = client.get("/ping", headers={"X-Profile": "1", "X-Admin-Key": "secret"})
+
+        assert response.status_code == 400
+        assert "pyinstrument" in response.json()["detail"]
@@ -0,0 +1,217 @@
+"""
+Tests for streaming Apple Health and CSV imports.
+Imports write to the mock Supabase store.
+"""
+
+import gzip
+import tracemalloc
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.routers import export as export_router, imports as imports_router
+from app.services.health_import import AppleHealthParser, CsvHistoryParser, HealthImporter, ImportProgress
+from app.services.shared_state import MemoryState
+
+
+APPLE_EXPORT = b"""<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE HealthData [
+<!ELEMENT HealthData (ExportDate,Me,(Record|Workout)*)>
+<!ATTLIST HealthData locale CDATA #REQUIRED>
+]>
+<HealthData locale="en_US">
+ <ExportDate value="2025-01-05 20:00:00 +0100"/>
+ <Me HKCharacteristicTypeIdentifierBiologicalSex="HKBiologicalSexMale"/>
+ <Record type="HKQuantityTypeIdentifierStepCount" sourceName="iPhone" unit="count" startDate="2025-01-02 08:00:00 +0100" endDate="2025-01-02 08:10:00 +0100" value="4000"/>
+ <Record type="HKQuantityTypeIdentifierStepCount" sourceName="iPhone" unit="count" startDate="2025-01-02 18:00:00 +0100" endDate="2025-01-02 18:10:00 +0100" value="2000"/>
+ <Record type="HKQuantityTypeIdentifierStepCount" sourceName="Watch" unit="count" startDate="2025-01-02 08:00:00 +0100" endDate="2025-01-02 08:10:00 +0100" value="6500"/>
+ <Record type="HKQuantityTypeIdentifierActiveEnergyBurned" sourceName="Watch" unit="kJ" startDate="2025-01-02 08:00:00 +0100" endDate="2025-01-02 08:10:00 +0100" value="418.4"/>
+ <Record type="HKQuantityTypeIdentifierBodyMass" sourceName="Scale" unit="lb" startDate="2025-01-03 07:00:00 +0100" endDate="2025-01-03 07:00:00 +0100" value="180"/>
+ <Record type="HKQuantityTypeIdentifierHeartRate" sourceName="Watch" unit="count/min" startDate="2025-01-03 07:00:00 +0100" endDate="2025-01-03 07:00:00 +0100" value="61"/>
+ <Workout workoutActivityType="HKWorkoutActivityTypeTraditionalStrengthTraining" duration="45.4" durationUnit="min" sourceName="Watch" startDate="2025-01-04 18:00:00 +0100" endDate="2025-01-04 18:45:00 +0100">
+  <WorkoutEvent type="HKWorkoutEventTypePause" date="2025-01-04 18:20:00 +0100"/>
+  <WorkoutStatistics type="HKQuantityTypeIdentifierActiveEnergyBurned" startDate="2025-01-04 18:00:00 +0100" endDate="2025-01-04 18:45:00 +0100" sum="310" unit="kcal"/>
+ </Workout>
+</HealthData>
+"""
+
+
+@pytest.fixture
+def db_routers():
+    return (imports_router, export_router,)
+
+
+def parse_in_chunks(parser, data: bytes, size: int = 7):
+    records = []
+    for i in range(0, len(data), size):
+        records.extend(parser.feed(data[i:i + size]))
+    records.extend(parser.close())
+    return records
+
+
+class TestParsers:
+    """Tests for incremental parsing and mapping"""
+
+    def test_apple_health_records(self):
+        """Should map workouts, steps, energy and body mass from tiny chunks"""
+        records = parse_in_chunks(AppleHealthParser(), APPLE_EXPORT)
+        kinds = [kind for kind, _ in records]
+        assert kinds.count("daily") == 4 and kinds.count("skipped") == 1
+
+        weight = next(row for kind, row in records if kind == "weight")
+        assert weight == {"weight": 81.65, "recorded_at": "2025-01-03T06:00:00+00:00"}
+        workout = next(row for kind, row in records if kind == "workout")
+        assert (workout["title"], workout["duration_minutes"], workout["calories_burned"]) == \
+            ("Traditional Strength Training", 45, 310)
+
+    def test_csv_regroups_workout_sets(self):
+        """Should rebuild one workout with set counts from per-set rows"""
+        data = (
+            "table,id,workout_date,title,duration_minutes,notes,exercise,set_number,reps,log_date,steps\n"
+            'workouts,w1,2025-01-01,Legs,40,"Heavy,\nfelt good",Squat,1,5,,\n'
+            "workouts,w1,2025-01-01,Legs,40,,Squat,2,5,,\n"
+            "workouts,w1,2025-01-01,Legs,40,,Lunge,1,10,,\n"
+            "daily,d1,,,,,,,,2025-01-01,9000\n"
+        ).encode()
+        records = parse_in_chunks(CsvHistoryParser(), data, size=5)
+
+        workout = records[0][1]
+        assert workout["notes"] == "Heavy,\nfelt good"
+        assert workout["exercises"] == [{"name": "Squat", "sets": 2, "reps": "5"}, {"name": "Lunge", "sets": 1, "reps": "10"}]
+        assert records[1] == ("daily", {"log_date": "2025-01-01", "source": "csv", "steps": 9000, "calories_burned": 0.0})
+
+
+class TestDuplicateKeys:
+    """Tests for reading existing workouts to skip duplicates"""
+
+    async def test_reads_every_page(self, mock_db, monkeypatch):
+        """Should page through ranges longer than one response"""
+        monkeypatch.setattr("app.services.supabase_service.READ_PAGE_SIZE", 2)
+        rows = [{"workout_date": f"2025-01-0{i}", "title": "Run", "duration_minutes": 30} for i in range(1, 6)]
+        mock_db.is_mock = False
+        mock_db.client = MagicMock()
+        query = mock_db.client.table.return_value.select.return_value.eq.return_value.gte.return_value.lte.return_value
+        query.order.return_value.order.return_value.range.side_effect = \
+            lambda lo, hi: SimpleNamespace(execute=lambda: SimpleNamespace(data=rows[lo:hi + 1]))
+
+        assert await mock_db.get_workout_keys_between("u1", "2025-01-01", "2025-01-31") == rows
+
+
+class TestImportEndpoint:
+    """Tests for imports through the API"""
+
+    def test_apple_health_import_is_idempotent(self, db_client, mock_db, auth_headers):
+        """Should insert once and skip duplicates on a second import"""
+        first = db_client.post("/api/import?source=apple_health", content=gzip.compress(APPLE_EXPORT),
+                            headers={**auth_headers, "Content-Encoding": "gzip"}).json()["data"]
+        second = db_client.post("/api/import?source=apple_health", content=APPLE_EXPORT, headers=auth_headers).json()["data"]
+
+        assert first["inserted"] == {"workouts": 1, "daily": 1, "weight": 1}
+        assert second["inserted"] == {"workouts": 0, "daily": 0, "weight": 0}
+        assert second["duplicates"] == {"workouts": 1, "weight": 1}
+        daily = next(iter(mock_db._mock_data["daily_logs"].values()))
+        # Watch steps count once instead of adding the phone's
+        assert (daily["steps"], daily["calories_burned"]) == (6500, 100)
+
+    def test_dedupes_against_postgres_timestamps(self, db_client, mock_db, auth_headers, monkeypatch):
+        """Should compare with stored readings whose fractions Postgres trimmed"""
+        monkeypatch.setattr(mock_db, "get_weight_history", AsyncMock(return_value=[
+            {"recorded_at": "2025-01-03T05:59:59.12345+00:00"},
+            {"recorded_at": "2025-01-03T06:00:00Z"},
+        ]))
+
+        response = db_client.post("/api/import?source=apple_health", content=APPLE_EXPORT, headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.json()["data"]["duplicates"]["weight"] == 1
+
+    def test_progress_polling(self, db_client, auth_headers):
+        """Should report progress under the caller's import ID"""
+        db_client.post("/api/import?source=apple_health&import_id=upload-1", content=APPLE_EXPORT, headers=auth_headers)
+
+        data = db_client.get("/api/import/upload-1", headers=auth_headers).json()["data"]
+
+        assert data["status"] == "done"
+        assert data["bytes_read"] == data["total_bytes"] == len(APPLE_EXPORT)
+        assert db_client.get("/api/import/upload-1", headers={"Authorization": "Bearer other"}).status_code == 404
+
+    def test_csv_export_round_trip(self, db_client, mock_db, auth_headers):
+        """Should import a CSV export into another account without losing sets"""
+        db_client.post("/api/import?source=apple_health", content=APPLE_EXPORT, headers=auth_headers)
+        exported = db_client.get("/api/export?format=csv&tables=workouts,daily,weight", headers=auth_headers).content
+
+        other = {"Authorization": "Bearer other-user"}
+        data = db_client.post("/api/import?source=csv", content=exported, headers=other).json()["data"]
+
+        assert data["inserted"] == {"workouts": 1, "daily": 1, "weight": 1}
+
+    def test_invalid_file(self, db_client, auth_headers):
+        """Should return 400 for malformed XML"""
+        response = db_client.post("/api/import?source=apple_health", content=b"<HealthData><Record", headers=auth_headers)
+        assert response.status_code == 400
+
+
+class CountingDB:
+    """Database stand-in that only counts what it is asked to write"""
+
+    def __init__(self):
+        self.inserted = 0
+
+    async def get_workout_keys_between(self, *args):
+        return []
+
+    async def insert_workout_logs(self, user_id, logs):
+        self.inserted += len(logs)
+        return len(logs)
+
+    async def get_daily_logs_between(self, *args):
+        return []
+
+    async def upsert_daily_logs(self, user_id, logs):
+        return len(logs)
+
+    async def get_weight_history(self, *args):
+        return []
+
+    async def insert_weight_entries(self, user_id, entries):
+        return len(entries)
+
+    async def get_user_streaks(self, user_id):
+        return []
+
+    async def save_streaks(self, user_id, rows):
+        return rows
+
+
+async def test_memory_flat_with_export_size():
+    """Should use about the same peak memory for 1k and 8k workouts"""
+    async def peak(workouts):
+        db = CountingDB()
+        parser = AppleHealthParser()
+        importer = HealthImporter(db, "u1", ImportProgress(MemoryState(), "u1", "apple_health", None), batch_size=500)
+        workout = (
+            '<Workout workoutActivityType="HKWorkoutActivityTypeRunning" duration="30" durationUnit="min" '
+            'sourceName="Watch" startDate="2024-{m:02d}-{d:02d} 07:{i:02d}:00 +0000" '
+            'endDate="2024-{m:02d}-{d:02d} 07:59:00 +0000" totalEnergyBurned="{i}" totalEnergyBurnedUnit="kcal"/>'
+        )
+        tracemalloc.start()
+        for kind, row in parser.feed(b'<HealthData locale="en_US">'):
+            await importer.add(kind, row)
+        for n in range(workouts):
+            chunk = workout.format(m=n % 12 + 1, d=n % 28 + 1, i=n % 60).encode()
+            for kind, row in parser.feed(chunk):
+                await importer.add(kind, row)
+        for kind, row in parser.feed(b"</HealthData>"):
+            await importer.add(kind, row)
+        await importer.finish()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak_bytes, db.inserted
+
+    small_peak, _ = await peak(1000)
+    large_peak, large_inserted = await peak(8000)
+
+    # Workouts repeat every 12 * 28 * 60 combinations at most, so duplicates are skipped
+    assert large_inserted > 0
+    assert large_peak < small_peak * 1.5
@@ -0,0 +1,155 @@
+"""
+Tests for state shared by uvicorn worker processes.
+Each worker is simulated by its own job queue, log index or process
+pointed at the same SQLite file.
+"""
+
+import asyncio
+import multiprocessing
+import time
+
+import pytest
+
+from app.services.job_queue import JobQueue
+from app.services.log_retrieval import LogRetrievalIndex
+from app.services.metrics import MetricsRegistry
+from app.services.shared_state import MemoryState, SQLiteState
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def state(request, tmp_path):
+    """Each backend behind the same interface."""
+    if request.param == "memory":
+        return MemoryState()
+    return SQLiteState(str(tmp_path / "state.sqlite3"))
+
+
+def increment_many(path, times):
+    state = SQLiteState(path)
+    for _ in range(times):
+        state.incr("counter")
+
+
+class TestSharedState:
+    """Tests for the key-value backends"""
+
+    def test_set_get_delete(self, state):
+        """Should round-trip JSON values and forget deleted keys"""
+        state.set("job:1", {"status": "queued", "result": None})
+        assert state.get("job:1") == {"status": "queued", "result": None}
+        state.delete("job:1")
+        assert state.get("job:1") is None
+
+    def test_expired_entries_disappear(self, state):
+        """Should not return entries past their TTL, and let add reclaim them"""
+        state.set("short", 1, ttl_seconds=0.05)
+        time.sleep(0.1)
+        assert state.get("short") is None
+        assert state.add("short", 2)
+        assert state.get("short") == 2
+
+    def test_add_only_when_missing(self, state):
+        """Should refuse to overwrite a live key"""
+        assert state.add("lock", "a", ttl_seconds=60)
+        assert not state.add("lock", "b", ttl_seconds=60)
+        assert state.get("lock") == "a"
+
+    def test_incr_and_scan(self, state):
+        """Should count from zero and list keys by prefix"""
+        assert state.incr("log_version:u1") == 1
+        assert state.incr("log_version:u1", 2) == 3
+        state.set("metrics:1", {"a": 1})
+        assert state.scan("log_version:") == {"log_version:u1": 3}
+
+    def test_incr_is_atomic_across_processes(self, tmp_path):
+        """Should not lose increments made concurrently by several processes"""
+        path = str(tmp_path / "state.sqlite3")
+        processes = [multiprocessing.Process(target=increment_many, args=(path, 200)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        assert SQLiteState(path).get("counter") == 800
+
+
+class TestAcrossWorkers:
+    """Tests for services sharing one SQLite state"""
+
+    @pytest.fixture
+    def path(self, tmp_path):
+        return str(tmp_path / "state.sqlite3")
+
+    async def test_job_visible_and_deduplicated_across_queues(self, path):
+        """Should serve a job queued on one worker from another, and reuse it for the same key"""
+        first = JobQueue(workers=1, state=SQLiteState(path))
+        second = JobQueue(workers=1, state=SQLiteState(path))
+        release = asyncio.Event()
+
+        async def generate():
+            await release.wait()
+            return {"plan": "ok"}
+
+        job = first.submit(generate, key="user-1:abc")
+        assert second.submit(generate, key="user-1:abc")["id"] == job["id"]
+
+        release.set()
+        for _ in range(50):
+            if second.get(job["id"])["status"] == "succeeded":
+                break
+            await asyncio.sleep(0.01)
+        assert second.get(job["id"])["result"] == {"plan": "ok"}
+        await first.stop()
+        await second.stop()
+
+    async def test_job_of_exited_worker_fails(self, path):
+        """Should fail a running job whose worker process is gone"""
+        state = SQLiteState(path)
+        process = multiprocessing.Process(target=time.sleep, args=(0,))
+        process.start()
+        process.join()
+        state.set("job:lost", {
+            "id": "lost", "status": "running", "result": None, "error": None,
+            "key": None, "pid": process.pid, "created_at": time.time(), "finished_at": None
+        })
+
+        job = JobQueue(state=state).get("lost")
+
+        assert job["status"] == "failed"
+        assert "exited" in job["error"]
+
+    async def test_log_written_on_other_worker_invalidates_index(self, path):
+        """Should reload a user after another worker records a new log"""
+        class EmptyDb:
+            async def get_workout_logs_since(self, user_id, start_date):
+                return []
+
+            async def get_diet_logs_since(self, user_id, start_date):
+                return []
+
+            async def get_daily_logs(self, user_id, days):
+                return []
+
+        reader = LogRetrievalIndex(state=SQLiteState(path))
+        writer = LogRetrievalIndex(state=SQLiteState(path))
+        await reader.load_user(EmptyDb(), "u1")
+        await writer.load_user(EmptyDb(), "u1")
+
+        writer.add_log("u1", "workout", {"id": "w1", "title": "Leg Day", "workout_date": "2026-01-05"})
+
+        assert writer.is_loaded("u1")
+        assert not reader.is_loaded("u1")
+
+    def test_metrics_summed_with_other_workers(self):
+        """Should add other workers' snapshots to this worker's series"""
+        registry = MetricsRegistry()
+        requests = registry.counter("requests_total", "Requests", ("route",))
+        latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+        requests.inc("/health")
+        latency.observe(0.05)
+        other = registry.snapshot()
+
+        text = registry.render([other, other])
+
+        assert 'requests_total{route="/health"} 3' in text
+        assert 'latency_seconds_bucket{le="0.1"} 3' in text
+        assert "latency_seconds_count 3" in text
@@ -0,0 +1,51 @@
+"""
+Tests for cold start cost.
+Each check runs in a fresh interpreter so earlier imports do not hide regressions.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+
+# Heavy SDKs that must load lazily, not when the app is imported
+LAZY_MODULES = ["numpy", "openai", "supabase", "pyinstrument", "jose"]
+
+# Seconds to import app.main on top of FastAPI itself; override on slow machines
+IMPORT_BUDGET_SECONDS = float(os.environ.get("IMPORT_BUDGET_SECONDS", "0.5"))
+
+PROBE = """
+import json, sys, time
+import fastapi
+started = time.perf_counter()
+import app.main
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "loaded": [m for m in %r if m in sys.modules]
+}))
+""" % (LAZY_MODULES,)
+
+
+def probe() -> dict:
+    """Import the app in a new interpreter and report time and loaded SDKs."""
+    env = {**os.environ, "SUPABASE_URL": "", "SUPABASE_ANON_KEY": "", "SUPABASE_SERVICE_ROLE_KEY": ""}
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=backend_dir, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+class TestColdStart:
+    """Tests for import-time budget and lazy SDK loading."""
+
+    def test_heavy_sdks_load_lazily(self):
+        """Should not import AI, database or numeric SDKs at startup."""
+        assert probe()["loaded"] == []
+
+    def test_import_time_within_budget(self):
+        """Should import the app within the startup budget (best of three)."""
+        seconds = min(probe()["seconds"] for _ in range(3))
+
+        assert seconds < IMPORT_BUDGET_SECONDS, f"app import took {seconds:.3f}s"
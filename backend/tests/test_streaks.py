@@ -0,0 +1,161 @@
+"""
+Tests for the activity bitmap streak engine and streak endpoints.
+Endpoints run against the mock Supabase store.
+"""
+
+import base64
+import random
+from datetime import date, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.routers import streaks as streaks_router, workout
+from app.services.streaks import ActivityStreak, BITMAP_DAYS
+from app.services.supabase_service import SupabaseService
+
+
+TODAY = date.today()
+
+
+def days_ago(n: int) -> date:
+    return TODAY - timedelta(days=n)
+
+
+@pytest.fixture
+def db_routers():
+    return (workout, streaks_router)
+
+
+class TestActivityStreak:
+    """Tests for incremental and bulk streak computation"""
+
+    def test_consecutive_days_extend_streak(self):
+        """Should count consecutive days and ignore repeats"""
+        streak = ActivityStreak("workout")
+        for n in (2, 1, 1, 0):
+            streak.mark(days_ago(n))
+        assert (streak.current, streak.longest, streak.xp) == (3, 3, 30)
+
+    def test_gap_restarts_streak(self):
+        """Should start over after a missed day and keep the longest"""
+        streak = ActivityStreak("workout")
+        for n in (10, 9, 8, 5, 4):
+            streak.mark(days_ago(n))
+        assert (streak.current, streak.longest) == (2, 3)
+
+    def test_streak_broken_without_activity(self):
+        """Should report 0 once a whole day passes without activity"""
+        streak = ActivityStreak("diet")
+        streak.mark(days_ago(1))
+        assert streak.current_as_of(TODAY) == 1
+        assert streak.current_as_of(TODAY + timedelta(days=1)) == 0
+
+    def test_backfilled_day_joins_runs(self):
+        """Should merge the runs on both sides of a filled-in day"""
+        streak = ActivityStreak("workout")
+        for n in (6, 5, 3, 2, 1):
+            streak.mark(days_ago(n))
+        streak.mark(days_ago(4))
+        assert (streak.current, streak.longest) == (6, 6)
+
+    def test_incremental_matches_bulk(self):
+        """Should agree with an exact recompute for random, out-of-order days"""
+        rng = random.Random(7)
+        days = [days_ago(rng.randrange(120)) for _ in range(80)]
+        incremental = ActivityStreak("workout")
+        for day in days:
+            incremental.mark(day)
+        bulk = ActivityStreak.from_dates("workout", days)
+        assert (incremental.current, incremental.longest, incremental.bits, incremental.start) == \
+            (bulk.current, bulk.longest, bulk.bits, bulk.start)
+
+    def test_row_round_trip_and_size(self):
+        """Should store a long history in a bounded, small bitmap"""
+        streak = ActivityStreak.from_dates("workout", [days_ago(n) for n in range(0, 1000, 2)])
+        row = streak.to_row()
+        assert len(base64.b64decode(row["activity_bits"])) <= BITMAP_DAYS // 8
+        loaded = ActivityStreak.from_row(row)
+        assert (loaded.bits, loaded.start, loaded.last, loaded.longest) == (streak.bits, streak.start, streak.last, 1)
+
+    def test_heatmap_bits(self):
+        """Should set the bits of active days within the window"""
+        streak = ActivityStreak.from_dates("workout", [days_ago(0), days_ago(2), days_ago(400)])
+        heatmap = int.from_bytes(streak.heatmap(TODAY, 7), "little")
+        assert heatmap == 0b1010000
+
+
+class TestStreakEndpoints:
+    """Tests for streak updates from logs and the streak endpoints"""
+
+    def log_workout(self, db_client, headers, day: date):
+        payload = {"title": "Run", "duration_minutes": 30, "workout_date": day.isoformat()}
+        assert db_client.post("/api/workout/log", json=payload, headers=headers).status_code == 200
+
+    def test_logging_updates_streak(self, db_client, auth_headers):
+        """Should count logged days once each"""
+        for n in (1, 0, 0):
+            self.log_workout(db_client, auth_headers, days_ago(n))
+
+        data = db_client.get("/api/streaks", headers=auth_headers).json()["data"]
+
+        workout_streak = next(s for s in data if s["streak_type"] == "workout")
+        assert (workout_streak["current_streak"], workout_streak["xp_earned"]) == (2, 20)
+        assert {s["streak_type"] for s in data} == {"workout", "diet", "login", "steps"}
+
+    def test_timestamp_workout_date_counts_its_day(self, db_client, auth_headers):
+        """Should take the day of a timestamp workout_date"""
+        payload = {"title": "Run", "duration_minutes": 30, "workout_date": f"{TODAY.isoformat()}T07:30:00"}
+        assert db_client.post("/api/workout/log", json=payload, headers=auth_headers).status_code == 200
+
+        data = db_client.get("/api/streaks", headers=auth_headers).json()["data"]
+
+        assert next(s for s in data if s["streak_type"] == "workout")["current_streak"] == 1
+
+    def test_streak_failure_keeps_log(self, db_client, auth_headers, monkeypatch):
+        """Should save the workout even when the streak update fails"""
+        monkeypatch.setattr(SupabaseService, "update_streak", AsyncMock(side_effect=RuntimeError("down")))
+
+        self.log_workout(db_client, auth_headers, TODAY)
+
+        assert len(db_client.get("/api/workout/logs", headers=auth_headers).json()["data"]) == 1
+
+    def test_record_activity(self, db_client, auth_headers):
+        """Should record client-side logs into the same bitmap as API logs"""
+        self.log_workout(db_client, auth_headers, days_ago(1))
+        response = db_client.post("/api/streaks/activity", json={"streak_type": "workout"}, headers=auth_headers)
+        db_client.post("/api/streaks/activity", json={"streak_type": "workout"}, headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.json()["data"]["current_streak"] == 2
+        assert "activity_bits" not in response.json()["data"]
+        bits = base64.b64decode(db_client.get("/api/streaks/heatmap?days=2", headers=auth_headers).json()["data"]["bitmaps"]["workout"])
+        assert int.from_bytes(bits, "little") == 0b11
+
+    @pytest.mark.parametrize("payload", [
+        {"streak_type": "sleep"},
+        {"streak_type": "diet", "activity_date": "yesterday"},
+    ])
+    def test_record_activity_rejects_bad_input(self, db_client, auth_headers, payload):
+        """Should return 400 for unknown streak types and dates"""
+        assert db_client.post("/api/streaks/activity", json=payload, headers=auth_headers).status_code == 400
+
+    def test_heatmap(self, db_client, auth_headers):
+        """Should return a year of days per streak type in under 50 bytes each"""
+        self.log_workout(db_client, auth_headers, days_ago(3))
+
+        data = db_client.get("/api/streaks/heatmap", headers=auth_headers).json()["data"]
+
+        bits = base64.b64decode(data["bitmaps"]["workout"])
+        assert data["days"] == 365 and len(bits) == 46
+        assert int.from_bytes(bits, "little") == 1 << 361
+
+    def test_rebuild_from_logs(self, db_client, auth_headers):
+        """Should recompute streaks exactly from the log history"""
+        for n in (9, 8, 7, 1, 0):
+            self.log_workout(db_client, auth_headers, days_ago(n))
+
+        data = db_client.post("/api/streaks/rebuild", headers=auth_headers).json()["data"]
+
+        workout_streak = next(s for s in data if s["streak_type"] == "workout")
+        assert (workout_streak["current_streak"], workout_streak["longest_streak"]) == (2, 3)
@@ -0,0 +1,175 @@
+"""
+Tests for per-user AI token quotas.
+Usage is stored in the mock Supabase store; AI calls use the simulated provider.
+"""
+
+import time
+
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.main import app
+from app.routers import chat as chat_router
+from app.services.ai_service import AIService
+from app.services.token_quota import QuotaExceededError, TokenQuota, get_token_quota, record_token_usage
+
+
+def make_settings(**overrides) -> Settings:
+    values = {"supabase_url": "", "supabase_anon_key": "", "supabase_service_role_key": ""}
+    values.update(overrides)
+    return Settings(**values)
+
+
+USER = "6f1c2d3e-4b5a-4c7d-8e9f-0a1b2c3d4e5f"
+OTHER_USER = "0c9b8a7d-6e5f-4a3b-9c2d-1e0f9a8b7c6d"
+
+
+class ForeignKeyError(Exception):
+    """Database error as the Supabase client raises it for an unknown user"""
+    code = "23503"
+
+
+@pytest.fixture
+def test_user_id() -> str:
+    """Token usage is only kept for UUID user IDs."""
+    return USER
+
+
+@pytest.fixture
+def quota():
+    return TokenQuota({"chat": 1000, "plan": 0, "progress": 500})
+
+
+def hours_ago(hours: int) -> int:
+    return int(time.time()) // 3600 - hours
+
+
+class TestTokenQuota:
+    """Tests for accounting, windows and flushing"""
+
+    async def test_under_quota_passes(self, quota, mock_db):
+        """Should allow requests while usage is below the quota"""
+        quota.add(USER, "chat", 400, 500)
+        await quota.check(USER, "chat", mock_db)
+
+    async def test_over_quota_raises_with_retry_after(self, quota, mock_db):
+        """Should reject once the quota is used and say when it frees up"""
+        quota._pending[USER] = {("chat", hours_ago(5)): [300, 300], ("chat", hours_ago(1)): [200, 300]}
+        with pytest.raises(QuotaExceededError) as exc_info:
+            await quota.check(USER, "chat", mock_db)
+        # Dropping the bucket from five hours ago is enough
+        assert exc_info.value.used == 1100
+        assert 18 * 3600 < exc_info.value.retry_after <= 19 * 3600
+
+    async def test_usage_outside_window_ignored(self, quota, mock_db):
+        """Should only count the last 24 hours"""
+        quota._pending[USER] = {("chat", hours_ago(24)): [5000, 5000]}
+        await quota.check(USER, "chat", mock_db)
+
+    async def test_unlimited_and_anonymous_skip_checks(self, quota, mock_db):
+        """Should not limit endpoints with quota 0 or anonymous requests"""
+        quota.add(USER, "plan", 10 ** 6, 10 ** 6)
+        await quota.check(USER, "plan", mock_db)
+        await quota.check(None, "chat", mock_db)
+
+    async def test_flushed_usage_survives_restart(self, quota, mock_db):
+        """Should write usage to the database and count it after a reload"""
+        quota.add(USER, "progress", 300, 250)
+        assert await quota.flush(mock_db) == 1
+        assert await quota.flush(mock_db) == 0
+
+        restarted = TokenQuota({"chat": 1000, "plan": 0, "progress": 500})
+        with pytest.raises(QuotaExceededError):
+            await restarted.check(USER, "progress", mock_db)
+
+    async def test_failed_flush_keeps_usage(self, quota):
+        """Should keep pending usage when the database write fails"""
+        db = MagicMock()
+        db.record_token_usage = AsyncMock(side_effect=RuntimeError("db down"))
+        quota.add(USER, "chat", 10, 20)
+        with pytest.raises(RuntimeError):
+            await quota.flush(db)
+        assert quota.usage(USER)["chat"]["used"] == 30
+
+    async def test_non_uuid_users_not_recorded(self, quota, mock_db):
+        """Should treat IDs the database can't store like anonymous users"""
+        quota.add("not-a-uuid", "chat", 5000, 5000)
+        with quota.track("not-a-uuid", "chat"):
+            record_token_usage(10, 10)
+        await quota.check("not-a-uuid", "chat", mock_db)
+
+        assert quota._pending == {}
+
+    async def test_rejected_user_does_not_block_others(self, quota):
+        """Should save other users' usage and drop rows the database rejects"""
+        async def record(rows):
+            if any(row["user_id"] == OTHER_USER for row in rows):
+                raise ForeignKeyError("violates foreign key constraint")
+        db = MagicMock()
+        db.record_token_usage = AsyncMock(side_effect=record)
+        quota.add(USER, "chat", 10, 20)
+        quota.add(OTHER_USER, "chat", 10, 20)
+
+        assert await quota.flush(db) == 1
+        assert quota._pending == {}
+
+    def test_pending_usage_is_capped(self):
+        """Should keep pending usage for at most max_users users"""
+        quota = TokenQuota({"chat": 1000}, max_users=2)
+        for user_id in (USER, OTHER_USER, "1d2c3b4a-5e6f-4789-a0b1-c2d3e4f5a6b7"):
+            quota.add(user_id, "chat", 1, 1)
+
+        assert list(quota._pending) == [OTHER_USER, "1d2c3b4a-5e6f-4789-a0b1-c2d3e4f5a6b7"]
+
+    async def test_provider_usage_billed_to_tracked_user(self, quota):
+        """Should count the tokens the provider reports for calls inside track()"""
+        service = AIService(make_settings(
+            ai_provider="simulated", sim_ttft_seconds=0.0, sim_tokens_per_second=100000, sim_seed=1
+        ))
+        with quota.track(USER, "chat"):
+            await service.chat("How should I warm up?")
+            async for _ in service.chat_stream("And cool down?"):
+                pass
+        await service.chat("Untracked question")
+
+        assert quota.usage(USER)["chat"]["used"] > 0
+        assert set(quota._pending) == {USER}
+
+
+class TestQuotaEndpoints:
+    """Tests for 429 responses before provider calls"""
+
+    @pytest.fixture
+    def client(self, quota, mock_db):
+        ai_service = MagicMock()
+        ai_service.chat = AsyncMock(return_value="Live answer")
+        app.dependency_overrides[chat_router.get_ai_service] = lambda: ai_service
+        app.dependency_overrides[chat_router.get_supabase_service] = lambda: mock_db
+        app.dependency_overrides[get_token_quota] = lambda: quota
+        with TestClient(app) as test_client:
+            yield test_client, ai_service
+        app.dependency_overrides.clear()
+
+    def test_over_quota_chat_gets_429(self, client, quota, auth_headers, test_user_id):
+        """Should return 429 with Retry-After and never call the AI"""
+        test_client, ai_service = client
+        quota.add(test_user_id, "chat", 600, 600)
+
+        response = test_client.post("/api/chat/send", json={"message": "Plan my week"}, headers=auth_headers)
+
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) > 0
+        assert response.json()["endpoint"] == "chat"
+        ai_service.chat.assert_not_called()
+
+    def test_usage_endpoint(self, client, quota, auth_headers, test_user_id):
+        """Should report tokens used and quotas per endpoint"""
+        test_client, _ = client
+        quota.add(test_user_id, "chat", 100, 50)
+
+        response = test_client.get("/api/ai/usage", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.json()["data"]["chat"] == {"used": 150, "quota": 1000}
@@ -0,0 +1,123 @@
+"""
+Tests for weight logging and the downsampled weight history
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.routers import weight as weight_router
+from app.services.weight_series import build_weight_series, lttb, moving_average
+
+
+def make_entries(days: int, start: datetime = datetime(2022, 1, 1, 7, tzinfo=timezone.utc)):
+    """One reading a day, drifting down with a weekly wobble"""
+    return [
+        {"id": str(i), "recorded_at": (start + timedelta(days=i)).isoformat(),
+         "weight": round(90 - i * 0.01 + (1.5 if i % 7 == 0 else 0), 2)}
+        for i in range(days)
+    ]
+
+
+@pytest.fixture
+def db_routers():
+    return (weight_router,)
+
+
+class TestWeightSeries:
+    """Tests for LTTB downsampling and moving averages"""
+
+    def test_lttb_keeps_ends_and_spikes(self):
+        """Should keep the first, last and outlying points"""
+        x = np.arange(1000, dtype=float)
+        y = np.zeros(1000)
+        y[[250, 700]] = [5, -5]
+
+        keep = lttb(x, y, 20)
+
+        assert keep.size == 20 and keep[0] == 0 and keep[-1] == 999
+        assert {250, 700} <= set(keep.tolist())
+        assert np.all(np.diff(keep) > 0)
+
+    def test_lttb_short_series_unchanged(self):
+        """Should return every point when there are fewer than the target"""
+        assert lttb(np.arange(5.0), np.arange(5.0), 10).tolist() == [0, 1, 2, 3, 4]
+
+    def test_moving_average_is_by_time(self):
+        """Should average readings within the trailing window, not the last N readings"""
+        seconds = np.array([0, 86400, 86400 * 10, 86400 * 11], dtype=float)
+        values = np.array([80, 82, 90, 92], dtype=float)
+
+        assert moving_average(seconds, values, 7).tolist() == [80, 81, 90, 91]
+
+    def test_averages_include_readings_before_start(self):
+        """Should use earlier readings for the first averages but not return them"""
+        entries = make_entries(60)
+        start = entries[30]["recorded_at"]
+
+        series = build_weight_series(entries, start=start, points=300)
+
+        assert series["count"] == 30
+        assert series["points"][0]["recorded_at"] == start
+        expected = np.mean([e["weight"] for e in entries[24:31]])
+        assert series["points"][0]["avg_7d"] == round(expected, 2)
+
+    def test_postgres_timestamps(self):
+        """Should read trimmed fractions and a Z suffix"""
+        entries = [
+            {"recorded_at": "2024-05-01T07:30:00.12345+00:00", "weight": 80},
+            {"recorded_at": "2024-05-02T07:30:00.5Z", "weight": 81},
+        ]
+
+        series = build_weight_series(entries)
+
+        assert [p["weight"] for p in series["points"]] == [80, 81]
+        assert series["points"][1]["avg_7d"] == 80.5
+
+
+class TestWeightEndpoints:
+    """Tests for the weight API"""
+
+    def test_log_and_delete(self, db_client, mock_db, auth_headers):
+        """Should store a reading and delete it again"""
+        response = db_client.post("/api/weight/log", json={"weight": 80.456, "recorded_at": "2025-01-02T07:30:00"},
+                               headers=auth_headers)
+        entry = response.json()["data"]
+        assert (entry["weight"], entry["recorded_at"]) == (80.46, "2025-01-02T07:30:00+00:00")
+
+        db_client.delete(f"/api/weight/{entry['id']}", headers=auth_headers)
+
+        assert mock_db._mock_data["weight_history"] == []
+
+    def test_rejects_invalid_weight(self, db_client, auth_headers):
+        """Should return 422 for a non-positive weight"""
+        assert db_client.post("/api/weight/log", json={"weight": 0}, headers=auth_headers).status_code == 422
+
+    def test_history_is_downsampled(self, db_client, mock_db, auth_headers):
+        """Should return at most the requested points for years of readings"""
+        mock_db._mock_data["weight_history"] = [
+            {**entry, "user_id": "test-user-123"} for entry in make_entries(3 * 365)
+        ]
+
+        response = db_client.get("/api/weight/history?from=2023-01-01&to=2023-12-31&points=100", headers=auth_headers)
+        data = response.json()["data"]
+
+        assert data["count"] == 365
+        assert len(data["points"]) == 100
+        assert data["points"][0]["recorded_at"].startswith("2023-01-01")
+        assert data["points"][-1]["recorded_at"].startswith("2023-12-31")
+        assert set(data["points"][0]) == {"recorded_at", "weight", "avg_7d", "avg_30d"}
+
+    def test_history_revalidates_after_logging(self, db_client, auth_headers):
+        """Should answer 304 until a new reading is logged"""
+        etag = db_client.get("/api/weight/history", headers=auth_headers).headers["ETag"]
+        assert db_client.get("/api/weight/history", headers={**auth_headers, "If-None-Match": etag}).status_code == 304
+
+        db_client.post("/api/weight/log", json={"weight": 79}, headers=auth_headers)
+
+        assert db_client.get("/api/weight/history", headers={**auth_headers, "If-None-Match": etag}).status_code == 200
+
+    def test_invalid_range(self, db_client, auth_headers):
+        """Should return 400 for a malformed date"""
+        assert db_client.get("/api/weight/history?from=last-week", headers=auth_headers).status_code == 400
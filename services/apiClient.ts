@@ -235,6 +235,26 @@ export async function deleteMealLog(mealId: string): Promise<ApiResponse<any>> {
   });
 }
 
+// ==========================================
+// STREAKS
+// ==========================================
+
+export async function recordStreakActivity(
+  streakType: string,
+  activityDate?: string
+): Promise<ApiResponse<any>> {
+  const response = await apiCall<{ data: any }>("/api/streaks/activity", {
+    method: "POST",
+    body: JSON.stringify({
+      streak_type: streakType,
+      activity_date: activityDate,
+    }),
+  });
+  return response.success
+    ? { success: true, data: response.data?.data }
+    : { success: false, error: response.error };
+}
+
 // ==========================================
 // CHAT
 // ==========================================
@@ -4,6 +4,7 @@
  */
 
 import { createClient, SupabaseClient, User, Session } from '@supabase/supabase-js';
+import { recordStreakActivity } from './apiClient';
 
 // Configuration
 const SUPABASE_URL = import.meta.env.VITE_SUPABASE_URL || '';
@@ -258,47 +259,19 @@ export async function getUserStreaks(userId: string): Promise<DbStreak[]> {
   return data || [];
 }
 
+/**
+ * Streaks are only written by the backend, which keeps each streak's activity
+ * bitmap and counters together (see POST /api/streaks/activity).
+ */
 export async function updateStreak(
-  userId: string, 
   streakType: 'workout' | 'diet' | 'login' | 'steps',
-  increment: number = 1,
-  xpGained: number = 10
+  activityDate?: string
 ): Promise<DbStreak | null> {
   if (!isSupabaseConfigured()) return null;
   
-  // Get current streak
-  const { data: current } = await supabase
-    .from('streaks')
-    .select('*')
-    .eq('user_id', userId)
-    .eq('streak_type', streakType)
-    .single();
-  
-  const today = new Date().toISOString().split('T')[0];
-  const newStreak = (current?.current_streak || 0) + increment;
-  const newXp = (current?.xp_earned || 0) + xpGained;
-  const newLevel = Math.floor(newXp / 100) + 1;
-  
-  const levelTitles = ['Beginner', 'Rising Star', 'Fitness Enthusiast', 'Fitness Pro', 'Elite Athlete'];
-  const levelTitle = levelTitles[Math.min(newLevel - 1, levelTitles.length - 1)];
-  
-  const { data, error } = await supabase
-    .from('streaks')
-    .upsert({
-      user_id: userId,
-      streak_type: streakType,
-      current_streak: newStreak,
-      longest_streak: Math.max(newStreak, current?.longest_streak || 0),
-      last_activity_date: today,
-      xp_earned: newXp,
-      level: newLevel,
-      level_title: levelTitle,
-    })
-    .select()
-    .single();
-  
-  if (error) throw error;
-  return data;
+  const response = await recordStreakActivity(streakType, activityDate);
+  if (!response.success) throw new Error(response.error);
+  return response.data ?? null;
 }
 
 export async function getTotalXP(userId: string): Promise<{ xp: number; level: number; title: string }> {
@@ -340,7 +313,7 @@ export async function logWorkout(workout: DbWorkoutLog): Promise<DbWorkoutLog |
   if (error) throw error;
   
   // Update workout streak
-  await updateStreak(workout.user_id, 'workout', 1, 25);
+  await updateStreak('workout', data.workout_date);
   
   return data;
 }
@@ -407,7 +380,7 @@ export async function logMeal(meal: DbDietLog): Promise<DbDietLog | null> {
   if (error) throw error;
   
   // Update diet streak
-  await updateStreak(meal.user_id, 'diet', 0, 10);
+  await updateStreak('diet', data.log_date);
   
   return data;
 }
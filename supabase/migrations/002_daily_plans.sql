@@ -0,0 +1,20 @@
+-- FitBridge Database Schema
+-- Migration: 002_daily_plans
+-- Description: Opt-in precomputed daily plans generated by the batch pipeline
+
+-- ============================================
+-- USERS: daily plan opt-in
+-- ============================================
+ALTER TABLE users ADD COLUMN IF NOT EXISTS daily_plan_opt_in BOOLEAN DEFAULT FALSE;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS daily_plan_prompt TEXT; -- Optional custom request
+
+-- ============================================
+-- AI PLANS: date a precomputed plan is for
+-- ============================================
+ALTER TABLE ai_plans ADD COLUMN IF NOT EXISTS plan_date DATE;
+
+-- ============================================
+-- INDEXES FOR PERFORMANCE
+-- ============================================
+CREATE INDEX IF NOT EXISTS idx_users_daily_plan_opt_in ON users(id) WHERE daily_plan_opt_in;
+CREATE INDEX IF NOT EXISTS idx_ai_plans_type_date ON ai_plans(plan_type, plan_date, user_id);
@@ -0,0 +1,47 @@
+-- FitBridge Database Schema
+-- Migration: 003_token_usage
+-- Description: Hourly per-user AI token usage backing the daily quotas
+
+-- ============================================
+-- TOKEN USAGE TABLE
+-- Prompt and completion tokens per user, endpoint and hour
+-- ============================================
+CREATE TABLE IF NOT EXISTS token_usage (
+    user_id UUID REFERENCES users(id) ON DELETE CASCADE,
+    endpoint TEXT NOT NULL CHECK (endpoint IN ('chat', 'plan', 'progress')),
+    hour TIMESTAMPTZ NOT NULL,
+    prompt_tokens BIGINT DEFAULT 0,
+    completion_tokens BIGINT DEFAULT 0,
+    PRIMARY KEY (user_id, endpoint, hour)
+);
+
+ALTER TABLE token_usage ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view own token usage" ON token_usage
+    FOR SELECT USING (auth.uid() = user_id);
+
+-- ============================================
+-- FUNCTIONS
+-- ============================================
+
+-- Add a batch of usage deltas, summing into existing hours
+CREATE OR REPLACE FUNCTION record_token_usage(rows JSONB)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO token_usage (user_id, endpoint, hour, prompt_tokens, completion_tokens)
+    SELECT
+        (r->>'user_id')::UUID,
+        r->>'endpoint',
+        (r->>'hour')::TIMESTAMPTZ,
+        (r->>'prompt_tokens')::BIGINT,
+        (r->>'completion_tokens')::BIGINT
+    FROM jsonb_array_elements(rows) AS r
+    ON CONFLICT (user_id, endpoint, hour) DO UPDATE SET
+        prompt_tokens = token_usage.prompt_tokens + EXCLUDED.prompt_tokens,
+        completion_tokens = token_usage.completion_tokens + EXCLUDED.completion_tokens;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Only the backend (service role) records usage; clients must not write it
+REVOKE EXECUTE ON FUNCTION record_token_usage(JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION record_token_usage(JSONB) TO service_role;
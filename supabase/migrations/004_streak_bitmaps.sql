@@ -0,0 +1,11 @@
+-- FitBridge Database Schema
+-- Migration: 004_streak_bitmaps
+-- Description: Day-activity bitmaps behind streaks and the activity heatmap
+
+-- ============================================
+-- STREAKS: activity bitmap
+-- Bit i (little-endian, base64) is set when there was activity on
+-- activity_start + i days; about the last 400 days are kept
+-- ============================================
+ALTER TABLE streaks ADD COLUMN IF NOT EXISTS activity_start DATE;
+ALTER TABLE streaks ADD COLUMN IF NOT EXISTS activity_bits TEXT;
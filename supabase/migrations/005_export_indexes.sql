@@ -0,0 +1,11 @@
+-- FitBridge Database Schema
+-- Migration: 005_export_indexes
+-- Description: Indexes behind keyset-paged history exports
+
+-- ============================================
+-- INDEXES FOR PERFORMANCE
+-- Exports page by (date, id) after the previous page's last row
+-- ============================================
+CREATE INDEX IF NOT EXISTS idx_workout_logs_user_date_id ON workout_logs(user_id, workout_date, id);
+CREATE INDEX IF NOT EXISTS idx_diet_logs_user_date_id ON diet_logs(user_id, log_date, id);
+CREATE INDEX IF NOT EXISTS idx_weight_history_user_recorded_id ON weight_history(user_id, recorded_at, id);
@@ -0,0 +1,54 @@
+-- FitBridge Database Schema
+-- Migration: 006_data_versions
+-- Description: Per-user data version behind the API's ETags, bumped by triggers
+-- so writes clients make directly (not through the API) also change it
+
+-- ============================================
+-- DATA VERSIONS TABLE
+-- No foreign key to users: rows deleted by a user's cascade still fire the
+-- triggers, which must not fail on the user being gone
+-- ============================================
+CREATE TABLE IF NOT EXISTS data_versions (
+    user_id UUID PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+ALTER TABLE data_versions ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view own data version" ON data_versions
+    FOR SELECT USING (auth.uid() = user_id);
+
+-- ============================================
+-- FUNCTIONS & TRIGGERS
+-- ============================================
+
+-- Bump the version of the user whose row changed
+CREATE OR REPLACE FUNCTION bump_data_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO data_versions (user_id, version)
+    VALUES (COALESCE(NEW.user_id, OLD.user_id), 1)
+    ON CONFLICT (user_id) DO UPDATE SET version = data_versions.version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE TRIGGER bump_workout_logs_data_version
+    AFTER INSERT OR UPDATE OR DELETE ON workout_logs
+    FOR EACH ROW EXECUTE FUNCTION bump_data_version();
+
+CREATE TRIGGER bump_diet_logs_data_version
+    AFTER INSERT OR UPDATE OR DELETE ON diet_logs
+    FOR EACH ROW EXECUTE FUNCTION bump_data_version();
+
+CREATE TRIGGER bump_daily_logs_data_version
+    AFTER INSERT OR UPDATE OR DELETE ON daily_logs
+    FOR EACH ROW EXECUTE FUNCTION bump_data_version();
+
+CREATE TRIGGER bump_streaks_data_version
+    AFTER INSERT OR UPDATE OR DELETE ON streaks
+    FOR EACH ROW EXECUTE FUNCTION bump_data_version();
+
+CREATE TRIGGER bump_weight_history_data_version
+    AFTER INSERT OR UPDATE OR DELETE ON weight_history
+    FOR EACH ROW EXECUTE FUNCTION bump_data_version();
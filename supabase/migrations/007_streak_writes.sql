@@ -0,0 +1,10 @@
+-- FitBridge Database Schema
+-- Migration: 007_streak_writes
+-- Description: Streaks are written only by the API, which keeps the activity
+-- bitmap and the counters derived from it in step
+
+-- ============================================
+-- STREAKS POLICIES
+-- Clients keep read access and record activity with POST /api/streaks/activity
+-- ============================================
+DROP POLICY IF EXISTS "Users can manage own streaks" ON streaks;